@@ -1,7 +1,6 @@
 # app/app.py (FULL FINAL - Added data fetch before retrain to prevent insufficient data error)
 import streamlit as st
 import yaml
-import joblib
 import pandas as pd
 import sys
 import os
@@ -27,157 +26,259 @@ else:
 st.set_page_config(page_title="Quant Terminal", layout="wide")
 st.title("🏦 Quant Terminal - Bloomberg Analogue")
 
-# Sidebar
-st.sidebar.header("Controls")
-selected_asset = st.sidebar.selectbox("Select Asset", ASSETS, index=0)
+# Startup hook: library modules have no import-time side effects, so logging and the schema are set up here
+@st.cache_resource
+def startup() -> None:
+    import logging
+    from storage.db_manager import init_storage
+    logging.basicConfig(level='INFO')
+    init_storage()
 
-if st.sidebar.button("Refresh All Data & Clear Cache"):
-    st.cache_data.clear()
-    st.cache_resource.clear()
-    st.rerun()
+startup()
 
-if st.sidebar.button(f"Retrain Model - {selected_asset}"):
-    with st.spinner(f"Ensuring data & retraining model for {selected_asset}..."):
-        # FIXED: Fetch and store data first to ensure sufficient history for training
-        from storage.db_manager import load_ohlc, store_ohlc
-        from ingest.ohlc_fetcher import fetch_ohlc
+# Every rerun is one trace; add ?diagnostics=1 to the URL to see where its time went
+from utils import tracing
+# st.rerun() and st.stop() end the script by raising, so the span is closed in `finally`
+rerun_span = tracing.begin('rerun', 'page', root=True)
+try:
+    # Sidebar
+    st.sidebar.header("Controls")
+    selected_asset = st.sidebar.selectbox("Select Asset", ASSETS, index=0)
+    rerun_span.tags['symbol'] = selected_asset
+    chart_kind = st.sidebar.radio("Price chart", ["Line", "Candles"], horizontal=True)
+    # Intraday sizes are resampled from stored 1-minute bars (futures/FX only)
+    from utils.config import INTRADAY_ASSETS
+    bar_size = st.sidebar.selectbox("Bar size", ["1D", "1h", "15min", "5min", "1min"] if selected_asset in INTRADAY_ASSETS
+                                    else ["1D"])
+
+    if st.sidebar.button("Refresh All Data & Clear Cache"):
+        from ingest.ohlc_fetcher import refresh_many
+        with st.spinner("Fetching new bars..."):
+            # Incremental and concurrent: only bars after each stored watermark
+            refreshed = refresh_many(ASSETS)
+        failed = [a for a in ASSETS if a not in refreshed]
+        with st.spinner("Fetching new 1-minute bars..."):
+            from ingest.ohlc_fetcher import refresh_intraday
+            for asset in INTRADAY_ASSETS:
+                try:
+                    refresh_intraday(asset)
+                except Exception:
+                    failed.append(f"{asset} (1m)")
+        if failed:
+            st.sidebar.warning(f"Refresh failed for {', '.join(failed)}")
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        st.rerun()
+
+    if st.sidebar.button(f"Retrain Model - {selected_asset}"):
+        with st.spinner(f"Ensuring data & retraining model for {selected_asset}..."):
+            # FIXED: Fetch and store data first to ensure sufficient history for training
+            from storage.db_manager import load_ohlc
+            from ingest.ohlc_fetcher import refresh_ohlc
         
-        df = load_ohlc(selected_asset, '2020-01-01')
-        if df.empty or len(df) < 50:
-            try:
-                fresh = fetch_ohlc(selected_asset, days=2000)
-                store_ohlc(fresh)
-                st.info(f"Fetched {len(fresh)} fresh bars for {selected_asset}")
-            except Exception as fetch_e:
-                st.error(f"Data fetch failed for {selected_asset}: {fetch_e}")
-                st.stop()
+            df = load_ohlc(selected_asset, '2020-01-01')
+            if df.empty or len(df) < 50:
+                try:
+                    stats = refresh_ohlc(selected_asset, days=2000)
+                    st.info(f"Fetched {stats['fetched']} fresh bars for {selected_asset}")
+                except Exception as fetch_e:
+                    st.error(f"Data fetch failed for {selected_asset}: {fetch_e}")
+                    st.stop()
         
-        from models.train import train_model
-        try:
-            metrics = train_model(selected_asset)
-            st.success(f"Model retrained! CV Accuracy: {metrics.get('cv_accuracy', 'N/A'):.2f}")
-        except Exception as train_e:
-            st.error(f"Training failed despite data fetch: {train_e}")
-
-# Data with auto-fetch
-@st.cache_data(ttl=1800)
-def get_data(asset: str) -> pd.DataFrame:
-    from storage.db_manager import load_ohlc
-
-    df = load_ohlc(asset, '2020-01-01')
-
-    if df.empty or len(df) < 500:
-        with st.spinner(f"Fetching fresh data for {asset}..."):
-            from ingest.ohlc_fetcher import fetch_ohlc
-            from storage.db_manager import store_ohlc
+            from models.train import retrain_model
             try:
-                fresh = fetch_ohlc(asset, days=2000)
-                store_ohlc(fresh)
-                df = fresh
-            except Exception as e:
-                st.error(f"Fetch failed for {asset}: {e}")
-                return pd.DataFrame()
-    if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.dropna(subset=['close'])
-    return df.sort_values('timestamp').reset_index(drop=True)
-
-# Model with auto-train
-@st.cache_resource(ttl=86400)
-def get_model(asset: str):
-    model_path = f'models/rf_{asset}.joblib'
-    if not os.path.exists(model_path):
-        with st.spinner(f"First-time training for {asset}..."):
-            from models.train import train_model
-            train_model(asset)
-    return joblib.load(model_path)
-
-# Plotly
-@st.cache_resource(ttl=86400)
-def get_plotly():
-    import plotly.express as px
-    return px
-
-px = get_plotly()
-
-# Dashboard
-col1, col2, col3 = st.columns([2, 2, 1])
-
-with col1:
-    st.subheader(f"{selected_asset} Price Chart")
-    df = get_data(selected_asset)
-    if not df.empty and 'timestamp' in df.columns and 'close' in df.columns:
-        fig = px.line(df, x='timestamp', y='close', title=f"{selected_asset} Close")
-        fig.update_layout(height=580)
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.error("Data missing columns — refresh data")
-
-with col2:
-    st.subheader("252-Day Rolling Correlation Matrix")
-    with st.spinner("Calculating..."):
-        returns_dict = {}
-        for a in ASSETS:
-            data = get_data(a)
-            if not data.empty and 'timestamp' in data.columns and 'close' in data.columns:
-                data['timestamp'] = pd.to_datetime(data['timestamp'])
-                returns_dict[a] = data.set_index('timestamp')['close'].pct_change().tail(252)
-        if returns_dict:
-            corr_df = pd.DataFrame(returns_dict).corr()
-            fig = px.imshow(
-                corr_df.round(2),
-                text_auto=True,
-                color_continuous_scale='RdBu',
-                aspect="auto",
-                title="Asset Correlation (1Y)"
-            )
-            fig.update_layout(height=580)
+                # Incremental when only new bars arrived; falls back to a full refit on drift/feature changes
+                metrics = retrain_model(selected_asset)
+                st.success(f"Model retrained ({metrics.get('mode', 'full')})! CV Accuracy: {metrics.get('cv_accuracy', 'N/A'):.2f}")
+            except Exception as train_e:
+                st.error(f"Training failed despite data fetch: {train_e}")
+
+    if st.sidebar.button("Retrain All Models"):
+        with st.spinner(f"Retraining {len(ASSETS)} models in parallel..."):
+            from models.orchestrator import train_many
+            trained = train_many(ASSETS)
+        failed = [a for a in ASSETS if a not in trained]
+        if failed:
+            st.sidebar.warning(f"Training failed for {', '.join(failed)}")
+        else:
+            st.sidebar.success(f"Retrained {len(trained)} models")
+
+    # Page loads only read storage; ops/refresher.py (or the buttons above) fetch, train and publish signals
+    @st.cache_data(ttl=1800)
+    def get_data(asset: str) -> pd.DataFrame:
+        from storage.db_manager import load_ohlc
+
+        # Compact arrays straight from the cursor: already sorted, timestamps already datetime64
+        df = load_ohlc(asset, '2020-01-01', compact=True)
+        if not df.empty and df['close'].isna().any():
+            df = df.dropna(subset=['close']).reset_index(drop=True)
+        return df
+
+    @st.cache_data(ttl=300)
+    def get_intraday_extent(asset: str):
+        from storage.intraday import extent
+        return extent(asset)
+
+    # Correlation engine (state persisted next to the DB so restarts don't recompute)
+    CORR_STATE_PATH = 'data/corr_state_252.npz'
+
+    @st.cache_resource
+    def get_corr_engine():
+        from features.correlation import RollingCorrelation
+        return RollingCorrelation.load(CORR_STATE_PATH, ASSETS, window=252)
+
+    # Plotly
+    @st.cache_resource(ttl=86400)
+    def get_plotly():
+        import plotly.express as px
+        return px
+
+    px = get_plotly()
+
+    # Dashboard
+    col1, col2, col3 = st.columns([2, 2, 1])
+
+    with col1:
+        st.subheader(f"{selected_asset} Price Chart ({bar_size})")
+        if bar_size == "1D":
+            df = get_data(selected_asset)
+            bounds = (df['timestamp'].iloc[0], df['timestamp'].iloc[-1]) \
+                if not df.empty and 'timestamp' in df.columns and 'close' in df.columns else None
+        else:
+            bounds = get_intraday_extent(selected_asset)
+        if bounds is not None and bounds[0] < bounds[1]:
+            # Zooming re-queries storage for just that range, so narrow ranges come back at full fidelity;
+            # the browser only ever gets ~one point per pixel (LTTB line / bucketed candles)
+            from datetime import timedelta
+            first, last = bounds[0].to_pydatetime(), bounds[1].to_pydatetime()
+            zoom = st.slider("Range", min_value=first, max_value=last, value=(first, last),
+                             step=timedelta(days=1) if bar_size == "1D" else timedelta(minutes=15),
+                             format="YYYY-MM-DD" if bar_size == "1D" else "YYYY-MM-DD HH:mm",
+                             key=f"zoom_{selected_asset}_{bar_size}")
+            from utils.downsample import chart_frame
+            chart = chart_frame(selected_asset, str(zoom[0]), str(zoom[1]), kind=chart_kind.lower(), bar_size=bar_size)
+            if chart_kind == "Candles":
+                import plotly.graph_objects as go
+                fig = go.Figure(go.Candlestick(x=chart['timestamp'], open=chart['open'], high=chart['high'],
+                                               low=chart['low'], close=chart['close']))
+                fig.update_layout(title=f"{selected_asset} OHLC", xaxis_rangeslider_visible=False)
+            else:
+                fig = px.line(chart, x='timestamp', y='close', title=f"{selected_asset} Close")
+            fig.update_layout(height=520)
             st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"{len(chart):,} points drawn for the selected range")
         else:
-            st.warning("No data for correlations — refresh")
+            st.warning(f"No {bar_size} bars stored for {selected_asset} yet — waiting for the refresher "
+                       "(python ops/refresher.py) or use Refresh All")
 
-with col3:
-    st.subheader("Macro Snapshot")
-    st.metric("FEDFUNDS", "5.33%", "+0.00")
-    st.metric("US CPI YoY", "2.7%", "-0.1%")
-    st.metric("VIX", "14.20", "-0.80")
-    st.caption("November 16, 2025")
+    with col2:
+        st.subheader("252-Day Rolling Correlation Matrix")
+        with st.spinner("Calculating..."):
+            from storage.db_manager import load_panel
+            from features.correlation import returns_panel
+            closes = load_panel(ASSETS, '2020-01-01')['close']
+            thin = [a for a in ASSETS if closes[a].count() < 500]
+            if thin:
+                st.caption(f"Short history for {', '.join(thin)} — the refresher backfills it")
+            # Streaming engine: only bars newer than its persisted state are folded in (a backfill replays it)
+            corr_engine = get_corr_engine()
+            if corr_engine.update_many(returns_panel(closes)):
+                corr_engine.save(CORR_STATE_PATH)
+            if corr_engine.last_timestamp is not None:
+                corr_df = corr_engine.matrix()
+                fig = px.imshow(
+                    corr_df.round(2),
+                    text_auto=True,
+                    color_continuous_scale='RdBu',
+                    aspect="auto",
+                    title="Asset Correlation (1Y)"
+                )
+                fig.update_layout(height=580)
+                st.plotly_chart(fig, use_container_width=True)
 
-# ML Signal
-st.subheader(f"ML Signal — {selected_asset}")
-try:
-    with st.spinner("Inferring..."):
-        from models.infer import infer_signal
-        signal, expl = infer_signal(selected_asset)
-    st.metric("Signal (-1 → +1)", f"{signal:+.3f}",
-              delta="BULLISH" if signal > 0.15 else "BEARISH" if signal < -0.15 else "NEUTRAL")
-
-    expl_series = pd.Series(expl).sort_values(ascending=False).head(5)
-    st.bar_chart(expl_series, height=320)
-
-    direction = ("strongly bullish" if signal > 0.35 else
-                 "bullish" if signal > 0.15 else
-                 "bearish" if signal < -0.15 else
-                 "strongly bearish" if signal < -0.35 else
-                 "neutral")
-
-    top_driver = expl_series.index[0].replace('_', ' ').title()
-    st.info(f"**{selected_asset}** is **{direction.upper()}** (signal {signal:+.3f})\n\n"
-            f"Primary driver: **{top_driver}** ({expl[expl_series.index[0]]:.3f})\n\n"
-            f"{'→ Long bias recommended' if signal > 0.2 else '→ Short/hedge recommended' if signal < -0.2 else '→ Range-bound — wait for breakout'}")
-except Exception as e:
-    st.error(f"ML inference failed: {e}")
-    st.metric("Signal (-1 → +1)", "N/A")
-
-if st.button("Run Quick 2-Year Backtest"):
-    with st.spinner("Backtesting..."):
-        try:
-            from backtest import simple_backtest  # FIXED: Direct import from ops/backtest.py
-            from features.engineer import engineer_features
-            feats = engineer_features(selected_asset)
-            pnl = simple_backtest(selected_asset, feats)
-            st.success(f"Simulated 2Y P&L: {pnl:+.2%}")
-        except Exception as e:
-            st.error(f"Backtest failed: {e}")
+                others = [a for a in ASSETS if a != selected_asset]
+                if others:
+                    pair_with = st.selectbox("Correlation over time vs", others, key="corr_pair")
+                    st.line_chart(corr_engine.pair_history(selected_asset, pair_with), height=200)
+            else:
+                st.warning("No data for correlations — refresh")
+
+    with col3:
+        st.subheader("Macro Snapshot")
+        st.metric("FEDFUNDS", "5.33%", "+0.00")
+        st.metric("US CPI YoY", "2.7%", "-0.1%")
+        st.metric("VIX", "14.20", "-0.80")
+        st.caption("November 16, 2025")
+
+    # ML Signal
+    st.subheader(f"ML Signal — {selected_asset}")
+    try:
+        # Published by ops/refresher.py; the page never trains or scores
+        from storage.db_manager import load_signals
+        published = load_signals([selected_asset]).get(selected_asset)
+        if published is None:
+            raise LookupError("no signal published yet — run python ops/refresher.py")
+        signal, expl = published['signal'], published['explanation']
+        st.metric("Signal (-1 → +1)", f"{signal:+.3f}",
+                  delta="BULLISH" if signal > 0.15 else "BEARISH" if signal < -0.15 else "NEUTRAL")
+
+        expl_series = pd.Series(expl).sort_values(ascending=False).head(5)
+        st.bar_chart(expl_series, height=320)
+
+        direction = ("strongly bullish" if signal > 0.35 else
+                     "bullish" if signal > 0.15 else
+                     "bearish" if signal < -0.15 else
+                     "strongly bearish" if signal < -0.35 else
+                     "neutral")
+
+        top_driver = expl_series.index[0].replace('_', ' ').title()
+        st.info(f"**{selected_asset}** is **{direction.upper()}** (signal {signal:+.3f})\n\n"
+                f"Primary driver: **{top_driver}** ({expl[expl_series.index[0]]:.3f})\n\n"
+                f"{'→ Long bias recommended' if signal > 0.2 else '→ Short/hedge recommended' if signal < -0.2 else '→ Range-bound — wait for breakout'}")
+        model = f"model v{published['model_version']}" if published['model_version'] is not None else "momentum fallback"
+        st.caption(f"Bar {published['timestamp']:%Y-%m-%d} · {model} · computed {published['computed_at']:%Y-%m-%d %H:%M} UTC")
+    except LookupError as e:
+        st.info(f"ML signal unavailable: {e}")
+        st.metric("Signal (-1 → +1)", "N/A")
+    except Exception as e:
+        st.error(f"ML inference failed: {e}")
+        st.metric("Signal (-1 → +1)", "N/A")
+
+    if st.button("Run Quick 2-Year Backtest"):
+        with st.spinner("Backtesting..."):
+            try:
+                from backtest import simple_backtest  # FIXED: Direct import from ops/backtest.py
+                from features.engineer import engineer_features
+                feats = engineer_features(selected_asset)  # the model and backtest are daily
+                pnl = simple_backtest(selected_asset, feats)
+                st.success(f"Simulated 2Y P&L: {pnl:+.2%}")
+            except Exception as e:
+                st.error(f"Backtest failed: {e}")
+
+    if st.button("Run Walk-Forward Parameter Sweep (all assets)"):
+        with st.spinner("Walk-forward refits + 1000-combination sweep..."):
+            try:
+                from backtest import walk_forward_backtest
+                sweep = walk_forward_backtest(ASSETS)
+                table = sweep.params.join(sweep.stats).sort_values('sharpe', ascending=False)
+                st.dataframe(table.head(10).round(3), use_container_width=True)
+                best = table.index[0]
+                st.line_chart(sweep.equity[best].rename("Best combination equity"), height=260)
+            except Exception as e:
+                st.error(f"Sweep failed: {e}")
+finally:
+    tracing.end(rerun_span)
+if st.query_params.get("diagnostics") == "1":
+    with st.expander("Diagnostics — where this rerun's time went", expanded=True):
+        rerun_spans = [s for s in tracing.spans(rerun_span.trace_id) if s is not rerun_span]
+        traced_s = sum(s.duration for s in rerun_spans if s.parent_id == rerun_span.id)
+        st.caption(f"Rerun {rerun_span.duration * 1e3:.0f} ms: {traced_s * 1e3:.0f} ms in traced stages, "
+                   f"{(rerun_span.duration - traced_s) * 1e3:.0f} ms rendering / untraced (cache hits don't appear)")
+        if rerun_spans:
+            st.dataframe(pd.DataFrame(tracing.summary(rerun_spans)).round(2), use_container_width=True)
+        import json
+        st.download_button("JSON trace (chrome://tracing / Perfetto)", json.dumps(tracing.json_trace(rerun_span.trace_id)),
+                           file_name="rerun_trace.json")
+        st.download_button("Prometheus metrics (this process)", tracing.prometheus_text(), file_name="metrics.prom")
 
 st.caption("Quant Terminal v1.0 — Free-tier Bloomberg Killer | Nov 16, 2025")
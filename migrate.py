@@ -1,40 +1,73 @@
 # ops/migrate.py
 import os
 import sys
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect, text
 from dotenv import load_dotenv
 import yaml
 
 load_dotenv()
-DB_PATH = os.getenv('DB_PATH', 'data/quant_terminal.db')
-engine = create_engine(f'sqlite:///{DB_PATH}')
-Session = sessionmaker(bind=engine)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+# Same WAL-tuned engines as the app (one serialized writer), so running this against a live DB
+# waits on busy_timeout instead of failing with "database is locked"
+from storage.db_manager import engine, init_storage  # noqa: E402
 
-def get_schema_version(session) -> int:
-    result = session.execute(text("SELECT COUNT(*) FROM model_metadata WHERE model_name = 'schema'")).scalar()
+def get_schema_version(conn) -> int:
+    if not inspect(conn).has_table('model_metadata'):
+        return 0
+    result = conn.execute(text("SELECT COUNT(*) FROM model_metadata WHERE model_name = 'schema'")).scalar()
     return result or 0
 
 def init_schema():
-    session = Session()
-    version = get_schema_version(session)
+    # Tables and indexes live in storage.db_manager so the app and this script can't drift apart
+    init_storage()
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
     if version >= 1:
         print("Schema v1 exists. Skipping.")
         return
 
-    # Run schema SQL (paste schema here or from file)
-    schema_sql = """
-    -- [Full SQL from above]
-    """
-    with engine.connect() as conn:
-        conn.execute(text(schema_sql))
-        conn.commit()
-
     # Log version
-    session.execute(text("INSERT INTO model_metadata (model_name, version, params) VALUES ('schema', '1.0', '{}')"))
-    session.commit()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO model_metadata (model_name, version, params) VALUES ('schema', '1.0', '{}')"))
     print("Schema v1 initialized.")
 
+def migrate_to_columnar():
+    """
+    Copy raw_ohlc and the feature store from SQLite into the columnar backend
+    (src/storage/columnar.py). Metadata tables stay in SQLite. Safe to re-run: rows that
+    are already there are skipped. Switch over with STORAGE_BACKEND=columnar afterwards.
+    """
+    import pandas as pd
+    from storage import columnar
+    from storage.db_manager import FEATURE_COLUMNS, read_engine as store_engine
+    from utils.config import COLUMNAR_DIR
+
+    with store_engine.connect() as conn:
+        symbols = [r[0] for r in conn.execute(text("SELECT DISTINCT symbol FROM raw_ohlc ORDER BY symbol"))]
+        for symbol in symbols:
+            df = pd.read_sql(text("SELECT symbol, timestamp, open, high, low, close, volume, source FROM raw_ohlc "
+                                  "WHERE symbol = :symbol ORDER BY timestamp"), conn, params={'symbol': symbol})
+            stats, _ = columnar.upsert_ohlc(df)
+            print(f"OHLC {symbol}: {len(df)} rows ({stats['inserted']} new, {stats['updated']} updated)")
+
+        feature_sets = conn.execute(text("SELECT DISTINCT symbol, version FROM features WHERE version IS NOT NULL")).fetchall()
+        for symbol, version in feature_sets:
+            feats = pd.read_sql(text(f"SELECT symbol, date AS timestamp, {', '.join(FEATURE_COLUMNS)} FROM features "
+                                     "WHERE symbol = :symbol AND version = :version ORDER BY date"),
+                                conn, params={'symbol': symbol, 'version': version})
+            columnar.store_features(symbol, version, feats, FEATURE_COLUMNS, replace=True)
+            print(f"Features {symbol} ({version}): {len(feats)} rows")
+
+    for symbol in symbols:
+        with store_engine.connect() as conn:
+            expected = conn.execute(text("SELECT COUNT(*) FROM raw_ohlc WHERE symbol = :s"), {'s': symbol}).scalar()
+        if len(columnar.load_ohlc(symbol)) != expected:
+            print(f"Row count mismatch for {symbol}: SQLite {expected}, columnar {len(columnar.load_ohlc(symbol))}")
+            return
+    print(f"Columnar store ready in {COLUMNAR_DIR}. Set STORAGE_BACKEND=columnar to use it.")
+
 if __name__ == '__main__':
     if 'init' in sys.argv:
         init_schema()
+    if 'columnar' in sys.argv:
+        migrate_to_columnar()
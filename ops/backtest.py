@@ -1,8 +1,35 @@
 # ops/backtest.py (FULL FINAL - Renamed to backtest.py if needed, but with path fix it's ok)
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 from models.infer import infer_signal
+from models.registry import MODEL_DIR
 from features.engineer import engineer_features
+from utils.tracing import traced
+
+TRADING_DAYS = 252
+WALK_FORWARD_STEP = 63        # refit once a quarter
+WALK_FORWARD_MIN_TRAIN = 252  # a year of labelled bars before the first out-of-sample signal
+VOL_WINDOW = 20
+MAX_LEVERAGE = 3.0
+FOLD_CACHE_DIR = os.path.join(MODEL_DIR, 'folds')  # walk-forward fold models, compiled
+SWEEP_CHUNK_ELEMENTS = 4_000_000  # params x time x assets floats evaluated per chunk (~32 MB per array)
+
+DEFAULT_GRID = {
+    'threshold': [0.0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.6],
+    'window': [1, 2, 3, 5, 10, 15, 20, 30, 40, 60],
+    'cost_bps': [0, 1, 2, 5, 10, 15, 20, 30, 40, 50],
+}
+
 
+@traced('backtest', measure_arg='feats')
 def simple_backtest(symbol: str, feats: pd.DataFrame) -> float:
     if len(feats) < 50:
         return 0.0
@@ -13,3 +40,264 @@ def simple_backtest(symbol: str, feats: pd.DataFrame) -> float:
     pnl = (signals * returns).cumsum().iloc[-1]
     print(f"Backtest P&L for {symbol}: {pnl:.2%}")
     return pnl
+
+
+@traced('backtest')
+def streaming_backtest(symbol: str, chunk_bars: int = 50_000, start: Optional[str] = None) -> float:
+    """
+    Momentum P&L (the previous bar's momentum sign times each bar's return) over features
+    streamed chunk by chunk from raw bars (features.engineer.iter_features), for histories
+    too long to hold as one frame.
+    """
+    from features.engineer import HISTORY_START, iter_features
+
+    pnl, prev_signal, n_rows = 0.0, None, 0
+    for feats in iter_features(symbol, chunk_bars, start or HISTORY_START):
+        signals = np.where(feats['momentum_5d'].to_numpy() > 0, 1.0, -1.0)
+        returns = feats['returns'].to_numpy(dtype='float64')
+        if prev_signal is not None:
+            pnl += prev_signal * returns[0]  # the previous chunk's last signal trades this chunk's first bar
+        pnl += float(np.dot(signals[:-1], returns[1:]))
+        prev_signal, n_rows = signals[-1], n_rows + len(feats)
+    if n_rows < 50:
+        return 0.0
+    print(f"Backtest P&L for {symbol}: {pnl:.2%}")
+    return pnl
+
+
+# ---------------------------------------------------------------------------
+# Walk-forward model signals
+# ---------------------------------------------------------------------------
+
+def feature_panels(symbols: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """Materialized features per symbol, indexed by timestamp."""
+    panels = {}
+    for symbol in symbols:
+        feats = engineer_features(symbol)
+        if 'timestamp' in feats.columns:
+            panels[symbol] = feats.set_index('timestamp').sort_index()
+    return panels
+
+
+def rebalance_points(n_rows: int, step: int = WALK_FORWARD_STEP, min_train: int = WALK_FORWARD_MIN_TRAIN) -> List[int]:
+    """Row positions where a model is refitted; each one scores rows [point, next point)."""
+    return list(range(min_train, n_rows, step))
+
+
+def fit_fold(X: np.ndarray, y: np.ndarray, train_end: int):
+    """Scaler + forest fitted on rows [0, train_end); as train_model does, minus the CV."""
+    from sklearn.preprocessing import StandardScaler
+    from models.train import fit_forest
+
+    scaler = StandardScaler().fit(X[:train_end])
+    return scaler, fit_forest(scaler.transform(X[:train_end]), y[:train_end])
+
+
+def fold_cache_path(symbol: str, train_end: pd.Timestamp, X: np.ndarray, y: np.ndarray) -> str:
+    """
+    Cache file for one fold model, keyed by symbol, train-end date, forest hyperparameters and
+    feature-set version. A digest of the training rows is part of the key too, so revised
+    history never reuses a model fitted on the old bars.
+    """
+    from features.engineer import FEATURE_VERSION
+    from models.train import RF_PARAMS
+
+    data = hashlib.sha1(np.ascontiguousarray(X).tobytes() + np.ascontiguousarray(y).tobytes()).hexdigest()[:12]
+    key = json.dumps({'params': RF_PARAMS, 'features': FEATURE_VERSION, 'data': data}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(FOLD_CACHE_DIR, symbol, f"{train_end:%Y%m%d}_{digest}.npz")
+
+
+def _fit_and_cache(X: np.ndarray, y: np.ndarray, path: str, feature_names: List[str]) -> Tuple[str, float]:
+    """Worker body: fit one fold on all of (X, y) and store it compiled. Returns (path, fit ms)."""
+    from models.compiled import CompiledForest, flatten_forest
+
+    t0 = time.perf_counter()
+    scaler, model = fit_fold(X, y, len(X))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    CompiledForest.save(flatten_forest(model, scaler, feature_names), tmp)
+    os.replace(tmp, path)  # readers never see a half-written fold
+    return path, (time.perf_counter() - t0) * 1e3
+
+
+@traced('backtest')
+def walk_forward_signals(symbols: Sequence[str], step: int = WALK_FORWARD_STEP,
+                         min_train: int = WALK_FORWARD_MIN_TRAIN,
+                         panels: Optional[Dict[str, pd.DataFrame]] = None,
+                         cpu_budget: Optional[int] = None) -> pd.DataFrame:
+    """
+    Out-of-sample model signal (-1..+1, same mapping as infer_signal) for every bar, as a
+    timestamp x symbol frame. At each rebalance point the model only sees rows whose next-bar
+    outcome was already known; bars before the first point are NaN (flat).
+    Fold models are cached on disk (see fold_cache_path); the missing ones are fitted across
+    a process pool of `cpu_budget` workers (default TRAIN_CPU_BUDGET), so re-running with
+    different trading rules costs only the scoring.
+    """
+    from models.compiled import CompiledForest
+    from models.infer import FEATURE_COLS
+    from utils.config import TRAIN_CPU_BUDGET
+
+    panels = panels if panels is not None else feature_panels(symbols)
+    folds = []  # (symbol, start, end, cache path)
+    missing = {}  # cache path -> (X, y)
+    for symbol in symbols:
+        feats = panels.get(symbol)
+        if feats is None or len(feats) <= min_train:
+            print(f"[backtest] Not enough history for {symbol} walk-forward")
+            continue
+        X = feats[FEATURE_COLS].to_numpy(dtype='float64')
+        y = (feats['returns'].shift(-1).to_numpy() > 0).astype(int)
+        points = rebalance_points(len(feats), step, min_train)
+        for start, end in zip(points, points[1:] + [len(feats)]):
+            # Row i's label needs return i+1, so at the close of row `start` only rows < start are labelled
+            path = fold_cache_path(symbol, feats.index[start], X[:start], y[:start])
+            folds.append((symbol, start, end, path))
+            if not os.path.exists(path):
+                missing[path] = (X[:start], y[:start])
+
+    t0 = time.perf_counter()
+    budget = max(1, cpu_budget or TRAIN_CPU_BUDGET)
+    if budget == 1 or len(missing) <= 1:
+        for path, (X, y) in missing.items():
+            _fit_and_cache(X, y, path, FEATURE_COLS)
+    else:
+        # Longest training sets first so the pool drains evenly
+        order = sorted(missing, key=lambda p: len(missing[p][1]), reverse=True)
+        with ProcessPoolExecutor(max_workers=min(budget, len(order))) as pool:
+            futures = [pool.submit(_fit_and_cache, *missing[p], p, FEATURE_COLS) for p in order]
+            for future in as_completed(futures):
+                future.result()
+    print(f"[backtest] {len(folds)} walk-forward folds: {len(missing)} fitted in "
+          f"{time.perf_counter() - t0:.1f}s on {budget} worker(s), {len(folds) - len(missing)} from cache")
+
+    signals = {s: np.full(len(panels[s]), np.nan) for s in dict.fromkeys(f[0] for f in folds)}
+    for symbol, start, end, path in folds:
+        fold = CompiledForest.load(path)
+        X = panels[symbol][FEATURE_COLS].to_numpy(dtype='float64')[start:end]
+        signals[symbol][start:end] = (fold.predict_proba(fold.transform(X))[:, 1] - 0.5) * 2
+    return pd.DataFrame({s: pd.Series(v, index=panels[s].index) for s, v in signals.items()})
+
+
+# ---------------------------------------------------------------------------
+# Vectorized parameter sweep
+# ---------------------------------------------------------------------------
+
+class SweepResult(NamedTuple):
+    params: pd.DataFrame         # one row per combination: threshold, window, cost_bps
+    stats: pd.DataFrame          # portfolio sharpe, ann_return, ann_vol, max_drawdown, turnover, total_return
+    equity: pd.DataFrame         # time x combination portfolio equity curves
+    asset_sharpe: pd.DataFrame   # combination x asset Sharpe
+
+
+def smooth_signals(signals: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    """
+    Trailing mean of each signal over every window via one cumsum: (windows, time, assets).
+    Rounded to 12 decimals: forest signals are multiples of 1/n_trees, so thresholds are often
+    hit exactly and the comparison must not depend on cumsum rounding.
+    """
+    filled = np.nan_to_num(signals)
+    csum = np.vstack([np.zeros((1, filled.shape[1])), np.cumsum(filled, axis=0)])
+    out = np.empty((len(windows),) + filled.shape)
+    for k, w in enumerate(windows):
+        if w <= 1:
+            out[k] = filled
+            continue
+        lagged = csum[np.maximum(np.arange(1, len(filled) + 1) - w, 0)]
+        counts = np.minimum(np.arange(1, len(filled) + 1), w)[:, None]
+        out[k] = np.round((csum[1:] - lagged) / counts, 12)
+    out[:, np.isnan(signals)] = np.nan  # no signal yet → stay flat
+    return out
+
+
+def _sizing(returns: np.ndarray, vol_target: Optional[float]) -> np.ndarray:
+    """Per-bar position scale: 1, or vol_target / trailing annualized vol known at that bar."""
+    if vol_target is None:
+        return np.ones_like(returns)
+    vol = pd.DataFrame(returns).rolling(VOL_WINDOW, min_periods=VOL_WINDOW).std().to_numpy() * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.clip(vol_target / vol, 0.0, MAX_LEVERAGE)
+    return np.nan_to_num(scale)
+
+
+def _sweep_chunk(smoothed: np.ndarray, next_returns: np.ndarray, size: np.ndarray,
+                 window_idx: np.ndarray, thresholds: np.ndarray, costs: np.ndarray):
+    """Everything for a block of combinations at once, shaped (combination, time, asset)."""
+    s = smoothed[window_idx]
+    positions = np.where(np.abs(s) > thresholds[:, None, None], np.sign(s), 0.0) * size
+    positions = np.nan_to_num(positions)
+    trades = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    # Position held from the close of bar t earns bar t+1's return; trading at t pays costs at t
+    asset_pnl = positions * next_returns - trades * costs[:, None, None]
+    return asset_pnl, trades
+
+
+@traced('backtest')
+def run_sweep(signals: pd.DataFrame, returns: pd.DataFrame, grid: Optional[Dict[str, Sequence[float]]] = None,
+              vol_target: Optional[float] = None) -> SweepResult:
+    """
+    Backtest every (threshold, window, cost_bps) combination over all assets in one
+    broadcast over a (combination x time x asset) array, chunked to bound memory.
+    Positions are sign(trailing-mean signal) where |signal| > threshold, optionally scaled to
+    `vol_target` annualized vol; the portfolio is an equal-weight average of the assets.
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    combos = list(itertools.product(grid['threshold'], grid['window'], grid['cost_bps']))
+    params = pd.DataFrame(combos, columns=['threshold', 'window', 'cost_bps'])
+
+    symbols = [s for s in signals.columns if s in returns.columns]
+    index = signals.index.union(returns.index)
+    sig = signals.reindex(index=index, columns=symbols).to_numpy(dtype='float64')
+    ret = returns.reindex(index=index, columns=symbols).to_numpy(dtype='float64')
+    next_returns = np.nan_to_num(np.vstack([ret[1:], np.zeros((1, len(symbols)))]))
+    size = _sizing(np.nan_to_num(ret), vol_target)
+
+    windows = sorted(set(int(w) for w in grid['window']))
+    smoothed = smooth_signals(sig, windows)
+    window_idx = params['window'].map({w: k for k, w in enumerate(windows)}).to_numpy()
+    thresholds = params['threshold'].to_numpy(dtype='float64')
+    costs = params['cost_bps'].to_numpy(dtype='float64') / 1e4
+
+    n_time, n_assets = sig.shape
+    chunk = max(1, SWEEP_CHUNK_ELEMENTS // max(1, n_time * n_assets))
+    port_pnl = np.empty((len(params), n_time))
+    turnover = np.empty(len(params))
+    asset_sharpe = np.empty((len(params), n_assets))
+    for lo in range(0, len(params), chunk):
+        hi = min(lo + chunk, len(params))
+        asset_pnl, trades = _sweep_chunk(smoothed, next_returns, size, window_idx[lo:hi], thresholds[lo:hi], costs[lo:hi])
+        port_pnl[lo:hi] = asset_pnl.mean(axis=2)
+        turnover[lo:hi] = trades.sum(axis=2).mean(axis=1) / n_assets * TRADING_DAYS
+        asset_sharpe[lo:hi] = _sharpe(asset_pnl, axis=1)
+
+    equity = np.cumprod(1.0 + port_pnl, axis=1)
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity, axis=1)
+    stats = pd.DataFrame({
+        'sharpe': _sharpe(port_pnl, axis=1),
+        'ann_return': port_pnl.mean(axis=1) * TRADING_DAYS,
+        'ann_vol': port_pnl.std(axis=1) * np.sqrt(TRADING_DAYS),
+        'max_drawdown': drawdown.max(axis=1),
+        'turnover': turnover,
+        'total_return': equity[:, -1] - 1.0,
+    })
+    return SweepResult(params, stats, pd.DataFrame(equity.T, index=index),
+                       pd.DataFrame(asset_sharpe, columns=symbols))
+
+
+def _sharpe(pnl: np.ndarray, axis: int) -> np.ndarray:
+    mean, std = pnl.mean(axis=axis), pnl.std(axis=axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), 0.0)
+
+
+def returns_frame(panels: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    return pd.DataFrame({s: feats['returns'] for s, feats in panels.items()})
+
+
+@traced('backtest')
+def walk_forward_backtest(symbols: Sequence[str], grid: Optional[Dict[str, Sequence[float]]] = None,
+                          vol_target: Optional[float] = None, cpu_budget: Optional[int] = None) -> SweepResult:
+    """Walk-forward model signals for `symbols` (cached fold models), then the full parameter sweep over them."""
+    panels = feature_panels(symbols)
+    return run_sweep(walk_forward_signals(symbols, panels=panels, cpu_budget=cpu_budget),
+                     returns_frame(panels), grid, vol_target)
@@ -0,0 +1,83 @@
+# ops/bench_asof.py (Macro as-of join: sorted-array search vs per-row lookup vs merge_asof, cold and cached)
+# Usage: python ops/bench_asof.py [n_series] [n_symbols]
+# Every series is monthly with a release lag and one revision (utils/synthetic.py); the panel is
+# n_symbols × ~1,700 daily bars on shared timestamps, joined for all symbols at once.
+import os
+import sys
+import tempfile
+import time
+
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_asof_'), 'bench.db')
+sys.path.append('src')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from features import asof  # noqa: E402
+from storage.db_manager import init_storage, load_macro, store_macro  # noqa: E402
+from utils.synthetic import synthetic_macro, synthetic_universe  # noqa: E402
+
+N_SERIES = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+N_SYMBOLS = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+
+def timed(label: str, fn, repeats: int = 3):
+    best, out = float('inf'), None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<44} {best * 1e3:9.1f} ms")
+    return out
+
+
+def per_row(panel: pd.DataFrame, vintages: pd.DataFrame, metrics) -> dict:
+    """Reference: for each bar, filter the releases known by then and take the latest period's newest vintage."""
+    out = {}
+    for metric in metrics:
+        v = vintages[vintages['metric'] == metric]
+        values = []
+        for ts in panel['timestamp']:
+            known = v[v['release_date'] + asof.KNOWN_AFTER <= ts]
+            values.append(known.sort_values(['date', 'release_date'])['value'].iloc[-1] if len(known) else np.nan)
+        out[metric] = np.array(values)
+    return out
+
+
+def merge_asof(panel: pd.DataFrame, vintages: pd.DataFrame, metrics) -> dict:
+    """pandas merge_asof per metric on each metric's step function (ignores revisions of older periods)."""
+    left = panel[['timestamp']].reset_index().sort_values('timestamp')
+    out = {}
+    for metric in metrics:
+        v = vintages[vintages['metric'] == metric]
+        known_at, values = asof.known_values(asof._ns(v['date']), asof._ns(v['release_date']), v['value'].to_numpy())
+        right = pd.DataFrame({'timestamp': pd.to_datetime(known_at).as_unit('ns'), 'value': values})
+        merged = pd.merge_asof(left.assign(timestamp=left['timestamp'].astype('datetime64[ns]')), right,
+                               on='timestamp')
+        out[metric] = merged.sort_values('index')['value'].to_numpy()
+    return out
+
+
+if __name__ == '__main__':
+    init_storage()
+    metrics = [f"SERIES{i:02d}" for i in range(N_SERIES)]
+    store_macro(pd.concat([synthetic_macro(m, seed=i) for i, m in enumerate(metrics)], ignore_index=True))
+    panel = synthetic_universe([f"SYM{i}" for i in range(N_SYMBOLS)], 1_700, start='2020-01-01', freq='B')
+    vintages = load_macro(metrics)
+    print(f"{N_SERIES} series ({len(vintages)} vintages) onto {len(panel)} bars ({N_SYMBOLS} symbols)\n")
+
+    asof.clear_cache()
+    fast = timed("as-of join, cold (load + build + search)", lambda: (asof.clear_cache(),
+                                                                     asof.macro_values(panel['timestamp'], metrics))[1])
+    timed("as-of join, cached (same series versions)", lambda: asof.macro_values(panel['timestamp'], metrics))
+    merged = timed("pd.merge_asof per series", lambda: merge_asof(panel, vintages, metrics))
+    sample = panel.iloc[::max(1, len(panel) // 200)]
+    slow = timed(f"per-row lookup ({len(sample)} of {len(panel)} bars, 1 run)",
+                 lambda: per_row(sample, vintages, metrics[:2]), repeats=1)
+
+    idx = sample.index.to_numpy()
+    for metric in metrics[:2]:
+        assert np.allclose(fast[metric][idx], slow[metric], equal_nan=True), metric
+    for metric in metrics:
+        assert np.allclose(fast[metric], merged[metric], equal_nan=True), metric
+    print("\nall three agree")
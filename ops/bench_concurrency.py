@@ -0,0 +1,118 @@
+# ops/bench_concurrency.py (Dashboard read latency while ingest keeps writing)
+# Usage: python ops/bench_concurrency.py [seconds_per_run]
+# Runs the same workload twice: the old single default engine with a rollback journal, then
+# the WAL / pooled-reader / serialized-writer storage layer from storage.db_manager.
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+_tmp = tempfile.mkdtemp(prefix='bench_concurrency_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'wal.db')
+sys.path.append('src')
+
+from sqlalchemy import create_engine  # noqa: E402
+
+import storage.db_manager as db  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+SYMBOLS = [f'S{i}' for i in range(6)]
+HISTORY_BARS = 50_000    # minute bars already stored per symbol
+BATCH_BARS = 200         # bars per ingest write
+WRITE_INTERVAL = 0.05    # seconds between a writer's batches
+MAX_BATCHES = 2_000
+N_READERS = 4
+N_WRITERS = 2
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+
+def legacy_engines(path: str) -> None:
+    """What every module used before: one default engine, rollback journal, no pragmas."""
+    old = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+    with old.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    db.engine = db.read_engine = old
+
+
+def seed(series: dict) -> None:
+    db.init_schema_if_needed()
+    db.bulk_upsert_ohlc([df.iloc[:HISTORY_BARS] for df in series.values()])
+
+
+def run(series: dict) -> dict:
+    stop = threading.Event()
+    latencies, errors, written = [], [], [0]
+    lock = threading.Lock()
+
+    def reader(k: int) -> None:
+        rng = np.random.default_rng(k)
+        while not stop.is_set():
+            symbol = SYMBOLS[rng.integers(len(SYMBOLS))]
+            t0 = time.perf_counter()
+            try:
+                # The dashboard's hot path: latest bar per asset + a recent window for the chart
+                latest = db.latest_timestamps(SYMBOLS)
+                if symbol not in latest or db.load_ohlc(symbol, str(latest[symbol] - pd.Timedelta(days=1))).empty:
+                    raise RuntimeError('failed read')  # the loaders log and swallow lock errors
+            except Exception as e:
+                with lock:
+                    errors.append(f'{type(e).__name__} (read)')
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    def writer(k: int) -> None:
+        # Each writer extends its own symbols past the seeded history, one batch per transaction
+        offset = HISTORY_BARS
+        while not stop.wait(WRITE_INTERVAL):
+            frames = [series[s].iloc[offset:offset + BATCH_BARS] for i, s in enumerate(SYMBOLS) if i % N_WRITERS == k]
+            try:
+                stats = db.bulk_upsert_ohlc(frames)
+            except Exception as e:
+                with lock:
+                    errors.append(f'{type(e).__name__} (write)')
+                continue
+            offset += BATCH_BARS
+            with lock:
+                written[0] += stats['inserted']
+
+    threads = ([threading.Thread(target=reader, args=(k,)) for k in range(N_READERS)] +
+               [threading.Thread(target=writer, args=(k,)) for k in range(N_WRITERS)])
+    for t in threads:
+        t.start()
+    time.sleep(DURATION)
+    stop.set()
+    for t in threads:
+        t.join()
+    lat = np.array(latencies)
+    return {'reads': len(lat), 'p50': np.percentile(lat, 50), 'p95': np.percentile(lat, 95),
+            'p99': np.percentile(lat, 99), 'max': lat.max(), 'rows_written': written[0],
+            'errors': f"{len(errors)} {sorted(set(errors))}" if errors else 0}
+
+
+def report(name: str, r: dict) -> None:
+    print(f"{name:<22} reads {r['reads']:>5} | p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | "
+          f"p99 {r['p99']:7.1f} ms | max {r['max']:7.1f} ms | ingested {r['rows_written']:>7} rows "
+          f"| errors {r['errors']}")
+
+
+if __name__ == '__main__':
+    print(f"{len(SYMBOLS)} symbols x {HISTORY_BARS} bars, {N_READERS} readers, {N_WRITERS} writers, "
+          f"{DURATION:.0f}s per run\n")
+    n_bars = HISTORY_BARS + MAX_BATCHES * BATCH_BARS
+    series = {s: synthetic_ohlc(s, n_bars, start='2024-01-01', freq='min', seed=i) for i, s in enumerate(SYMBOLS)}
+
+    tuned = db.engine, db.read_engine
+    legacy_engines(os.path.join(_tmp, 'legacy.db'))
+    seed(series)
+    report('legacy (1 engine)', run(series))
+
+    db.engine, db.read_engine = tuned
+    seed(series)
+    with db.read_engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    report(f'shared layer ({mode})', run(series))
@@ -0,0 +1,47 @@
+# ops/bench_downsample.py (Price-chart payload and latency vs stored history length)
+# Usage: python ops/bench_downsample.py [bars ...]
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix='bench_downsample_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+sys.path.append('src')
+
+import storage.db_manager as db  # noqa: E402
+from utils.downsample import CHART_WIDTH_PX, chart_frame  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+SIZES = [int(a) for a in sys.argv[1:]] or [1_300, 100_000, 1_000_000]
+
+
+def payload_kb(df) -> float:
+    """Roughly what the browser receives: the plotted columns as JSON."""
+    return len(df.to_json(orient='split', date_format='iso')) / 1024
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+if __name__ == '__main__':
+    db.init_storage()
+    print(f"chart width {CHART_WIDTH_PX}px\n")
+    print(f"{'bars':>10} {'kind':>8} {'raw KB':>9} {'drawn':>6} {'KB':>6} {'cold ms':>8} {'cached ms':>9} "
+          f"{'zoom 1%':>8} {'zoom ms':>8}")
+    for n in SIZES:
+        symbol = f'B{n}'
+        df = synthetic_ohlc(symbol, n, start='2015-01-01', freq='min' if n > 10_000 else 'D')
+        db.bulk_upsert_ohlc(df)
+        raw_kb = payload_kb(df[['timestamp', 'close']])
+        for kind in ('line', 'candles'):
+            chart, cold = timed(lambda: chart_frame(symbol, kind=kind))
+            _, warm = timed(lambda: chart_frame(symbol, kind=kind))
+            # Zoom into the last 1% of history: re-queried at full resolution for that range
+            lo = str(df['timestamp'].iloc[-max(n // 100, 2)])
+            zoomed, zoom_ms = timed(lambda: chart_frame(symbol, lo, None, kind=kind))
+            print(f"{n:>10,} {kind:>8} {raw_kb:>9.0f} {len(chart):>6} {payload_kb(chart):>6.0f} {cold:>8.1f} "
+                  f"{warm:>9.3f} {len(zoomed):>8} {zoom_ms:>8.1f}")
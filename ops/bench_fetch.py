@@ -0,0 +1,36 @@
+# ops/bench_fetch.py (Sequential fetch_ohlc loop vs concurrent fetch_many, offline)
+# Usage: python ops/bench_fetch.py [latency_seconds]
+import sys
+import time
+
+sys.path.append('src')
+
+from ingest.fake_provider import FakeProvider  # noqa: E402
+from ingest.ohlc_fetcher import fetch_many, fetch_ohlc  # noqa: E402
+
+SYMBOLS = ['DXY', 'XAUUSD', 'ES', 'NQ', 'EURUSD', 'GBPUSD']
+
+
+def chain(latency: float):
+    # Primary provider misses two symbols, which fall back to a batch-capable provider
+    primary = FakeProvider(name='Primary', latency=latency, fail_symbols={'EURUSD', 'GBPUSD'})
+    fallback = FakeProvider(name='Fallback', latency=latency, batch=True)
+    return [primary, fallback]
+
+
+if __name__ == '__main__':
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+
+    providers = chain(latency)
+    t0 = time.perf_counter()
+    for s in SYMBOLS:
+        fetch_ohlc(s, days=2000, providers=providers)
+    t_seq = time.perf_counter() - t0
+    print(f"sequential fetch_ohlc: {t_seq:.2f}s, {sum(p.requests for p in providers)} requests")
+
+    providers = chain(latency)
+    t0 = time.perf_counter()
+    frames = fetch_many(SYMBOLS, days=2000, providers=providers)
+    t_many = time.perf_counter() - t0
+    print(f"fetch_many:            {t_many:.2f}s, {sum(p.requests for p in providers)} requests, "
+          f"{len(frames)}/{len(SYMBOLS)} symbols (slowest single symbol ≈ {2 * latency:.2f}s)")
@@ -0,0 +1,81 @@
+# ops/bench_intraday.py (1-minute store at 10M rows: ingest, range queries, resampling)
+# Usage: python ops/bench_intraday.py [total_rows]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+_tmp = tempfile.mkdtemp(prefix='bench_intraday_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+sys.path.append('src')
+
+from storage import intraday  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+TOTAL_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+SYMBOLS = ['ES', 'NQ', 'EURUSD', 'GBPUSD']
+START = '2019-01-01'
+RANGES = {'1 day': pd.Timedelta(days=1), '1 week': pd.Timedelta(weeks=1),
+          '1 month': pd.Timedelta(days=30), '1 year': pd.Timedelta(days=365)}
+
+
+def timed(fn, repeats: int = 1):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - t0)
+    return out, float(np.median(samples))
+
+
+def pandas_resample(df: pd.DataFrame, bar_size: str) -> pd.DataFrame:
+    rule = 'D' if bar_size == '1D' else bar_size
+    out = df.set_index('timestamp').resample(rule).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return out.dropna(subset=['close'])
+
+
+if __name__ == '__main__':
+    per_symbol = TOTAL_ROWS // len(SYMBOLS)
+    print(f"{len(SYMBOLS)} symbols x {per_symbol:,} 1-minute bars = {per_symbol * len(SYMBOLS):,} rows\n")
+
+    # -- ingest: full backfill per symbol, then one day of new bars ------------
+    t_ingest = 0.0
+    for i, symbol in enumerate(SYMBOLS):
+        df = synthetic_ohlc(symbol, per_symbol + 1440, start=START, freq='min', seed=i)
+        history, new_day = df.iloc[:per_symbol], df.iloc[per_symbol:]
+        _, t = timed(lambda: intraday.upsert_bars(history))
+        t_ingest += t
+        if symbol == SYMBOLS[0]:
+            reference, last_day = history, new_day
+        del df, history
+    n_months = len(intraday.months(SYMBOLS[0]))
+    print(f"backfill ingest   : {t_ingest:6.1f}s ({TOTAL_ROWS / t_ingest / 1e6:.1f}M rows/s), "
+          f"{n_months} month partitions per symbol")
+
+    # -- range queries ---------------------------------------------------------
+    last = intraday.latest_timestamp(SYMBOLS[0])
+    for name, span in RANGES.items():
+        bars, t = timed(lambda: intraday.load_bars(SYMBOLS[0], str(last - span), str(last)), repeats=5)
+        print(f"range {name:<8}    : {t * 1000:8.2f} ms  ({len(bars):,} bars)")
+    bars, t = timed(lambda: intraday.load_bars(SYMBOLS[0]), repeats=3)
+    print(f"range full        : {t * 1000:8.2f} ms  ({len(bars):,} bars)")
+
+    # -- resampling: cold, cached, after an append -----------------------------
+    print()
+    for bar_size in ('5min', '1h', '1D'):
+        cold, t_cold = timed(lambda: intraday.resample(SYMBOLS[0], bar_size))
+        _, t_warm = timed(lambda: intraday.resample(SYMBOLS[0], bar_size), repeats=5)
+        ref, t_pandas = timed(lambda: pandas_resample(reference, bar_size))
+        exact = (len(ref) == len(cold) and np.array_equal(cold['timestamp'].to_numpy(), ref.index.to_numpy())
+                 and np.allclose(cold[['open', 'high', 'low', 'close', 'volume']].to_numpy(), ref.to_numpy()))
+        print(f"resample {bar_size:<5}    : cold {t_cold * 1000:7.1f} ms | cached {t_warm * 1000:6.2f} ms | "
+              f"pandas .resample {t_pandas * 1000:7.1f} ms | {len(cold):,} bars | matches pandas: {exact}")
+
+    _, t_append = timed(lambda: intraday.upsert_bars(last_day))
+    _, t_after = timed(lambda: intraday.resample(SYMBOLS[0], '5min'))
+    print(f"\nappend 1 day      : {t_append * 1000:7.1f} ms; re-resample 5min afterwards {t_after * 1000:.1f} ms "
+          f"(only the touched month is rebuilt)")
@@ -0,0 +1,77 @@
+# ops/bench_load.py (Load latency: SQLite rows vs memory-mapped columnar backend)
+# Usage: python ops/bench_load.py [bars_per_symbol ...]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+_tmp = tempfile.mkdtemp(prefix='bench_load_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+os.environ['COLUMNAR_DIR'] = os.path.join(_tmp, 'columnar')
+sys.path.append('src')
+sys.path.append('.')
+
+import storage.db_manager as db  # noqa: E402
+from migrate import migrate_to_columnar  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+SIZES = [1_300, 100_000]  # ~5y of daily bars; ~1y of minute bars
+N_SYMBOLS = 6
+REPEATS = 20
+
+
+def timed(fn, repeats: int = REPEATS) -> float:
+    """Median ms; panel loads drop the cache first so each call really reads storage."""
+    samples = []
+    for _ in range(repeats):
+        db._panel_cache.clear()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples)) * 1e3
+
+
+def cases(symbols, recent: str):
+    return {
+        'load_ohlc full history': lambda: db.load_ohlc(symbols[0], '1900-01-01'),
+        'load_ohlc recent range': lambda: db.load_ohlc(symbols[0], recent),
+        f'load_panel {len(symbols)} symbols': lambda: db.load_panel(symbols, '1900-01-01', ('close',)),
+        f'latest_timestamps x{len(symbols)}': lambda: db.latest_timestamps(symbols),
+    }
+
+
+if __name__ == '__main__':
+    db.init_storage()
+    for n_bars in [int(a) for a in sys.argv[1:]] or SIZES:
+        freq = 'D' if n_bars < 10_000 else 'min'
+        symbols = [f'B{n_bars}_{i}' for i in range(N_SYMBOLS)]
+        frames = [synthetic_ohlc(s, n_bars, freq=freq, seed=i) for i, s in enumerate(symbols)]
+        db.BACKEND = 'sqlite'
+        db.bulk_upsert_ohlc(frames)
+        t0 = time.perf_counter()
+        migrate_to_columnar()
+        t_migrate = time.perf_counter() - t0
+        recent = str(frames[0]['timestamp'].iloc[-n_bars // 5])  # last fifth of the history
+
+        results = {}
+        for backend in ('sqlite', 'columnar'):
+            db.BACKEND = backend
+            results[backend] = {name: timed(fn) for name, fn in cases(symbols, recent).items()}
+
+        db.BACKEND = 'sqlite'
+        a = db.load_ohlc(symbols[0], '1900-01-01')
+        sqlite_panel = db.load_panel(symbols, '1900-01-01', ('close',))['close'].to_numpy()
+        db.BACKEND = 'columnar'
+        b = db.load_ohlc(symbols[0], '1900-01-01')
+        columnar_panel = db.load_panel(symbols, '1900-01-01', ('close',))['close'].to_numpy()
+        same = (np.array_equal(a['timestamp'].to_numpy('datetime64[ns]'), b['timestamp'].to_numpy('datetime64[ns]'))
+                and np.array_equal(a['close'], b['close'])
+                and np.array_equal(sqlite_panel, columnar_panel, equal_nan=True))
+
+        print(f"\n{N_SYMBOLS} symbols x {n_bars} bars ({freq}) | migrate {t_migrate:.2f}s | identical data: {same}")
+        print(f"{'':>28} {'sqlite ms':>10} {'columnar ms':>12} {'speedup':>8}")
+        for name in results['sqlite']:
+            s, c = results['sqlite'][name], results['columnar'][name]
+            print(f"{name:>28} {s:10.2f} {c:12.3f} {s / c:7.0f}x")
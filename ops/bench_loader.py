@@ -0,0 +1,75 @@
+# ops/bench_loader.py (OHLC loaders: read_sql frame vs compact streaming load vs window-by-window walk)
+# Usage: python ops/bench_loader.py [n_bars] [chunk_rows]
+# One symbol of 1-minute bars quoted in 0.25 ticks (so prices narrow to float32 losslessly). Peak is
+# the tracemalloc high-water mark of Python and numpy allocations during the call, in a second
+# pass so timing runs without tracing overhead.
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_loader_'), 'bench.db')
+sys.path.append('src')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from storage.db_manager import bulk_upsert_ohlc, init_storage, load_ohlc  # noqa: E402
+from storage.stream import iter_ohlc_windows, load_ohlc_compact  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+N_BARS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+CHUNK_ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+WINDOW = 100_000
+
+
+def current_loader() -> pd.DataFrame:
+    # What the app did with it: re-parse timestamps, drop missing closes, sort (each a copy)
+    df = load_ohlc('ES', '1900-01-01')
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.dropna(subset=['close']).sort_values('timestamp').reset_index(drop=True)
+
+
+def compact_loader() -> pd.DataFrame:
+    return load_ohlc_compact('ES', '1900-01-01', chunk_rows=CHUNK_ROWS).to_frame()
+
+
+def windowed_walk() -> float:
+    # Consumer that only needs one window at a time: mean close per window
+    return float(np.mean([w['close'].mean() for w in iter_ohlc_windows('ES', WINDOW, chunk_rows=CHUNK_ROWS)]))
+
+
+def run(label: str, fn) -> None:
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    del out
+    tracemalloc.start()
+    out = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    held = out.memory_usage(deep=True).sum() if isinstance(out, pd.DataFrame) else 0
+    print(f"{label:<40} {elapsed:7.2f}s   peak {peak / 2 ** 20:8.1f} MB   result {held / 2 ** 20:7.1f} MB")
+
+
+if __name__ == '__main__':
+    init_storage()
+    bars = synthetic_ohlc('ES', N_BARS, start='2020-01-01', freq='min', source='Polygon')
+    # The generator's per-bar volatility is daily-sized; damp it (monotone, keeps OHLC order) to ES-like levels
+    prices = ['open', 'high', 'low', 'close']
+    bars[prices] = (4500 * (bars[prices] / 100) ** 0.05 * 4).round() / 4
+    bars['volume'] = bars['volume'].round()
+    t0 = time.perf_counter()
+    bulk_upsert_ohlc(bars)
+    print(f"{N_BARS:,} bars stored in {time.perf_counter() - t0:.1f}s; chunks of {CHUNK_ROWS:,} rows\n")
+    del bars
+
+    run("load_ohlc + app copies (read_sql)", current_loader)
+    run("load_ohlc_compact (streamed)", compact_loader)
+    run(f"iter_ohlc_windows ({WINDOW:,}-bar windows)", windowed_walk)
+
+    a, b = current_loader(), compact_loader()
+    assert len(a) == len(b) and (a['timestamp'].to_numpy() == b['timestamp'].to_numpy()).all()
+    assert np.array_equal(a['close'].to_numpy(), b['close'].to_numpy(dtype='float64'))
+    print(f"\ncompact dtypes: {', '.join(f'{c} {t}' for c, t in b.dtypes.astype(str).items())}")
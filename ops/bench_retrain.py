@@ -0,0 +1,56 @@
+# ops/bench_retrain.py (Daily incremental retrain vs full refit)
+# Usage: python ops/bench_retrain.py [n_days]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+_tmp = tempfile.mkdtemp(prefix='bench_retrain_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+sys.path.append(os.path.abspath('src'))
+os.chdir(_tmp)  # model artifacts land in the temp dir, not the repo
+
+from models.train import retrain_model, train_model  # noqa: E402
+from storage.db_manager import init_storage, store_ohlc  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+SYMBOL, REFERENCE = 'ES', 'DXY'
+N_BARS = 1300  # ~5 years of business days
+N_DAYS = 10
+
+
+def add_bars(n_bars: int) -> None:
+    # Prefix-stable synthetic history: a longer series only appends bars
+    for seed, symbol in enumerate([REFERENCE, SYMBOL]):
+        store_ohlc(synthetic_ohlc(symbol, n_bars, start='2020-01-01', freq='B', seed=seed))
+
+
+if __name__ == '__main__':
+    init_storage()
+    n_days = int(sys.argv[1]) if len(sys.argv) > 1 else N_DAYS
+    add_bars(N_BARS)
+    train_model(SYMBOL)
+
+    full_ms, incr_ms, modes = [], [], []
+    for day in range(1, n_days + 1):
+        add_bars(N_BARS + day)
+        t0 = time.perf_counter()
+        metrics = retrain_model(SYMBOL)
+        incr_ms.append((time.perf_counter() - t0) * 1e3)
+        modes.append(metrics['mode'])
+        if day <= 3:  # a few full refits are enough for the baseline
+            t0 = time.perf_counter()
+            full = train_model(SYMBOL)
+            full_ms.append((time.perf_counter() - t0) * 1e3)
+            retrain_model(SYMBOL)  # resume the incremental chain from the full fit
+        print(f"day {day:>3}: {metrics['mode']:<11} {incr_ms[-1]:8.1f} ms  "
+              f"live acc {metrics.get('live_accuracy', float('nan')):.3f}  timings {metrics['timings']}")
+
+    incremental = [ms for ms, mode in zip(incr_ms, modes) if mode == 'incremental']
+    print(f"\nfull refit      : median {np.median(full_ms):8.1f} ms ({len(full_ms)} runs)")
+    if incremental:
+        print(f"incremental     : median {np.median(incremental):8.1f} ms ({len(incremental)} runs) "
+              f"-> {np.median(incremental) / np.median(full_ms):.1%} of a full refit")
+    print(f"fell back to full refit on {modes.count('full')}/{len(modes)} days (drift)")
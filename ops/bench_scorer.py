@@ -0,0 +1,109 @@
+# ops/bench_scorer.py (Pickled RandomForest vs compiled array scorer: exactness, load time, size, memory, latency)
+# Usage: python ops/bench_scorer.py [n_samples]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_scorer_'), 'bench.db')
+sys.path.append('src')
+
+import joblib  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+from models.compiled import CompiledForest, SklearnForest  # noqa: E402
+from models.train import export_compiled  # noqa: E402
+
+N_SAMPLES = 1300   # ~5 years of daily feature rows, as train_model sees them
+FEATURES = ['volatility', 'momentum_5d', 'corr_dxy', 'macro_rate']
+REPEATS = 50
+
+
+def fit_forest(n_samples: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, len(FEATURES))) * [0.15, 0.02, 0.3, 0.01] + [0.15, 0.0, 0.0, 5.33]
+    y = (rng.random(n_samples) < 0.5 + 5 * X[:, 1]).astype(int)  # weak momentum signal plus noise
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+def timed(fn, repeats: int = REPEATS) -> float:
+    """Median wall time in ms."""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples)) * 1e3
+
+
+def load_stats(fn):
+    """(median load ms, peak traced MB while loading)."""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timed(fn, 10), peak / 1e6
+
+
+def sklearn_free(path: str) -> bool:
+    """Load + score the compiled file in a fresh interpreter and check sklearn never got imported."""
+    code = ("import sys; sys.path.append('src'); import numpy as np; "
+            "from models.compiled import CompiledForest; "
+            f"f = CompiledForest.load({path!r}); f.predict_proba(f.transform(np.zeros((1, {len(FEATURES)})))); "
+            "print('sklearn' in sys.modules)")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return out.stdout.strip() == 'False'
+
+
+if __name__ == '__main__':
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else N_SAMPLES
+    model, scaler, X = fit_forest(n_samples)
+    workdir = tempfile.mkdtemp(prefix='bench_scorer_models_')
+    paths = {'model': os.path.join(workdir, 'rf.joblib'), 'scaler': os.path.join(workdir, 'scaler.joblib'),
+             'compiled': os.path.join(workdir, 'rf.npz')}
+    joblib.dump(model, paths['model'])
+    joblib.dump(scaler, paths['scaler'])
+    export_compiled(model, scaler, paths['compiled'], FEATURES)
+
+    pickled = SklearnForest(joblib.load(paths['model']), joblib.load(paths['scaler']))
+    compiled = CompiledForest.load(paths['compiled'])
+    n_nodes = sum(est.tree_.node_count for est in model.estimators_)
+    print(f"forest: {model.n_estimators} trees, {n_nodes} nodes, max depth {compiled.max_depth}, "
+          f"trained on {n_samples} rows")
+
+    # Exactness on in-sample rows plus fresh draws, including values sitting exactly on split thresholds
+    rng = np.random.default_rng(1)
+    probe = np.vstack([X, X[rng.integers(0, len(X), 5000)] * rng.normal(1.0, 0.5, (5000, len(FEATURES)))])
+    on_split = np.repeat(scaler.transform(X[:1]), 64, axis=0)
+    cols = rng.integers(0, len(FEATURES), 64)
+    on_split[np.arange(64), cols] = [compiled.threshold[compiled.feature == c][0] for c in cols]
+    scaled = np.vstack([scaler.transform(probe), on_split])
+    reference = model.predict_proba(scaled)
+    for name, scorer in (('pickled fast path', pickled), ('compiled', compiled)):
+        got = scorer.predict_proba(scaled)
+        print(f"{name:>18}: bit-identical to predict_proba on {len(scaled)} rows: {np.array_equal(got, reference)} "
+              f"(max abs diff {np.abs(got - reference).max():.1e})")
+    print(f"{'compiled':>18}: transform == StandardScaler.transform: "
+          f"{np.array_equal(compiled.transform(probe), scaler.transform(probe))}")
+
+    size_pickled = (os.path.getsize(paths['model']) + os.path.getsize(paths['scaler'])) / 1e6
+    size_compiled = os.path.getsize(paths['compiled']) / 1e6
+    load_pickled, mem_pickled = load_stats(lambda: (joblib.load(paths['model']), joblib.load(paths['scaler'])))
+    load_compiled, mem_compiled = load_stats(lambda: CompiledForest.load(paths['compiled']))
+    print(f"\n{'':>18}  {'file MB':>8}  {'load ms':>8}  {'peak MB':>8}")
+    print(f"{'joblib pickle':>18}  {size_pickled:8.2f}  {load_pickled:8.2f}  {mem_pickled:8.2f}")
+    print(f"{'compiled npz':>18}  {size_compiled:8.2f}  {load_compiled:8.2f}  {mem_compiled:8.2f}")
+
+    print(f"\n{'latency ms':>18}  {'1 row':>8}  {'100 rows':>8}")
+    for name, fn in (('predict_proba', model.predict_proba), ('pickled fast path', pickled.predict_proba),
+                     ('compiled', compiled.predict_proba)):
+        print(f"{name:>18}  {timed(lambda: fn(scaled[:1])):8.2f}  {timed(lambda: fn(scaled[:100])):8.2f}")
+
+    print(f"\ncompiled load + score without importing sklearn: {sklearn_free(paths['compiled'])}")
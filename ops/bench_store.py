@@ -0,0 +1,63 @@
+# ops/bench_store.py (Rows/sec for the bulk OHLC upsert path)
+# Usage: python ops/bench_store.py [n_bars ...]
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix='bench_store_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+sys.path.append('src')
+
+from sqlalchemy import text  # noqa: E402
+from storage.db_manager import bulk_upsert_ohlc, engine, init_storage  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+LEGACY_MAX_BARS = 100_000  # row-at-a-time baseline gets too slow beyond this
+
+
+def legacy_store(df) -> None:
+    # Pre-bulk store_ohlc: one INSERT OR REPLACE per iterrows() row
+    with engine.connect() as conn:
+        upsert_sql = text("""
+            INSERT OR REPLACE INTO raw_ohlc (symbol, timestamp, open, high, low, close, volume, source)
+            VALUES (:symbol, :timestamp, :open, :high, :low, :close, :volume, :source)
+        """)
+        for _, row in df.iterrows():
+            conn.execute(upsert_sql, row.to_dict())
+        conn.commit()
+
+
+def bench(n_bars: int) -> None:
+    # Spread the bars over 6 symbols like the default ASSETS list
+    symbols = [f'S{n_bars}_{i}' for i in range(6)]
+    frames = {s: synthetic_ohlc(s, n_bars // 6 + (i < n_bars % 6), seed=i, freq='min')
+              for i, s in enumerate(symbols)}
+
+    t0 = time.perf_counter()
+    cold = bulk_upsert_ohlc(frames)
+    t_cold = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    warm = bulk_upsert_ohlc(frames)
+    t_warm = time.perf_counter() - t0
+
+    print(f"{n_bars:>9,} bars | insert {n_bars / t_cold:>10,.0f} rows/s ({t_cold:6.2f}s) {cold} | "
+          f"re-upsert {n_bars / t_warm:>10,.0f} rows/s ({t_warm:6.2f}s) {warm}")
+
+    if n_bars <= LEGACY_MAX_BARS:
+        legacy = [f.assign(symbol='L' + s, timestamp=f['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+                  for s, f in frames.items()]
+        t0 = time.perf_counter()
+        for f in legacy:
+            legacy_store(f)
+        t_legacy = time.perf_counter() - t0
+        print(f"{'':>9} legacy  {n_bars / t_legacy:>10,.0f} rows/s ({t_legacy:6.2f}s)")
+
+
+if __name__ == '__main__':
+    init_storage()
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        bench(n)
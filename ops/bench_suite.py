@@ -0,0 +1,177 @@
+# ops/bench_suite.py (Offline benchmark suite: synthetic bars, fake provider clients, JSON history, regression gate)
+# Usage: python ops/bench_suite.py [--symbols A,B,...] [--bars N] [--freq B] [--repeats N] [--only name,...]
+#                                  [--history PATH] [--threshold 0.25] [--baseline N] [--no-record] [--no-gate]
+# Every run starts from an empty temp DB and model dir, so numbers only depend on the code and the machine.
+# Each benchmark is the best of --repeats (the least disturbed run: on a shared box the median of the
+# threaded fetch swings by a third between identical runs). The gate compares it with the median of the
+# last --baseline recorded runs of the same configuration and exits 1 when one is more than --threshold slower.
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_tmp = tempfile.mkdtemp(prefix='bench_suite_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+os.environ.setdefault('PROVIDER_CACHE', '0')  # time the fetch path itself; ops/bench_response_cache.py covers the cache
+sys.path[:0] = [os.path.join(REPO, 'src'), os.path.join(REPO, 'ops')]
+
+
+def _arg(name: str, default, cast=str):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+DEFAULT_SYMBOLS = ['DXY', 'XAUUSD', 'ES', 'NQ', 'EURUSD', 'GBPUSD']
+HISTORY_PATH = os.path.abspath(_arg('--history', os.getenv('BENCH_HISTORY',
+                                                          os.path.join(REPO, 'data', 'bench_history.json'))))
+REGRESSION_THRESHOLD = 0.25   # fractional slowdown vs baseline that fails the gate
+NOISE_FLOOR_MS = 1.0          # differences below this are never a regression (timer and scheduler noise)
+BASELINE_RUNS = 5             # recorded runs the baseline median is taken over
+START = '2020-01-01'          # features and models only read bars from HISTORY_START on
+
+
+def timed(fn: Callable, repeats: int, setup: Optional[Callable] = None) -> float:
+    """Best wall time of fn() in ms; setup() runs untimed before each repeat. Prints are swallowed."""
+    samples = []
+    for i in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup:
+                setup(i)
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1e3)
+    return min(samples)
+
+
+def run_suite(symbols: List[str], n_bars: int, freq: str, repeats: int, only: Optional[set] = None) -> Dict[str, float]:
+    """{benchmark: best ms}. Data goes in through the real fetch → store path, served by the fake clients."""
+    from backtest import simple_backtest
+    from features.engineer import engineer_features
+    from ingest.fake_clients import FakeMarket, fake_clients
+    from ingest.ohlc_fetcher import fetch_many
+    from models.infer import infer_signal
+    from models.registry import invalidate
+    from models.train import train_model
+    from storage.db_manager import engine, init_storage, load_ohlc, store_ohlc
+    from utils.synthetic import synthetic_universe
+
+    init_storage()
+    symbol = symbols[0]
+    universe = synthetic_universe(symbols, n_bars, start=START, freq=freq)
+    end = str(universe['timestamp'].max() + (universe['timestamp'].iloc[1] - universe['timestamp'].iloc[0]))
+    wanted = lambda name: only is None or name in only  # noqa: E731
+    results = {}
+
+    with fake_clients(FakeMarket(start=START, end=end)):
+        if wanted('fetch_many'):
+            results['fetch_many'] = timed(lambda: fetch_many(symbols, start=START), repeats)
+        with contextlib.redirect_stdout(io.StringIO()):
+            store_ohlc(universe)  # the data every later benchmark reads
+
+    if wanted('store_ohlc'):
+        # Cold inserts of the whole universe, under fresh names each repeat
+        frames = {}
+        results['store_ohlc'] = timed(lambda: store_ohlc(frames['df']), repeats,
+                                      setup=lambda i: frames.update(df=universe.assign(symbol=universe['symbol'] + f'_{i}')))
+    if wanted('load_ohlc'):
+        results['load_ohlc'] = timed(lambda: load_ohlc(symbol, START), repeats)
+
+    def drop_feature_state(_):
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM feature_state WHERE symbol = ?", (symbol,))
+
+    if wanted('engineer_features'):
+        results['engineer_features'] = timed(lambda: engineer_features(symbol), repeats, setup=drop_feature_state)
+    if wanted('engineer_features_cached'):
+        results['engineer_features_cached'] = timed(lambda: engineer_features(symbol), repeats)
+    if wanted('train_model'):
+        results['train_model'] = timed(lambda: train_model(symbol), repeats)
+    if wanted('infer_signal'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            train_model(symbol)  # scoring only, never an inline fit
+        # Cold: artifacts loaded from disk and scored; cached: the (bar, version) memo
+        results['infer_signal'] = timed(lambda: infer_signal(symbol), repeats, setup=lambda _: invalidate(symbol))
+        results['infer_signal_cached'] = timed(lambda: infer_signal(symbol), repeats)
+    if wanted('simple_backtest'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            feats = engineer_features(symbol)
+        results['simple_backtest'] = timed(lambda: simple_backtest(symbol, feats), repeats)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def baseline(history: List[dict], config: dict, n_runs: int = BASELINE_RUNS) -> Dict[str, float]:
+    """Per-benchmark median over the last n_runs recorded runs with the same configuration."""
+    runs = [h['results'] for h in history if h['config'] == config][-n_runs:]
+    names = {name for r in runs for name in r}
+    return {name: statistics.median(r[name] for r in runs if name in r) for name in names}
+
+
+def regressions(results: Dict[str, float], base: Dict[str, float], threshold: float) -> Dict[str, float]:
+    """{benchmark: slowdown fraction} for the ones over threshold (and over the noise floor)."""
+    return {name: ms / base[name] - 1 for name, ms in results.items()
+            if name in base and ms > base[name] * (1 + threshold) and ms - base[name] > NOISE_FLOOR_MS}
+
+
+if __name__ == '__main__':
+    symbols = _arg('--symbols', ','.join(DEFAULT_SYMBOLS)).split(',')
+    n_bars = _arg('--bars', 1300, int)
+    freq = _arg('--freq', 'B')
+    repeats = _arg('--repeats', 5, int)
+    only = set(_arg('--only', '').split(',')) - {''} or None
+    threshold = _arg('--threshold', REGRESSION_THRESHOLD, float)
+    n_baseline = _arg('--baseline', BASELINE_RUNS, int)
+    os.chdir(_tmp)  # model artifacts land in the temp dir, not the repo
+
+    config = {'symbols': symbols, 'bars': n_bars, 'freq': freq, 'repeats': repeats,
+              'python': platform.python_version(), 'machine': f"{platform.machine()}/{os.cpu_count()}cpu"}
+    results = run_suite(symbols, n_bars, freq, repeats, only)
+    history = load_history(HISTORY_PATH)
+    base = baseline(history, config, n_baseline)
+    slow = regressions(results, base, threshold)
+
+    print(f"{len(symbols)} symbols x {n_bars:,} bars ({freq}), best of {repeats}; "
+          f"baseline: {len([h for h in history if h['config'] == config][-n_baseline:])} run(s)\n")
+    print(f"{'benchmark':<26} {'ms':>10} {'baseline':>10} {'change':>8}")
+    for name, ms in results.items():
+        ref = base.get(name)
+        change = f"{ms / ref - 1:+8.0%}" if ref else f"{'new':>8}"
+        print(f"{name:<26} {ms:>10.2f} {ref if ref else float('nan'):>10.2f} {change}{'  REGRESSION' if name in slow else ''}")
+
+    if '--no-record' not in sys.argv:
+        import pandas as pd
+
+        history.append({'timestamp': pd.Timestamp.now(tz='UTC').isoformat(timespec='seconds'), 'commit': _git_commit(),
+                        'config': config, 'results': {k: round(v, 3) for k, v in results.items()},
+                        'regressions': sorted(slow)})
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, 'w') as f:
+            json.dump(history, f, indent=1)
+        print(f"\nRecorded in {HISTORY_PATH}")
+
+    if slow and '--no-gate' not in sys.argv:
+        print(f"\nRegression gate FAILED (> {threshold:.0%} slower than baseline): "
+              + ", ".join(f"{name} {frac:+.0%}" for name, frac in slow.items()))
+        sys.exit(1)
+    print("Regression gate ok" if base else "No baseline yet for this configuration; gate skipped")
@@ -0,0 +1,50 @@
+# ops/bench_train.py (Sequential train_model loop vs the process-pool training orchestrator)
+# Usage: python ops/bench_train.py [cpu_budget ...]
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix='bench_train_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'bench.db')
+sys.path.append(os.path.abspath('src'))
+os.chdir(_tmp)  # model artifacts land in the temp dir, not the repo
+
+from models.orchestrator import train_many  # noqa: E402
+from models.registry import latest_records  # noqa: E402
+from models.train import train_model  # noqa: E402
+from storage.db_manager import init_storage, store_ohlc  # noqa: E402
+from utils.config import ASSETS  # noqa: E402
+from utils.synthetic import synthetic_ohlc  # noqa: E402
+
+N_BARS = 1300  # ~5 years of business days
+
+
+def seed_data() -> None:
+    for i, symbol in enumerate(ASSETS):
+        store_ohlc(synthetic_ohlc(symbol, N_BARS, start='2020-01-01', freq='B', seed=i))
+
+
+if __name__ == '__main__':
+    init_storage()
+    budgets = [int(a) for a in sys.argv[1:]] or sorted({1, 2, os.cpu_count() or 1})
+    seed_data()
+    for symbol in ASSETS:  # warm the feature store so both paths time training only
+        train_model(symbol)
+
+    t0 = time.perf_counter()
+    sequential = {s: train_model(s) for s in ASSETS}
+    t_seq = time.perf_counter() - t0
+    print(f"\nsequential train_model x{len(ASSETS)}: {t_seq:.2f}s")
+
+    for budget in budgets:
+        t0 = time.perf_counter()
+        parallel = train_many(ASSETS, cpu_budget=budget)
+        t_par = time.perf_counter() - t0
+        same = all(parallel[s]['cv_accuracy'] == sequential[s]['cv_accuracy'] for s in ASSETS)
+        print(f"train_many cpu_budget={budget:<3}: {t_par:.2f}s | speedup {t_seq / t_par:4.2f}x "
+              f"(ideal {min(budget, os.cpu_count() or 1)}x) | same CV scores: {same}")
+
+    print(f"\n(os.cpu_count() = {os.cpu_count()})  stage timings recorded in model_metadata, ms:")
+    for symbol, record in latest_records(ASSETS).items():
+        print(f"  {symbol:>7} v{record.version}: {record.metrics.get('timings')}")
@@ -0,0 +1,88 @@
+# ops/import_budget.py (Cold-start import cost of the app's entry modules, measured with -X importtime)
+# Usage: python ops/import_budget.py [--runs N] [--verbose]
+# Exits 1 when a module goes over its budget, pulls in a deferred dependency, or has import-time
+# side effects (creates the DB / model dir, configures logging).
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# Cumulative import time budget per module (ms, median of fresh interpreters), roughly 1.5x what
+# they cost when the budget was set. numpy + pandas + sqlalchemy alone are most of it.
+BUDGETS_MS = {
+    'storage.db_manager': 1000,
+    'ingest.ohlc_fetcher': 550,
+    'features.engineer': 900,
+    'models.registry': 950,
+    'models.infer': 950,
+    'models.train': 950,
+    'utils.downsample': 650,
+}
+# Heavy packages that must only be imported on first use
+DEFERRED = ['sklearn', 'scipy', 'joblib', 'yfinance', 'alpha_vantage', 'polygon', 'plotly']
+
+_CHILD = """
+import json, logging, os, sys
+sys.path.insert(0, {src!r})
+sys.stderr.write('--import-budget--\\n')
+import {module}
+print(json.dumps({{
+    'deferred_loaded': sorted(m for m in {deferred!r} if m in sys.modules),
+    'db_created': os.path.exists(os.environ['DB_PATH']),
+    'dirs_created': sorted(os.listdir('.')),
+    'log_handlers': len(logging.getLogger().handlers),
+}}))
+"""
+_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module: str) -> dict:
+    """One fresh interpreter: cumulative import time of `module` and what it left behind."""
+    with tempfile.TemporaryDirectory(prefix='import_budget_') as tmp:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, 'data', 'budget.db'))
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                               _CHILD.format(src=SRC, module=module, deferred=DEFERRED)],
+                              cwd=tmp, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    lines = proc.stderr.split('--import-budget--\n', 1)[1].splitlines()
+    entries = [(int(m.group(2)), len(m.group(3)), m.group(4)) for m in map(_LINE.match, lines) if m]
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # Indent of the package name: one space = imported by the -c line itself, three = one level down
+    result['total_ms'] = sum(us for us, indent, _ in entries if indent == 1) / 1000
+    result['top'] = sorted(((us, name) for us, indent, name in entries if indent == 3), reverse=True)[:6]
+    return result
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[sys.argv.index('--runs') + 1]) if '--runs' in sys.argv else 5
+    verbose = '--verbose' in sys.argv
+    failures = []
+    print(f"{'module':<22} {'median ms':>10} {'budget':>8}  status")
+    for module, budget in BUDGETS_MS.items():
+        samples = [measure(module) for _ in range(runs)]
+        median = statistics.median(s['total_ms'] for s in samples)
+        last = samples[-1]
+        problems = []
+        if median > budget:
+            problems.append(f"over budget by {median - budget:.0f} ms")
+        if last['deferred_loaded']:
+            problems.append(f"imports {', '.join(last['deferred_loaded'])} eagerly")
+        if last['db_created'] or last['dirs_created']:
+            problems.append(f"creates {'the DB' if last['db_created'] else ', '.join(last['dirs_created'])} on import")
+        if last['log_handlers']:
+            problems.append("configures root logging on import")
+        print(f"{module:<22} {median:>10.0f} {budget:>8}  {'; '.join(problems) or 'ok'}")
+        if verbose:
+            for us, name in last['top']:
+                print(f"{'':<24}{us / 1000:>8.0f} ms  {name}")
+        failures += [f"{module}: {p}" for p in problems]
+    if failures:
+        print("\nImport budget FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nImport budget ok")
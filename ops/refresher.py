@@ -0,0 +1,131 @@
+# ops/refresher.py (Background refresh daemon: ingest → features → models → signals, off the page path)
+# Usage: python ops/refresher.py [--once] [--interval SECONDS]
+# The dashboard only reads what this writes (raw_ohlc, the intraday store, macro series, features, models, signals),
+# so no page load ever waits on a provider or a fit. One instance per DB (lock file next to it).
+import fcntl
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils import tracing  # noqa: E402
+from utils.config import ASSETS, DB_PATH, INTRADAY_ASSETS, METRICS_PATH, REFRESH_INTERVAL  # noqa: E402
+
+_stop = threading.Event()
+
+
+def _models_to_train(symbols: List[str], changed: set) -> Dict[str, List[str]]:
+    """Symbols without a usable model (full fit) and symbols with new bars (incremental update)."""
+    from features.engineer import FEATURE_VERSION
+    from models.infer import MIN_HISTORY
+    from models.registry import has_artifacts, latest_records
+    from storage.db_manager import load_latest_features
+
+    latest = load_latest_features(symbols, FEATURE_VERSION)
+    ready = [s for s in symbols if s in latest.index and latest.at[s, 'n_rows'] >= MIN_HISTORY]
+    records = latest_records(ready)
+    missing = [s for s in ready if s not in records or records[s].feature_version != FEATURE_VERSION
+               or not has_artifacts(records[s].paths)]
+    return {'full': missing, 'incremental': [s for s in ready if s in changed and s not in missing]}
+
+
+def run_cycle(symbols: List[str], providers: Optional[list] = None,
+              intraday_providers: Optional[list] = None) -> Dict[str, float]:
+    """One pass over the watchlist. Each stage is skipped cheaply when there's nothing new."""
+    from features.engineer import materialize_features
+    from ingest.macro_fetcher import refresh_macro
+    from ingest.ohlc_fetcher import refresh_intraday, refresh_many
+    from models.infer import publish_signals
+    from models.orchestrator import train_many
+    from models.train import retrain_model
+
+    timings = {}
+    t0 = time.perf_counter()
+    stats = refresh_many(symbols, providers=providers)
+    changed = {s for s, st in stats.items() if st['inserted'] or st['updated']}
+    for symbol in (s for s in INTRADAY_ASSETS if s in symbols):
+        try:
+            refresh_intraday(symbol, providers=intraday_providers)
+        except Exception as e:
+            print(f"[refresher] Intraday refresh failed for {symbol}: {e}")
+    try:
+        refresh_macro()  # at most every MACRO_REFRESH_INTERVAL; a new macro_rate release marks features stale
+    except Exception as e:
+        print(f"[refresher] Macro refresh failed: {e}")
+    t1 = time.perf_counter()
+    timings['ingest_s'] = t1 - t0
+
+    for symbol in symbols:
+        materialize_features(symbol)  # no-op unless new bars marked the symbol stale
+    t2 = time.perf_counter()
+    timings['features_s'] = t2 - t1
+
+    plan = _models_to_train(symbols, changed)
+    if plan['full']:
+        train_many(plan['full'])
+    for symbol in plan['incremental']:
+        try:
+            retrain_model(symbol)
+        except Exception as e:
+            print(f"[refresher] Retrain failed for {symbol}: {e}")
+    t3 = time.perf_counter()
+    timings['models_s'] = t3 - t2
+
+    published = publish_signals(symbols)['published']
+    timings['signals_s'] = time.perf_counter() - t3
+    print(f"[refresher] {len(changed)} symbol(s) with new bars, {len(plan['full'])} full fit(s), "
+          f"{len(plan['incremental'])} incremental, {published} signal(s) published | "
+          + ", ".join(f"{k} {v:.2f}" for k, v in timings.items()))
+    return timings
+
+
+def _acquire_lock(path: str):
+    """Exclusive non-blocking lock on `path`; None when another refresher already holds it."""
+    handle = open(path, 'w')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+
+if __name__ == '__main__':
+    once = '--once' in sys.argv
+    interval = int(sys.argv[sys.argv.index('--interval') + 1]) if '--interval' in sys.argv else REFRESH_INTERVAL
+
+    from storage.db_manager import init_storage
+
+    logging.basicConfig(level=logging.INFO)
+    init_storage()
+    lock = _acquire_lock(os.path.join(os.path.dirname(DB_PATH) or '.', 'refresher.lock'))
+    if lock is None:
+        print("[refresher] Another refresher is already running against this database")
+        sys.exit(1)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: _stop.set())
+
+    cycle = 0
+    while not _stop.is_set():
+        cycle += 1
+        started = time.monotonic()
+        try:
+            with tracing.span('refresh', 'cycle'):
+                run_cycle(list(ASSETS))
+        except Exception as e:
+            print(f"[refresher] Cycle {cycle} failed: {e}")
+        if METRICS_PATH:
+            tracing.write_metrics(METRICS_PATH)
+        if once:
+            break
+        # Fixed cadence from cycle start; a stop signal cuts the wait short
+        _stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    print(f"[refresher] Stopped after {cycle} cycle(s)")
@@ -0,0 +1,117 @@
+# src/features/asof.py (Point-in-time as-of join of macro series onto bar timestamps)
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.tracing import traced
+
+# Release dates carry no time of day, so a value counts as known from the day after its release
+KNOWN_AFTER = pd.Timedelta(days=1)
+JOIN_CACHE_SIZE = 64
+
+_steps: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}  # metric -> (version, known_at ns, value)
+_joined: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()   # (metric, version, timestamps digest) -> values
+_lock = threading.Lock()
+
+
+def _ns(values) -> np.ndarray:
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.as_unit('ns').asi8
+
+
+def known_values(dates: np.ndarray, release_dates: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Step function of what was known when, from vintages (period dates and release dates as int64 ns).
+    At each release the known value is the latest period published so far, in its newest vintage;
+    a later revision of an older period doesn't move it. Returns (known_at, value) sorted by known_at.
+    """
+    order = np.lexsort((dates, release_dates))
+    d, r, v = dates[order], release_dates[order], values[order]
+    keep = d == np.maximum.accumulate(d)
+    r, v = r[keep], v[keep]
+    last = np.r_[r[1:] != r[:-1], True]  # several rows released the same day: the latest period wins
+    return r[last] + KNOWN_AFTER.value, v[last].astype('float64')
+
+
+def asof(known_at: np.ndarray, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """Value known at each of `at` (int64 ns, any order) by binary search; NaN before the first release."""
+    if len(known_at) == 0:
+        return np.full(len(at), np.nan)
+    idx = np.searchsorted(known_at, at, side='right') - 1
+    out = values[np.maximum(idx, 0)]
+    out[idx < 0] = np.nan
+    return out
+
+
+def _series_steps(metrics: Sequence[str]) -> Dict[str, Tuple[int, np.ndarray, np.ndarray]]:
+    """Step functions for `metrics`, rebuilt only for metrics whose stored version moved."""
+    from storage.db_manager import load_macro, macro_state
+
+    versions = {m: s['version'] for m, s in macro_state(metrics).items()}
+    with _lock:
+        stale = [m for m in versions if m not in _steps or _steps[m][0] != versions[m]]
+    if stale:
+        df = load_macro(stale)
+        built = {m: (versions[m], *known_values(_ns(g['date']), _ns(g['release_date']), g['value'].to_numpy()))
+                 for m, g in df.groupby('metric', sort=False)}
+        with _lock:
+            _steps.update(built)
+    with _lock:
+        return {m: _steps[m] for m in metrics if m in versions and m in _steps and _steps[m][0] == versions[m]}
+
+
+@traced('feature')
+def macro_values(timestamps, metrics: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    {metric: value known at each timestamp} for one timestamp array, typically a whole panel's
+    bars for every symbol at once. Distinct timestamps are searched once per metric, and the
+    joined column is cached per (metric, series version, timestamps), so rebuilding features
+    on unchanged bars and series costs a hash. Metrics never ingested are left out.
+    """
+    try:
+        steps = _series_steps(list(metrics))
+    except Exception as e:
+        print(f"Macro load error: {e}")
+        return {}
+    if not steps:
+        return {}
+    at = _ns(timestamps)
+    unique, inverse = np.unique(at, return_inverse=True)
+    digest = hashlib.sha1(unique.tobytes()).hexdigest()
+    out = {}
+    for metric, (version, known_at, values) in steps.items():
+        key = (metric, version, digest)
+        with _lock:
+            joined = _joined.get(key)
+            if joined is not None:
+                _joined.move_to_end(key)
+        if joined is None:
+            joined = asof(known_at, values, unique)
+            with _lock:
+                _joined[key] = joined
+                while len(_joined) > JOIN_CACHE_SIZE:
+                    _joined.popitem(last=False)
+        out[metric] = joined[inverse]
+    return out
+
+
+def macro_column(metric: str) -> str:
+    return f"macro_{metric.lower()}"
+
+
+def attach_macro(panel: pd.DataFrame, metrics: Sequence[str]) -> pd.DataFrame:
+    """`panel` (any symbols, a `timestamp` column) plus one macro_<series> column per metric, NaN where unknown."""
+    values = macro_values(panel['timestamp'], metrics) if not panel.empty else {}
+    return panel.assign(**{macro_column(m): values.get(m, np.full(len(panel), np.nan)) for m in metrics})
+
+
+def clear_cache() -> None:
+    with _lock:
+        _steps.clear()
+        _joined.clear()
@@ -0,0 +1,171 @@
+# src/features/batch.py (Vectorized feature engine over a time x asset close panel)
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from features.engineer import (DEFAULT_WINDOW, FEATURE_COLUMNS, HISTORY_START, MOMENTUM_LAG, REFERENCE_SYMBOL,
+                               macro_rate)
+from storage.db_manager import data_version, load_panel, macro_state
+from utils.config import MACRO_RATE_SERIES
+
+_universe: Dict[tuple, Dict[str, pd.DataFrame]] = {}  # one entry: the latest universe's batch result
+_universe_lock = threading.Lock()
+
+
+def _window_diff(cs: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sums from a cumulative sum along axis 0 (NaN until a full window)."""
+    out = np.full(cs.shape, np.nan)
+    out[window - 1] = cs[window - 1]
+    out[window:] = cs[window:] - cs[:-window]
+    return out
+
+
+def _constant_windows(x: np.ndarray, window: int) -> np.ndarray:
+    """True where all values in the trailing window are identical (their variance is exactly 0)."""
+    changes = np.zeros(x.shape)
+    changes[1:] = x[1:] != x[:-1]
+    # Changes strictly inside the window: positions t-window+2 .. t
+    inside = _window_diff(np.cumsum(changes, axis=0), window - 1) if window > 1 else np.zeros(x.shape)
+    return inside == 0
+
+
+def _centred(x: np.ndarray) -> np.ndarray:
+    """Subtract each column's mean (ignoring NaN) to keep the cumulative sums well conditioned."""
+    count = np.maximum((~np.isnan(x)).sum(axis=0), 1)
+    return x - np.nansum(x, axis=0) / count
+
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Rolling standard deviation along axis 0, via cumulative sums of centred values."""
+    xc = _centred(x)
+    s1 = _window_diff(np.cumsum(xc, axis=0), window)
+    s2 = _window_diff(np.cumsum(xc * xc, axis=0), window)
+    var = (s2 - s1 * s1 / window) / (window - ddof)
+    var[_constant_windows(x, window)] = 0.0
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def rolling_corr(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """Rolling Pearson correlation along axis 0; y broadcasts against x. NaN on zero variance."""
+    y = np.broadcast_to(y, x.shape)
+    xc = _centred(x)
+    yc = _centred(y)
+    sx = _window_diff(np.cumsum(xc, axis=0), window)
+    sy = _window_diff(np.cumsum(yc, axis=0), window)
+    sxx = _window_diff(np.cumsum(xc * xc, axis=0), window)
+    syy = _window_diff(np.cumsum(yc * yc, axis=0), window)
+    sxy = _window_diff(np.cumsum(xc * yc, axis=0), window)
+    cov = sxy - sx * sy / window
+    var_x = sxx - sx * sx / window
+    var_y = syy - sy * sy / window
+    var_x[_constant_windows(x, window)] = 0.0
+    var_y[_constant_windows(y, window)] = 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.sqrt(np.maximum(var_x, 0.0) * np.maximum(var_y, 0.0))
+    corr[~np.isfinite(corr)] = np.nan
+    return corr
+
+
+def _compact(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Left-align each column's observed values so rolling windows count each asset's own bars.
+    Returns (compact values L x N, original row of each compact cell, validity mask).
+    """
+    observed = ~np.isnan(values)
+    order = np.argsort(~observed, axis=0, kind='stable')
+    length = int(observed.sum(axis=0).max()) if values.size else 0
+    rows = order[:length]
+    compact = np.take_along_axis(values, rows, axis=0)
+    valid = np.arange(length)[:, None] < observed.sum(axis=0)
+    return compact, rows, valid
+
+
+def _pct_change(compact: np.ndarray) -> np.ndarray:
+    returns = np.zeros(compact.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = compact[1:] / compact[:-1] - 1
+    return returns
+
+
+def compute_features_batch(closes: pd.DataFrame, reference: Optional[str] = REFERENCE_SYMBOL,
+                           window: int = DEFAULT_WINDOW) -> Dict[str, pd.DataFrame]:
+    """
+    Every engineer_features column for every asset at once.
+    `closes` is a timestamp x symbol panel (NaN where a symbol has no bar, as from load_panel).
+    Each asset's statistics run on its own bars, exactly like the per-symbol path; the
+    reference returns are matched by timestamp and zero where the reference has no bar.
+    Returns {feature: timestamp x symbol frame}, NaN outside each asset's observed bars.
+    """
+    values = closes.to_numpy(dtype='float64')
+    compact, rows, valid = _compact(values)
+
+    returns = _pct_change(compact)
+    returns[~valid] = np.nan
+    volatility = rolling_std(returns, window) * np.sqrt(252)
+    volatility[np.isnan(volatility)] = 0.15
+    momentum = np.zeros(compact.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        momentum[MOMENTUM_LAG:] = compact[MOMENTUM_LAG:] / compact[:-MOMENTUM_LAG] - 1
+    momentum[np.isnan(momentum)] = 0.0
+
+    if reference is not None and reference in closes.columns and closes[reference].notna().any():
+        ref_values = values[:, closes.columns.get_loc(reference)]
+        ref_rows = np.flatnonzero(~np.isnan(ref_values))
+        ref_on_panel = np.zeros(len(values))
+        ref_on_panel[ref_rows] = _pct_change(ref_values[ref_rows][:, None])[:, 0]
+        corr = rolling_corr(returns, ref_on_panel[rows], window)
+        corr[np.isnan(corr)] = 0.0
+    else:
+        corr = np.zeros(compact.shape)
+
+    cols = np.nonzero(valid)[1]
+    out_rows = rows[valid]
+    out = {}
+    for name, compact_values in [('returns', returns), ('volatility', volatility), ('momentum_5d', momentum),
+                                 ('corr_dxy', corr)]:
+        full = np.full(values.shape, np.nan)
+        full[out_rows, cols] = compact_values[valid]
+        out[name] = pd.DataFrame(full, index=closes.index, columns=closes.columns, copy=False)
+    # Point-in-time, as in compute_features: one as-of join over the panel's timestamps for every asset
+    macro = np.where(np.isnan(values), np.nan, macro_rate(closes.index)[:, None])
+    out['macro_rate'] = pd.DataFrame(macro, index=closes.index, columns=closes.columns, copy=False)
+    return out
+
+
+def to_long(features: Dict[str, pd.DataFrame], symbol: str) -> pd.DataFrame:
+    """One symbol's rows from a batch result, in engineer_features layout."""
+    observed = features['returns'][symbol].notna().to_numpy()
+    df = pd.DataFrame({'symbol': symbol, 'timestamp': features['returns'].index[observed]})
+    for name in FEATURE_COLUMNS:
+        df[name] = features[name][symbol].to_numpy()[observed]
+    return df
+
+
+def engineer_features_batch(symbols: Iterable[str], window: int = DEFAULT_WINDOW) -> Dict[str, pd.DataFrame]:
+    """engineer_features for many symbols from one panel load and one vectorized pass."""
+    symbols = list(symbols)
+    closes = load_panel(list(dict.fromkeys(symbols + [REFERENCE_SYMBOL])), HISTORY_START, ('close',))['close']
+    features = compute_features_batch(closes, REFERENCE_SYMBOL, window)
+    return {s: to_long(features, s) for s in symbols if closes[s].notna().any()}
+
+
+def universe_features(symbols: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    """
+    compute_features_batch over the close panel of `symbols`, kept for the current raw data and
+    MACRO_RATE_SERIES versions: full rebuilds of every symbol in a cycle share one vectorized pass.
+    Shared between callers like load_panel's frames: treat as read-only.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    macro_version = macro_state([MACRO_RATE_SERIES]).get(MACRO_RATE_SERIES, {}).get('version')
+    key = (tuple(symbols), data_version(), macro_version)
+    with _universe_lock:
+        if key in _universe:
+            return _universe[key]
+    closes = load_panel(symbols, HISTORY_START, ('close',))['close']
+    features = compute_features_batch(closes, REFERENCE_SYMBOL)
+    with _universe_lock:
+        _universe.clear()
+        _universe[key] = features
+    return features
@@ -0,0 +1,175 @@
+# src/features/correlation.py (Streaming sliding-window correlation matrix with persisted state)
+import hashlib
+import os
+import threading
+from collections import deque
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class RollingCorrelation:
+    """
+    Correlation matrix over the last `window` return vectors, updated in O(N²) per bar.
+    Keeps the window in a ring buffer plus running sums and cross-products; the oldest
+    vector's contribution is subtracted as each new one arrives. Sums are rebuilt from the
+    buffer once per full window so floating-point drift stays bounded. Missing returns are
+    treated as 0, matching how the feature code fills gaps. A fingerprint of the rows already
+    absorbed (the last window + history of them) catches backfilled or revised bars, which
+    trigger a replay instead of being skipped as old.
+    """
+
+    def __init__(self, symbols: Sequence[str], window: int = 252, history: int = 756):
+        self.symbols = list(symbols)
+        self.window = window
+        self.history_size = history
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        n = len(self.symbols)
+        self._buffer = np.zeros((self.window, n))
+        self._pos = 0
+        self._count = 0
+        self._sums = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._since_resync = 0
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self._seen: Optional[str] = None  # fingerprint of the rows absorbed so far
+        self._history_ts = deque(maxlen=self.history_size)
+        self._history = deque(maxlen=self.history_size)
+
+    # -- updates ----------------------------------------------------------
+
+    def update(self, timestamp: pd.Timestamp, returns: np.ndarray) -> None:
+        with self._lock:
+            self._update(pd.Timestamp(timestamp), np.nan_to_num(np.asarray(returns, dtype='float64')))
+
+    def _update(self, timestamp: pd.Timestamp, x: np.ndarray) -> None:
+        if self._count == self.window:
+            old = self._buffer[self._pos]
+            self._sums -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._buffer[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        self._sums += x
+        self._cross += np.outer(x, x)
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+        self.last_timestamp = timestamp
+        self._history_ts.append(timestamp)
+        self._history.append(self._matrix())
+
+    def _resync(self) -> None:
+        live = self._buffer if self._count == self.window else self._buffer[:self._count]
+        self._sums = live.sum(axis=0)
+        self._cross = live.T @ live
+        self._since_resync = 0
+
+    def _fingerprint(self, returns: pd.DataFrame) -> str:
+        """Hash of the rows that shape the current state: the last window + history of them."""
+        tail = returns.iloc[-(self.window + self.history_size):]
+        digest = hashlib.sha1(pd.DatetimeIndex(tail.index).as_unit('ns').asi8.tobytes())
+        digest.update(np.nan_to_num(tail.to_numpy(dtype='float64')).tobytes())
+        return digest.hexdigest()
+
+    def update_many(self, returns: pd.DataFrame) -> int:
+        """
+        Feed every row newer than the last processed timestamp; returns the number consumed.
+        When rows at or before it differ from what was absorbed (a backfill or a revised bar),
+        the state is rebuilt from the last window + history rows instead.
+        """
+        returns = returns.reindex(columns=self.symbols).sort_index()
+        with self._lock:
+            if self.last_timestamp is not None:
+                if self._fingerprint(returns[returns.index <= self.last_timestamp]) == self._seen:
+                    fresh = returns[returns.index > self.last_timestamp]
+                else:
+                    self._reset()
+                    fresh = returns.iloc[-(self.window + self.history_size):]
+            else:
+                fresh = returns
+            values = np.nan_to_num(fresh.to_numpy(dtype='float64'))
+            for ts, row in zip(fresh.index, values):
+                self._update(ts, row)
+            if len(fresh):
+                self._seen = self._fingerprint(returns)
+        return len(fresh)
+
+    # -- reads ------------------------------------------------------------
+
+    def _matrix(self) -> np.ndarray:
+        n = self._count
+        if n < 2:
+            return np.full(self._cross.shape, np.nan)
+        cov = self._cross - np.outer(self._sums, self._sums) / n
+        std = np.sqrt(np.maximum(np.diag(cov), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        return np.clip(corr, -1.0, 1.0)
+
+    def matrix(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(self._matrix(), index=self.symbols, columns=self.symbols)
+
+    def history(self) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """(timestamps, H x N x N matrices) for the most recent `history` updates."""
+        with self._lock:
+            stacked = np.array(self._history) if self._history else np.empty((0,) + self._cross.shape)
+            return pd.DatetimeIndex(list(self._history_ts)), stacked
+
+    def pair_history(self, a: str, b: str) -> pd.Series:
+        timestamps, mats = self.history()
+        i, j = self.symbols.index(a), self.symbols.index(b)
+        return pd.Series(mats[:, i, j] if len(mats) else [], index=timestamps, name=f"{a}/{b}")
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp = path + '.tmp.npz'
+            np.savez(tmp, symbols=np.array(self.symbols), window=self.window, history_size=self.history_size,
+                     buffer=self._buffer, pos=self._pos, count=self._count,
+                     since_resync=self._since_resync, seen=self._seen or '',
+                     last_timestamp=-1 if self.last_timestamp is None else self.last_timestamp.value,
+                     history_ts=np.array([t.value for t in self._history_ts], dtype='int64'),
+                     history=np.array(self._history) if self._history else np.empty((0,) + self._cross.shape))
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, symbols: Sequence[str], window: int = 252,
+             history: int = 756) -> 'RollingCorrelation':
+        """Restore saved state; a missing file or a different symbol list/window starts fresh."""
+        engine = cls(symbols, window, history)
+        if not os.path.exists(path):
+            return engine
+        try:
+            state = np.load(path)
+            if list(state['symbols']) != list(symbols) or int(state['window']) != window:
+                return engine
+            engine._buffer = state['buffer']
+            engine._pos = int(state['pos'])
+            engine._count = int(state['count'])
+            engine._since_resync = int(state['since_resync'])
+            engine._resync()
+            if int(state['last_timestamp']) >= 0:
+                engine.last_timestamp = pd.Timestamp(int(state['last_timestamp']))
+            # State saved without a fingerprint never matches, so the first update replays
+            engine._seen = str(state['seen']) if 'seen' in state.files else None
+            engine._history_ts.extend(pd.Timestamp(int(t)) for t in state['history_ts'])
+            engine._history.extend(state['history'])
+        except Exception as e:
+            print(f"Correlation state load error ({path}): {e} — starting fresh")
+            return cls(symbols, window, history)
+        return engine
+
+
+def returns_panel(closes: pd.DataFrame) -> pd.DataFrame:
+    """Each column's returns on its own calendar, aligned on the union of timestamps."""
+    return pd.DataFrame({s: closes[s].dropna().pct_change() for s in closes.columns}).reindex(closes.index)
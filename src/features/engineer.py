@@ -1,41 +1,199 @@
 # src/features/engineer.py (FULL FINAL - Fill NaNs to avoid empty feats)
+import hashlib
+import json
+from typing import Optional, Sequence
+
 import pandas as pd
 import numpy as np
-from storage.db_manager import load_ohlc
-from sqlalchemy import create_engine
-from utils.config import DB_PATH
-engine = create_engine(f'sqlite:///{DB_PATH}')
+from storage.db_manager import FEATURE_COLUMNS, get_feature_state, load_features, load_panel, store_features
+from utils.config import ASSETS, MACRO_RATE_SERIES
+from utils.tracing import traced
+
+HISTORY_START = '2020-01-01'
+DEFAULT_WINDOW = 20
+MOMENTUM_LAG = 5
+REFERENCE_SYMBOL = 'DXY'
+MACRO_RATE = 5.33  # used before the first MACRO_RATE_SERIES release, or with no macro data ingested
+
+# Everything that changes the numbers in the `features` table. Bump `rev` when the
+# computation changes without any of the parameters changing.
+FEATURE_SET = {
+    'columns': FEATURE_COLUMNS,
+    'window': DEFAULT_WINDOW,
+    'momentum_lag': MOMENTUM_LAG,
+    'reference': REFERENCE_SYMBOL,
+    'macro_rate': {'series': MACRO_RATE_SERIES, 'fallback': MACRO_RATE, 'known_after_days': 1},
+    'rev': 2,
+}
+
+
+def feature_set_version(feature_set: dict = FEATURE_SET) -> str:
+    return hashlib.sha1(json.dumps(feature_set, sort_keys=True).encode()).hexdigest()[:12]
+
+
+FEATURE_VERSION = feature_set_version()
+
+
+def macro_rate(timestamps: pd.Series) -> np.ndarray:
+    """MACRO_RATE_SERIES as known at each bar (point-in-time), MACRO_RATE where nothing was published yet."""
+    from features.asof import macro_values
+
+    values = macro_values(timestamps, [MACRO_RATE_SERIES]).get(MACRO_RATE_SERIES)
+    if values is None:
+        return np.full(len(timestamps), MACRO_RATE)
+    return np.where(np.isnan(values), MACRO_RATE, values)
+
+
+def compute_features(df: pd.DataFrame, ref_df: Optional[pd.DataFrame], window: int = DEFAULT_WINDOW,
+                     periods_per_year: float = 252) -> pd.DataFrame:
+    """Pure feature computation on raw OHLC rows (one symbol) and the reference series."""
+    df = df.copy()
+    df['returns'] = df['close'].pct_change().fillna(0)
+    df['volatility'] = (df['returns'].rolling(window).std() * np.sqrt(periods_per_year)).fillna(0.15)  # Default vol 15%
+    df['momentum_5d'] = df['close'] / df['close'].shift(MOMENTUM_LAG) - 1
+    df['momentum_5d'] = df['momentum_5d'].fillna(0)
+
+    if ref_df is not None and not ref_df.empty:
+        dxy_returns = ref_df.set_index('timestamp')['close'].pct_change().fillna(0)
+        df_returns = df.set_index('timestamp')['returns']
+        corr = df_returns.rolling(window).corr(dxy_returns.reindex(df_returns.index).fillna(0)).fillna(0)
+        df['corr_dxy'] = corr.to_numpy()
+    else:
+        df['corr_dxy'] = 0.0
+
+    df['macro_rate'] = macro_rate(df['timestamp'])
+
+    feats = df[['symbol', 'timestamp'] + FEATURE_COLUMNS]
+    feats = feats.fillna(0)  # FIXED: Fill NaNs instead of dropna to avoid empty
+    return feats
+
+
+def _panel_frame(panel: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """One symbol's bars out of a close panel, in the load_ohlc column layout compute_features expects."""
+    if symbol not in panel.columns:
+        return pd.DataFrame(columns=['symbol', 'timestamp', 'close'])
+    col = panel[symbol].dropna()
+    return pd.DataFrame({'symbol': symbol, 'timestamp': col.index, 'close': col.to_numpy()})
 
-def engineer_features(symbol: str, window: int = 20) -> pd.DataFrame:
-    df = load_ohlc(symbol, '2020-01-01')
+
+@traced('feature')
+def materialize_features(symbol: str) -> int:
+    """
+    Bring the stored features for `symbol` up to date and return the number of rows written.
+    A missing state or a different feature-set version triggers a full rebuild; otherwise only
+    bars from the state's `stale_from` onwards are recomputed, from a slice that starts
+    DEFAULT_WINDOW bars earlier so the rolling statistics see a full window.
+    Raw closes come from the shared universe panel, so the reference series is read once
+    per data version however many symbols are materialized. Full rebuilds take their rows from
+    the batch engine's pass over that panel, computed once for all the symbols rebuilt with it.
+    """
+    state = get_feature_state(symbol)
+    full = state is None or state['version'] != FEATURE_VERSION
+    if not full and state['stale_from'] is None:
+        return 0
+
+    universe = list(dict.fromkeys(list(ASSETS) + [symbol, REFERENCE_SYMBOL]))
+    closes = load_panel(universe, HISTORY_START, ('close',))['close']
+    df = _panel_frame(closes, symbol)
+    if df.empty:
+        return 0
+    if full:
+        from features.batch import to_long, universe_features  # batch imports this module
+        feats = to_long(universe_features(universe), symbol)
+        written = store_features(feats, FEATURE_VERSION, reference=REFERENCE_SYMBOL, replace=True)
+        print(f"Materialized {written} feature rows for {symbol} (full)")
+        return written
+
+    ref_df = _panel_frame(closes, REFERENCE_SYMBOL)
+    stale_from = state['stale_from']
+    first = int(df['timestamp'].searchsorted(stale_from))
+    df = df.iloc[max(0, first - max(DEFAULT_WINDOW, MOMENTUM_LAG)):]
+    # Keep one reference bar before the slice so its first return is a real one
+    ref_first = int(ref_df['timestamp'].searchsorted(df['timestamp'].iloc[0]))
+    ref_df = ref_df.iloc[max(0, ref_first - 1):]
+
+    feats = compute_features(df.reset_index(drop=True), ref_df)
+    feats = feats[feats['timestamp'] >= stale_from]
+    written = store_features(feats, FEATURE_VERSION, reference=REFERENCE_SYMBOL, stale_from=stale_from)
+    print(f"Materialized {written} feature rows for {symbol} (incremental)")
+    return written
+
+
+def iter_features(symbol: str, chunk_bars: int = 50_000, start: Optional[str] = HISTORY_START,
+                  end: Optional[str] = None):
+    """
+    compute_features over a daily history of any length, up to `chunk_bars` bars per yielded frame.
+    Bars are streamed from storage in compact windows, each computed together with the last
+    warm-up bars (with a close) of the one before, so each frame matches the corresponding rows of
+    a whole-history computation while only one window (and its reference bars) is in memory.
+    Closes stay float64, as in the whole-history path.
+    """
+    from storage.db_manager import load_ohlc
+    from storage.stream import iter_ohlc_windows
+
+    warmup = max(DEFAULT_WINDOW, MOMENTUM_LAG) + 1
+    carry = None  # the previous window's last `warmup` bars
+    for bars in iter_ohlc_windows(symbol, chunk_bars, start=start, end=end, narrow=False):
+        bars = bars[['symbol', 'timestamp', 'close']].dropna(subset=['close'])
+        if bars.empty:
+            continue
+        emitted_to = None if carry is None else carry['timestamp'].iloc[-1]
+        if carry is not None:
+            bars = pd.concat([carry, bars], ignore_index=True)
+        ref_df = load_ohlc(REFERENCE_SYMBOL, str(bars['timestamp'].iloc[0]), str(bars['timestamp'].iloc[-1]))
+        feats = compute_features(bars, ref_df if not ref_df.empty else None)
+        carry = bars.iloc[-warmup:]
+        if emitted_to is not None:
+            feats = feats[feats['timestamp'] > emitted_to]  # by timestamp: the carried bars were yielded already
+        yield feats.reset_index(drop=True)
+
+
+@traced('feature')
+def intraday_features(symbol: str, bar_size: str, window: int = DEFAULT_WINDOW,
+                      start: Optional[str] = None) -> pd.DataFrame:
+    """
+    Features on bars resampled from the 1-minute store. Computed on the fly, not materialized;
+    rolling windows and momentum count bars of `bar_size`, volatility is annualized per bar.
+    """
+    from storage.intraday import BAR_SECONDS, resample
+
+    df = resample(symbol, bar_size, start)
     if df.empty:
+        return df
+    ref_df = resample(REFERENCE_SYMBOL, bar_size, start)
+    per_year = 252 * 86400 / BAR_SECONDS[bar_size]  # round-the-clock bars (FX, index futures)
+    return compute_features(df[['symbol', 'timestamp', 'close']].astype({'symbol': str}),
+                            ref_df if not ref_df.empty else None, window, per_year)
+
+
+@traced('feature')
+def engineer_features(symbol: str, window: int = 20, bar_size: str = '1D',
+                      macro: Sequence[str] = ()) -> pd.DataFrame:
+    """Features for one symbol; `macro` series ids add a point-in-time macro_<series> column each."""
+    if bar_size != '1D':
+        # Intraday bar sizes come from the 1-minute store; daily stays on provider daily bars
+        feats = intraday_features(symbol, bar_size, window)
+    elif window == DEFAULT_WINDOW:
+        materialize_features(symbol)
+        feats = load_features(symbol, FEATURE_VERSION, HISTORY_START)
+    else:
+        # Non-default windows aren't materialized; compute on the fly
+        closes = load_panel([symbol, REFERENCE_SYMBOL], HISTORY_START, ('close',))['close']
+        df = _panel_frame(closes, symbol)
+        feats = compute_features(df, _panel_frame(closes, REFERENCE_SYMBOL), window) if not df.empty else df
+
+    if feats.empty:
         # Return dummy feats for safe ML (use mean values or 0)
         dummy = pd.DataFrame({
             'returns': [0.0],
             'volatility': [0.15],
             'momentum_5d': [0.0],
             'corr_dxy': [0.0],
-            'macro_rate': [5.33]
+            'macro_rate': [MACRO_RATE]
         }, index=[pd.Timestamp.now()])
         print(f"No data for {symbol} — using dummy features")
         return dummy
-    
-    df = df.copy()
-    df['returns'] = df['close'].pct_change().fillna(0)
-    df['volatility'] = df['returns'].rolling(window).std() * np.sqrt(252).fillna(0.15)  # Default vol 15%
-    df['momentum_5d'] = df['close'] / df['close'].shift(5) - 1
-    df['momentum_5d'] = df['momentum_5d'].fillna(0)
-    
-    dxy_df = load_ohlc('DXY', '2020-01-01')
-    if not dxy_df.empty:
-        dxy_returns = dxy_df.set_index('timestamp')['close'].pct_change().fillna(0)
-        df_returns = df.set_index('timestamp')['returns']
-        df['corr_dxy'] = df_returns.rolling(window).corr(dxy_returns.reindex(df_returns.index).fillna(0)).fillna(0)
-    else:
-        df['corr_dxy'] = 0.0
-    
-    df['macro_rate'] = 5.33
-    
-    feats = df[['symbol', 'timestamp', 'returns', 'volatility', 'momentum_5d', 'corr_dxy', 'macro_rate']]
-    feats = feats.fillna(0)  # FIXED: Fill NaNs instead of dropna to avoid empty
-
+    if macro:
+        from features.asof import attach_macro
+        feats = attach_macro(feats, macro)
+    return feats
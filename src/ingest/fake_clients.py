@@ -0,0 +1,179 @@
+# src/ingest/fake_clients.py (Offline stand-ins for the alpha_vantage, polygon, yfinance and fredapi client libraries)
+import sys
+import threading
+import time
+import types
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import pandas as pd
+
+from utils.synthetic import synthetic_macro, synthetic_ohlc
+
+_FREQ = {'1d': 'B', 'day': 'B', '1m': 'min', 'minute': 'min', '1h': 'h', 'hour': 'h'}
+
+
+class FakeMarket:
+    """
+    Deterministic synthetic history per provider ticker and bar size, shared by the fake clients.
+    Every call sleeps `latency` seconds and is counted, so benchmarks can include (or exclude)
+    network time and check how much was requested. Providers left out of `serving`, and every
+    provider for tickers in `missing`, answer with no data, which sends the fetch chain on to the
+    next one (an empty Yahoo response is retried with backoff, as it is live).
+    """
+
+    def __init__(self, start: str = '2020-01-01', end: Optional[str] = None, latency: float = 0.0,
+                 serving: tuple = ('AV', 'Polygon', 'Yahoo', 'FRED'), missing: tuple = ()):
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+        self.latency = latency
+        self.serving = set(serving)
+        self.missing = set(missing)
+        self.requests: Dict[str, int] = {'AV': 0, 'Polygon': 0, 'Yahoo': 0, 'FRED': 0}
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def bars(self, provider: str, ticker: str, freq: str = 'B', start: Optional[str] = None,
+             end: Optional[str] = None) -> pd.DataFrame:
+        with self._lock:
+            self.requests[provider] += 1
+            key = (ticker, freq)
+            if key not in self._history:
+                n_bars = len(pd.date_range(self.start, self.end, freq=freq))
+                self._history[key] = synthetic_ohlc(ticker, n_bars, start=self.start.strftime('%Y-%m-%d'),
+                                                    freq=freq, seed=zlib.crc32(ticker.encode()), source=provider)
+            df = self._history[key]
+        if provider not in self.serving or ticker in self.missing:
+            df = df.iloc[:0]
+        if self.latency:
+            time.sleep(self.latency)
+        if start:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end:
+            df = df[df['timestamp'] < pd.Timestamp(end)]
+        return df
+
+    def vintages(self, series_id: str) -> pd.DataFrame:
+        """Every vintage of a monthly macro series, published with a lag and revised once."""
+        with self._lock:
+            self.requests['FRED'] += 1
+            key = (series_id, 'vintages')
+            if key not in self._history:
+                self._history[key] = synthetic_macro(series_id, '2015-01-01', self.end,
+                                                     seed=zlib.crc32(series_id.encode()))
+            df = self._history[key]
+        if 'FRED' not in self.serving or series_id in self.missing:
+            df = df.iloc[:0]
+        if self.latency:
+            time.sleep(self.latency)
+        return df
+
+
+def _alpha_vantage(market: FakeMarket) -> Dict[str, types.ModuleType]:
+    class ForeignExchange:
+        def __init__(self, key: str = '', **_):
+            self.key = key
+
+        def get_currency_exchange_daily_from_symbol(self, symbol: str):
+            df = market.bars('AV', symbol)
+            data = {ts.strftime('%Y-%m-%d'): {'1. open': f'{o:.6f}', '2. high': f'{h:.6f}', '3. low': f'{l:.6f}',
+                                              '4. close': f'{c:.6f}', '5. volume': f'{v:.0f}'}
+                    for ts, o, h, l, c, v in df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].itertuples(
+                        index=False)}
+            return data, {'1. Information': 'Fake FX Daily'}
+
+    package, module = types.ModuleType('alpha_vantage'), types.ModuleType('alpha_vantage.foreignexchange')
+    module.ForeignExchange = ForeignExchange
+    package.foreignexchange = module
+    return {'alpha_vantage': package, 'alpha_vantage.foreignexchange': module}
+
+
+def _polygon(market: FakeMarket) -> Dict[str, types.ModuleType]:
+    class RESTClient:
+        def __init__(self, api_key: str = '', **_):
+            self.api_key = api_key
+
+        def get_aggs(self, ticker: str, multiplier: int, timespan: str, from_: str, to: str, limit: int = 50000):
+            # Polygon's `to` is inclusive
+            end = (pd.Timestamp(to) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+            df = market.bars('Polygon', ticker, _FREQ[timespan], from_, end).head(limit)
+            ms = df['timestamp'].to_numpy().astype('datetime64[ms]').astype('int64')
+            return [types.SimpleNamespace(timestamp=int(t), open=o, high=h, low=l, close=c, volume=v)
+                    for t, o, h, l, c, v in zip(ms, df['open'], df['high'], df['low'], df['close'], df['volume'])]
+
+    module = types.ModuleType('polygon')
+    module.RESTClient = RESTClient
+    return {'polygon': module}
+
+
+def _yfinance(market: FakeMarket) -> Dict[str, types.ModuleType]:
+    def _frame(ticker: str, start, end, interval: str) -> pd.DataFrame:
+        df = market.bars('Yahoo', ticker, _FREQ[interval], start, end)
+        index = pd.DatetimeIndex(df['timestamp'], name='Date' if interval == '1d' else 'Datetime')
+        return pd.DataFrame({'Close': df['close'].to_numpy(), 'High': df['high'].to_numpy(),
+                             'Low': df['low'].to_numpy(), 'Open': df['open'].to_numpy(),
+                             'Volume': df['volume'].to_numpy()}, index=index)
+
+    def download(tickers, start=None, end=None, interval: str = '1d', group_by: str = 'column', **_):
+        # Recent yfinance: (field, ticker) columns, or (ticker, field) with group_by='ticker'
+        many = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {t: _frame(t, start, end, interval) for t in many}
+        out = pd.concat(frames, axis=1) if group_by == 'ticker' else \
+            pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return out.dropna(how='all')
+
+    module = types.ModuleType('yfinance')
+    module.download = download
+    return {'yfinance': module}
+
+
+def _fredapi(market: FakeMarket) -> Dict[str, types.ModuleType]:
+    class Fred:
+        def __init__(self, api_key: str = '', **_):
+            self.api_key = api_key
+
+        def get_series_all_releases(self, series_id: str, realtime_start=None, realtime_end=None):
+            df = market.vintages(series_id)
+            return pd.DataFrame({'realtime_start': df['release_date'].to_numpy(), 'date': df['date'].to_numpy(),
+                                 'value': df['value'].to_numpy()})
+
+    module = types.ModuleType('fredapi')
+    module.Fred = Fred
+    return {'fredapi': module}
+
+
+@contextmanager
+def fake_clients(market: Optional[FakeMarket] = None, rate_limits: bool = False):
+    """
+    Route ingest.ohlc_fetcher's AV → Polygon → Yahoo chain (and ingest.macro_fetcher's FRED
+    requests) to a FakeMarket: the client modules
+    are swapped in sys.modules (the fetchers import them on first use), API keys are set so no
+    provider is skipped, and the per-provider rate limits are lifted unless `rate_limits`.
+    Everything is restored on exit. Yields the market.
+    """
+    from ingest import macro_fetcher, ohlc_fetcher
+
+    market = market or FakeMarket()
+    modules = {**_alpha_vantage(market), **_polygon(market), **_yfinance(market), **_fredapi(market)}
+    saved_modules = {name: sys.modules.get(name) for name in modules}
+    saved_attrs = {name: getattr(ohlc_fetcher, name)
+                   for name in ('API_KEY_AV', 'API_KEY_POLYGON', 'POLYGON_AVAILABLE', 'RATE_LIMITS')}
+    saved_fred_key = macro_fetcher.API_KEY_FRED
+    sys.modules.update(modules)
+    macro_fetcher.API_KEY_FRED = 'fake'
+    ohlc_fetcher.API_KEY_AV, ohlc_fetcher.API_KEY_POLYGON = 'fake', 'fake'
+    ohlc_fetcher.POLYGON_AVAILABLE = True
+    if not rate_limits:
+        ohlc_fetcher.RATE_LIMITS = {}
+    try:
+        yield market
+    finally:
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        for name, value in saved_attrs.items():
+            setattr(ohlc_fetcher, name, value)
+        macro_fetcher.API_KEY_FRED = saved_fred_key
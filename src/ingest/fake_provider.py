@@ -0,0 +1,71 @@
+# src/ingest/fake_provider.py (Offline stand-in for the AV/Polygon/Yahoo chain)
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils.synthetic import synthetic_ohlc
+
+
+class FakeProvider:
+    """
+    Serves deterministic synthetic daily bars for any symbol, honouring the requested range.
+    Drop-in for a `Provider` in `fetch_ohlc(..., providers=[FakeProvider()])`; keeps request
+    and row counters so tests and benchmarks can check how much was transferred.
+    `latency` simulates network time per request; `batch=True` also exposes fetch_batch.
+    """
+
+    def __init__(self, name: str = 'Fake', start: str = '2020-01-01', end: Optional[str] = None,
+                 fail_symbols: Optional[set] = None, latency: float = 0.0, batch: bool = False):
+        self.name = name
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+        self.fail_symbols = set(fail_symbols or ())
+        self.latency = latency
+        self.fetch_batch = self._fetch_batch if batch else None
+        self.requests = 0
+        self.rows_served = 0
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def history(self, symbol: str) -> pd.DataFrame:
+        with self._lock:
+            return self._history_locked(symbol)
+
+    def _history_locked(self, symbol: str) -> pd.DataFrame:
+        if symbol not in self._history:
+            n_bars = len(pd.bdate_range(self.start, self.end))
+            df = synthetic_ohlc(symbol, n_bars, start=self.start.strftime('%Y-%m-%d'), freq='B',
+                                seed=zlib.crc32(symbol.encode()), source=self.name)
+            self._history[symbol] = df
+        return self._history[symbol]
+
+    def _slice(self, symbol: str, start: Optional[str], end: Optional[str]) -> Optional[pd.DataFrame]:
+        if symbol in self.fail_symbols:
+            return None
+        df = self.history(symbol)
+        if start:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end:
+            df = df[df['timestamp'] < pd.Timestamp(end)]
+        with self._lock:
+            self.rows_served += len(df)
+        return df.reset_index(drop=True)
+
+    def fetch(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> Optional[pd.DataFrame]:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._slice(symbol, start, end)
+
+    def _fetch_batch(self, symbols: List[str], start: Optional[str] = None,
+                     end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        out = {s: self._slice(s, start, end) for s in symbols}
+        return {s: df for s, df in out.items() if df is not None and not df.empty}
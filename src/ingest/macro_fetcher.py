@@ -0,0 +1,81 @@
+# src/ingest/macro_fetcher.py (FRED macro series with each vintage's release date, into `fundamentals`)
+from typing import Callable, Dict, Iterable, Optional
+
+import pandas as pd
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from utils import tracing
+from utils.config import FRED_API_KEY, MACRO_RATE_SERIES, MACRO_REFRESH_INTERVAL, MACRO_SERIES
+
+API_KEY_FRED = FRED_API_KEY
+# Macro values are joined onto bars as of each bar's date, so history has to start before the first bar
+DEFAULT_START = '2015-01-01'
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+def fetch_fred(series_id: str, api_key: str, start: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Every vintage of `series_id` (ALFRED): one row per (period date, release date) with the value
+    as first published and as each later revision published it. Columns metric, date, release_date, value.
+    """
+    if not api_key:
+        return None
+    from fredapi import Fred
+
+    raw = Fred(api_key=api_key).get_series_all_releases(series_id)
+    if raw is None or raw.empty:
+        return None
+    df = pd.DataFrame({
+        'metric': series_id,
+        'date': pd.to_datetime(raw['date']),
+        'release_date': pd.to_datetime(raw['realtime_start']),
+        'value': pd.to_numeric(raw['value'], errors='coerce'),
+    })
+    if start:
+        df = df[df['date'] >= pd.Timestamp(start)]
+    return df.dropna(subset=['value']).reset_index(drop=True)
+
+
+@tracing.traced('ingest')
+def refresh_macro(series: Optional[Iterable[str]] = None, fetch: Optional[Callable] = None,
+                  force: bool = False) -> Dict[str, Dict]:
+    """
+    Fetch the series not fetched within MACRO_REFRESH_INTERVAL (all of them with `force`) and
+    store new or revised vintages. A fetch that fails or brings nothing still counts as an attempt;
+    with no FRED key (and no `fetch` passed in) nothing is requested at all. When MACRO_RATE_SERIES
+    changes, every symbol's materialized features are marked stale from the first bar that could
+    see the change; revisions only touch bars after their own release date, so history computed
+    point-in-time stays valid.
+    Returns {series: {'rows': fetched, 'changed_from': first changed release date or None}}.
+    """
+    from storage.db_manager import invalidate_features, macro_state, record_macro_fetch, store_macro
+
+    if fetch is None and not API_KEY_FRED:
+        return {}  # like the keyless OHLC providers: skipped without a request
+    series = list(series or MACRO_SERIES)
+    fetch = fetch or (lambda s: fetch_fred(s, API_KEY_FRED, DEFAULT_START))
+    state = macro_state(series)
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)  # CURRENT_TIMESTAMP is UTC
+    due = [s for s in series if force or s not in state or state[s]['fetched_at'] is None
+           or (now - state[s]['fetched_at']).total_seconds() >= MACRO_REFRESH_INTERVAL]
+
+    stats = {}
+    for series_id in due:
+        with tracing.span('fetch', 'FRED', symbol=series_id, provider='FRED') as span:
+            try:
+                df = fetch(series_id)
+            except Exception as e:
+                print(f"FRED fetch failed for {series_id}: {e}")
+                df = None
+            span.add(*tracing.measure(df))
+        if df is None or df.empty:
+            print(f"No macro data for {series_id}; next attempt in {MACRO_REFRESH_INTERVAL // 60} min")
+            record_macro_fetch([series_id])
+            continue
+        changed = store_macro(df, source='FRED')
+        stats[series_id] = {'rows': len(df), 'changed_from': changed.get(series_id)}
+        if series_id == MACRO_RATE_SERIES and series_id in changed:
+            from features.asof import KNOWN_AFTER
+            invalidated = invalidate_features(changed[series_id] + KNOWN_AFTER)
+            print(f"{series_id} changed from {changed[series_id].date()}: features of {invalidated} symbol(s) stale")
+    return stats
@@ -1,25 +1,34 @@
 # src/ingest/ohlc_fetcher.py (FULL FINAL - Added retry to fetch_yahoo for rate limits)
+import importlib.util
 import os
 import pandas as pd
-import yfinance as yf
-from alpha_vantage.foreignexchange import ForeignExchange
-try:
-    from polygon import RESTClient
-    POLYGON_AVAILABLE = True
-except ImportError:
-    POLYGON_AVAILABLE = False
-    print("Polygon not available — using Yahoo fallback")
-
-from typing import Dict, Optional
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
 from dotenv import load_dotenv
 import time
 
+from ingest.rate_limit import get_limiter
+from utils import tracing
+
 load_dotenv()
 API_KEY_AV = os.getenv('ALPHA_VANTAGE_KEY', '')
 API_KEY_POLYGON = os.getenv('POLYGON_KEY', '')
 
+DEFAULT_START = '2020-01-01'
+OVERLAP_DAYS = 5  # Re-request this many days before the watermark to absorb late revisions
+INTRADAY_BACKFILL_DAYS = 7  # Yahoo only serves the last ~7 days of 1-minute bars
+
+# (requests/sec, burst) per provider — AV and Polygon free tiers allow 5 calls/min
+RATE_LIMITS = {
+    'AV': (5 / 60, 5),
+    'Polygon': (5 / 60, 5),
+    'Yahoo': (2.0, 4),
+}
+MAX_FETCH_WORKERS = 8
+
 SYMBOL_MAP = {
     'DXY': 'DX-Y.NYB',
     'XAUUSD': 'GC=F',
@@ -29,16 +38,56 @@ SYMBOL_MAP = {
     'GBPUSD': 'GBPUSD=X'
 }
 
-logging.basicConfig(level='INFO')
+# Provider SDKs are imported on first request (yfinance alone costs ~1s at import); logging is
+# configured by the entry point, not here
+POLYGON_AVAILABLE = importlib.util.find_spec('polygon') is not None
 logger = logging.getLogger(__name__)
 
+
+class Provider(NamedTuple):
+    name: str
+    fetch: Callable[[str, Optional[str], Optional[str]], Optional[pd.DataFrame]]
+    # Optional multi-symbol request: (symbols, start, end) -> {symbol: frame}
+    fetch_batch: Optional[Callable[[List[str], Optional[str], Optional[str]], Dict[str, pd.DataFrame]]] = None
+
+
+def _default_end() -> str:
+    # Providers treat the end date as exclusive (Yahoo) or inclusive (Polygon) — tomorrow covers both
+    return (pd.Timestamp.today().normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def _clip_range(df: pd.DataFrame, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    if start:
+        df = df[df['timestamp'] >= pd.Timestamp(start)]
+    if end:
+        df = df[df['timestamp'] <= pd.Timestamp(end)]
+    return df
+
+def _throttle(provider: str) -> None:
+    """
+    Take one of `provider`'s rate-limit tokens, waiting if the bucket is empty. Called right before
+    a request goes out (after the key checks), so keyless providers and cache hits never queue;
+    the wait is recorded on the enclosing fetch span.
+    """
+    limiter = get_limiter(provider, RATE_LIMITS)
+    if limiter is None:
+        return
+    waited = limiter.acquire()
+    span = tracing.current()
+    if span is not None:
+        span.tags['throttled_ms'] = span.tags.get('throttled_ms', 0.0) + waited * 1e3
+
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_av(symbol: str, api_key: str) -> Optional[pd.DataFrame]:
+def fetch_av(symbol: str, api_key: str, start: Optional[str] = None,
+             end: Optional[str] = None) -> Optional[pd.DataFrame]:
     if not api_key:
         logger.info("No AV key — skipping to Yahoo")
         return None
     try:
+        from alpha_vantage.foreignexchange import ForeignExchange
         fx = ForeignExchange(key=api_key)
+        _throttle('AV')
         data, _ = fx.get_currency_exchange_daily_from_symbol(f"{symbol}=X" if symbol in ['EURUSD', 'GBPUSD'] else symbol)
         if not data:
             return None
@@ -50,24 +99,29 @@ def fetch_av(symbol: str, api_key: str) -> Optional[pd.DataFrame]:
         df['symbol'] = symbol
         df['source'] = 'AV'
         df = df.reset_index().rename(columns={'index': 'timestamp'})
+        # AV only serves the full daily series, so the range is applied client-side
+        df = _clip_range(df, start, end)
         return df[['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']]
     except Exception as e:
         logger.warning(f"AV failed for {symbol}: {e}")
         return None
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_polygon(symbol: str, api_key: str) -> Optional[pd.DataFrame]:
+def fetch_polygon(symbol: str, api_key: str, start: Optional[str] = None,
+                  end: Optional[str] = None, timespan: str = 'day') -> Optional[pd.DataFrame]:
     if not POLYGON_AVAILABLE or not api_key:
         logger.info("No Polygon — skipping to Yahoo")
         return None
     try:
+        from polygon import RESTClient
         client = RESTClient(api_key)
         ticker = SYMBOL_MAP.get(symbol, symbol)
-        aggs = list(client.get_aggs(ticker, 1, "day", "2020-01-01", "2025-11-15", limit=50000))
+        _throttle('Polygon')
+        aggs = list(client.get_aggs(ticker, 1, timespan, start or DEFAULT_START, end or _default_end(), limit=50000))
         if not aggs:
             return None
         df = pd.DataFrame([{
-            'timestamp': pd.Timestamp(a.timestamp), 'open': a.open, 'high': a.high,
+            'timestamp': pd.Timestamp(a.timestamp, unit='ms'), 'open': a.open, 'high': a.high,
             'low': a.low, 'close': a.close, 'volume': a.volume, 'symbol': symbol, 'source': 'Polygon'
         } for a in aggs])
         return df
@@ -76,10 +130,14 @@ def fetch_polygon(symbol: str, api_key: str) -> Optional[pd.DataFrame]:
         return None
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=5, max=30))  # Longer waits for rate limits
-def fetch_yahoo(symbol: str) -> pd.DataFrame:
+def fetch_yahoo(symbol: str, start: Optional[str] = None, end: Optional[str] = None,
+                interval: str = '1d') -> pd.DataFrame:
     try:
+        import yfinance as yf
         ticker = SYMBOL_MAP.get(symbol, symbol)
-        df = yf.download(ticker, start='2020-01-01', end='2025-11-15', progress=False)
+        _throttle('Yahoo')
+        df = yf.download(ticker, start=start or DEFAULT_START, end=end or _default_end(), interval=interval,
+                         progress=False)
         if df.empty:
             raise ValueError("Yahoo no data")
         if isinstance(df.columns, pd.MultiIndex):
@@ -87,6 +145,7 @@ def fetch_yahoo(symbol: str) -> pd.DataFrame:
         df['symbol'] = symbol
         df['source'] = 'Yahoo'
         df.reset_index(inplace=True)
+        df.rename(columns={'Datetime': 'Date'}, inplace=True)  # intraday intervals index by Datetime
         expected = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
         for col in expected:
             if col not in df.columns:
@@ -98,14 +157,237 @@ def fetch_yahoo(symbol: str) -> pd.DataFrame:
         logger.error(f"Yahoo failed for {symbol}: {e}")
         raise
 
-def fetch_ohlc(symbol: str, days: int = 1000) -> pd.DataFrame:
-    df = fetch_av(symbol, API_KEY_AV)
-    if df is None or df.empty:
-        df = fetch_polygon(symbol, API_KEY_POLYGON)
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=5, max=30))
+def fetch_yahoo_many(symbols: List[str], start: Optional[str] = None,
+                     end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    One coalesced yf.download for several symbols; symbols without data are left out. Nothing to
+    download (a holiday, every watermark current) is an empty answer, not an error: only transport
+    failures are retried, and fetch_many's per-symbol fallback deals with the misses.
+    """
+    import yfinance as yf
+    tickers = {SYMBOL_MAP.get(s, s): s for s in symbols}
+    _throttle('Yahoo')
+    raw = yf.download(list(tickers), start=start or DEFAULT_START, end=end or _default_end(),
+                      group_by='ticker', progress=False)
+    if raw.empty:
+        return {}
+    out = {}
+    for ticker, symbol in tickers.items():
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                continue
+            df = raw[ticker]
+        else:
+            df = raw
+        df = df.dropna(how='all')
+        if df.empty:
+            continue
+        df = df.reset_index().rename(columns={'Date': 'timestamp', 'Open': 'open', 'High': 'high', 'Low': 'low',
+                                              'Close': 'close', 'Volume': 'volume'})
+        df['symbol'] = symbol
+        df['source'] = 'Yahoo'
+        out[symbol] = df[['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'source']]
+    return out
+
+
+def with_cache(chain: List[Provider], resolution: str = 'day') -> List[Provider]:
+    """
+    The chain behind the on-disk response cache (ingest.response_cache): fresh answers and
+    recent failures are served from disk, so reruns and dead keys cost no requests, backoff or
+    rate-limit tokens (those are taken in the fetch functions, which the cache only calls on a miss
+    or a revalidation).
+    Returned unchanged when PROVIDER_CACHE is off.
+    """
+    from utils.config import PROVIDER_CACHE
+    if not PROVIDER_CACHE:
+        return chain
+    from ingest.response_cache import default_cache
+    cache = default_cache()
+
+    def wrap(p: Provider) -> Provider:
+        fetch = lambda symbol, start, end: cache.fetch(p.name, p.fetch, symbol, start, end, resolution)  # noqa: E731
+        batch = None if p.fetch_batch is None else \
+            lambda symbols, start, end: cache.fetch_batch(p.name, p.fetch_batch, symbols, start, end, resolution)
+        return Provider(p.name, fetch, batch)
+    return [wrap(p) for p in chain]
+
+
+def default_providers() -> List[Provider]:
+    """AV → Polygon → Yahoo fallback chain used when no providers are passed in."""
+    return with_cache([
+        Provider('AV', lambda symbol, start, end: fetch_av(symbol, API_KEY_AV, start, end)),
+        Provider('Polygon', lambda symbol, start, end: fetch_polygon(symbol, API_KEY_POLYGON, start, end)),
+        Provider('Yahoo', fetch_yahoo, fetch_yahoo_many),
+    ], 'day')
+
+
+def intraday_providers() -> List[Provider]:
+    """Polygon → Yahoo chain for 1-minute bars (AV's FX endpoint is daily-only)."""
+    return with_cache([
+        Provider('Polygon', lambda symbol, start, end: fetch_polygon(symbol, API_KEY_POLYGON, start, end, 'minute')),
+        Provider('Yahoo', lambda symbol, start, end: fetch_yahoo(symbol, start, end, interval='1m')),
+    ], 'minute')
+
+
+def _call_provider(provider: Provider, symbol: str, start: Optional[str],
+                   end: Optional[str]) -> Optional[pd.DataFrame]:
+    with tracing.span('fetch', provider.name, symbol=symbol, provider=provider.name) as span:
+        df = provider.fetch(symbol, start, end)
+        span.add(*tracing.measure(df))
+    return df
+
+
+def fetch_ohlc(symbol: str, days: int = 1000, start: Optional[str] = None, end: Optional[str] = None,
+               providers: Optional[List[Provider]] = None) -> pd.DataFrame:
+    """
+    Fetch bars from the first provider in the chain that returns data (daily with the
+    default chain, 1-minute with intraday_providers()).
+    With no start date the full history is requested and trimmed to the last `days` bars;
+    with a start date only that range is requested and returned as-is.
+    """
+    df = None
+    for provider in providers or default_providers():
+        df = _call_provider(provider, symbol, start, end)
+        if df is not None and not df.empty:
+            break
     if df is None or df.empty:
-        df = fetch_yahoo(symbol)
-    if df.empty:
         raise ValueError(f"No data for {symbol}")
-    df = df.tail(days).sort_values('timestamp').reset_index(drop=True)
+    df = df.sort_values('timestamp')
+    if start is None:
+        df = df.tail(days)
+    df = df.reset_index(drop=True)
     logger.info(f"Fetched {len(df)} bars for {symbol}")
     return df
+
+
+def _first_hit(chain: List[Provider], symbol: str, start: Optional[str],
+               end: Optional[str]) -> Optional[pd.DataFrame]:
+    for provider in chain:
+        try:
+            df = _call_provider(provider, symbol, start, end)
+        except Exception as e:
+            logger.warning(f"{provider.name} failed for {symbol}: {e}")
+            continue
+        if df is not None and not df.empty:
+            return df
+    return None
+
+
+@tracing.traced('fetch')
+def fetch_many(symbols: List[str], days: int = 1000, start: Union[None, str, Dict[str, Optional[str]]] = None,
+               end: Optional[str] = None, providers: Optional[List[Provider]] = None,
+               max_workers: int = MAX_FETCH_WORKERS) -> Dict[str, pd.DataFrame]:
+    """
+    Concurrent fetch_ohlc over several symbols.
+    Each symbol walks the fallback chain on its own worker (rate-limited per provider), so one
+    slow or retrying provider only holds up that symbol. Symbols that fall through to a final
+    provider with batch support are coalesced into a single request for the rest of the batch.
+    `start` may be a per-symbol dict (as used by the incremental refresh). Symbols that no
+    provider could serve are missing from the result.
+    """
+    starts = start if isinstance(start, dict) else {s: start for s in symbols}
+    chain = providers or default_providers()
+    batch_provider = chain[-1] if chain[-1].fetch_batch is not None and len(symbols) > 1 else None
+    per_symbol_chain = chain[:-1] if batch_provider else chain
+
+    results: Dict[str, pd.DataFrame] = {}
+    misses: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        futures = {pool.submit(tracing.bind(_first_hit), per_symbol_chain, s, starts.get(s), end): s for s in symbols}
+        for fut in as_completed(futures):
+            df = fut.result()
+            if df is None:
+                misses.append(futures[fut])
+            else:
+                results[futures[fut]] = df
+
+        if misses and batch_provider:
+            # One coalesced request per distinct start (warm symbols usually share a watermark)
+            groups: Dict[Optional[str], List[str]] = {}
+            for s in misses:
+                groups.setdefault(starts.get(s), []).append(s)
+            for group_start, group in groups.items():
+                try:
+                    with tracing.span('fetch', f'{batch_provider.name} batch', provider=batch_provider.name) as span:
+                        batch = batch_provider.fetch_batch(group, group_start, end)
+                        span.add(*tracing.measure(batch))
+                except Exception as e:
+                    logger.warning(f"{batch_provider.name} batch failed for {group}: {e}")
+                    batch = {}
+                for s, df in batch.items():
+                    if df is not None and not df.empty:
+                        results[s] = df
+            # Anything the batch missed gets its own single-symbol attempt
+            retry_futures = {pool.submit(tracing.bind(_first_hit), [batch_provider], s, starts.get(s), end): s
+                             for s in misses if s not in results}
+            for fut in as_completed(retry_futures):
+                df = fut.result()
+                if df is not None:
+                    results[retry_futures[fut]] = df
+
+    for s, df in results.items():
+        df = df.sort_values('timestamp')
+        if starts.get(s) is None:
+            df = df.tail(days)
+        results[s] = df.reset_index(drop=True)
+    missing = [s for s in symbols if s not in results]
+    logger.info(f"Fetched {sum(len(df) for df in results.values())} bars for {len(results)} symbols"
+                + (f" (no data: {missing})" if missing else ""))
+    return results
+
+
+def refresh_many(symbols: List[str], days: int = 2000, overlap_days: int = OVERLAP_DAYS,
+                 providers: Optional[List[Provider]] = None) -> Dict[str, Dict[str, int]]:
+    """refresh_ohlc for several symbols with one concurrent fetch_many; failed symbols are omitted."""
+    from storage.db_manager import latest_timestamps, store_ohlc
+
+    watermarks = latest_timestamps(symbols)
+    starts = {s: (watermarks[s] - pd.Timedelta(days=overlap_days)).strftime('%Y-%m-%d') if s in watermarks else None
+              for s in symbols}
+    frames = fetch_many(symbols, days=days, start=starts, providers=providers)
+    stats = {}
+    for s, df in frames.items():
+        stats[s] = store_ohlc(df)
+        stats[s]['fetched'] = len(df)
+    return stats
+
+
+def refresh_ohlc(symbol: str, days: int = 2000, overlap_days: int = OVERLAP_DAYS,
+                 providers: Optional[List[Provider]] = None) -> Dict[str, int]:
+    """
+    Incremental refresh against the stored watermark (latest raw_ohlc timestamp).
+    Cold symbols get a full `days` backfill; warm ones only request bars from
+    `overlap_days` before the watermark, so a daily run moves a handful of rows.
+    Returns the store counts plus the number of rows fetched.
+    """
+    from storage.db_manager import latest_timestamp, store_ohlc
+
+    watermark = latest_timestamp(symbol)
+    if watermark is None:
+        df = fetch_ohlc(symbol, days=days, providers=providers)
+    else:
+        start = (watermark - pd.Timedelta(days=overlap_days)).strftime('%Y-%m-%d')
+        df = fetch_ohlc(symbol, start=start, providers=providers)
+    stats = store_ohlc(df)
+    stats['fetched'] = len(df)
+    logger.info(f"Refreshed {symbol} from {'scratch' if watermark is None else watermark.date()}: {stats}")
+    return stats
+
+
+def refresh_intraday(symbol: str, days: int = INTRADAY_BACKFILL_DAYS, overlap_days: int = 1,
+                     providers: Optional[List[Provider]] = None) -> Dict[str, int]:
+    """
+    Incremental 1-minute refresh into the month-partitioned intraday store. Cold symbols
+    backfill `days`; warm ones re-request from `overlap_days` before the stored watermark.
+    """
+    from storage import intraday
+
+    watermark = intraday.latest_timestamp(symbol)
+    since = watermark - pd.Timedelta(days=overlap_days) if watermark is not None \
+        else pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+    df = fetch_ohlc(symbol, start=since.strftime('%Y-%m-%d'), providers=providers or intraday_providers())
+    stats, _ = intraday.upsert_bars(df)
+    stats['fetched'] = len(df)
+    logger.info(f"Refreshed 1-minute {symbol} from {since.date()}: {stats}")
+    return stats
@@ -0,0 +1,45 @@
+# src/ingest/rate_limit.py (Thread-safe token buckets, one per data provider)
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens/sec refill up to `capacity`.
+    acquire() reserves tokens under the lock and sleeps outside it, so callers
+    queue in arrival order without holding up threads using other buckets.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_limiter(name: str, limits: Dict[str, Tuple[float, float]]) -> Optional[TokenBucket]:
+    """Shared bucket for a provider name; None when the provider has no configured limit."""
+    if name not in limits:
+        return None
+    with _buckets_lock:
+        if name not in _buckets:
+            rate, capacity = limits[name]
+            _buckets[name] = TokenBucket(rate, capacity)
+        return _buckets[name]
@@ -0,0 +1,255 @@
+# src/ingest/response_cache.py (On-disk provider response cache: range-aware TTLs, splice revalidation, negative entries)
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils import tracing
+from utils.config import PROVIDER_CACHE_DIR, PROVIDER_CACHE_MAX_MB
+
+DEFAULT_START = '2020-01-01'   # what the fetchers request when no start is given
+# Freshness per resolution when the requested range reaches today; closed historical ranges
+# only move on late revisions, which the incremental refresh's overlap re-requests anyway
+TTL_OPEN = {'day': 15 * 60, 'minute': 60}
+TTL_CLOSED = 7 * 86400
+NEGATIVE_TTL = 30 * 60         # how long a failed (provider, ticker) is skipped
+# Revalidation re-requests only from this far before the last cached bar and splices the answer in
+REVALIDATE_OVERLAP = {'day': pd.Timedelta(days=5), 'minute': pd.Timedelta(days=1)}
+EVICT_TO = 0.8                 # eviction trims the cache to this share of the size bound
+_MAGIC = b'QTRC1'
+
+
+class ResponseCache:
+    """
+    One compressed file per (provider, ticker, resolution) holding the bars fetched so far, the
+    range they cover and when they were fetched, plus the last failure. A request is answered
+    from disk when the entry covers its range and is fresh for it: TTL_OPEN[resolution] when the
+    range reaches today, TTL_CLOSED otherwise; a closed range that ends within the cached bars is
+    always served from them. A stale or short entry is revalidated by fetching only from just
+    before its last bar and splicing; an empty answer to that window keeps the cached bars
+    without counting as a failure. A failure is remembered for NEGATIVE_TTL:
+    the provider isn't called again for that ticker, and cached bars (if any) are served stale.
+    Least recently used files are evicted once the directory outgrows `max_bytes`.
+    """
+
+    def __init__(self, root: str = PROVIDER_CACHE_DIR, max_bytes: int = PROVIDER_CACHE_MAX_MB * 2 ** 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.counts = {'hit': 0, 'miss': 0, 'revalidated': 0, 'negative_hit': 0, 'stale_served': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    # -- storage --------------------------------------------------------------
+
+    def _path(self, provider: str, ticker: str, resolution: str) -> str:
+        digest = hashlib.sha1(f"{provider}|{ticker}|{resolution}".encode()).hexdigest()[:12]
+        readable = re.sub(r'[^A-Za-z0-9]+', '_', ticker)[:24]
+        return os.path.join(self.root, f"{provider}-{readable}-{resolution}-{digest}.bin")
+
+    def _read(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if not raw.startswith(_MAGIC):
+                raise ValueError("unknown format")
+            entry = pickle.loads(zlib.decompress(raw[len(_MAGIC):]))
+            os.utime(path)  # recency for LRU eviction
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Dropping unreadable cache entry {os.path.basename(path)}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write(self, path: str, entry: Dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_MAGIC + zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 6))
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries while the cache is over max_bytes; returns files removed."""
+        try:
+            files = [e for e in os.scandir(self.root) if e.is_file() and e.name.endswith('.bin')]
+        except FileNotFoundError:
+            return 0
+        stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in files]
+        total = sum(size for _, size, _ in stats)
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def clear(self) -> None:
+        for e in os.scandir(self.root) if os.path.isdir(self.root) else []:
+            if e.name.endswith('.bin'):
+                os.remove(e.path)
+
+    def size(self) -> Dict[str, int]:
+        files = [e for e in os.scandir(self.root) if e.name.endswith('.bin')] if os.path.isdir(self.root) else []
+        return {'entries': len(files), 'bytes': sum(e.stat().st_size for e in files)}
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+        span = tracing.current()
+        if span is not None:
+            span.tags['cache'] = outcome
+
+    # -- lookups ----------------------------------------------------------------
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, start: pd.Timestamp, end: Optional[pd.Timestamp]) -> pd.DataFrame:
+        ts = frame['timestamp']
+        mask = ts >= start if end is None else (ts >= start) & (ts <= end)
+        return frame[mask].reset_index(drop=True)
+
+    def fetch(self, provider: str, fetch: Callable, ticker: str, start: Optional[str], end: Optional[str],
+              resolution: str = 'day') -> Optional[pd.DataFrame]:
+        """
+        Cached `fetch(ticker, start, end)`. Returns what the provider would (a frame or None);
+        a remembered exception is raised again as ValueError so fallback chains behave the same.
+        """
+        now = time.time()
+        req_start = pd.Timestamp(start or DEFAULT_START)
+        req_end = pd.Timestamp(end) if end else None
+        is_open = req_end is None or req_end >= pd.Timestamp.today().normalize()
+        path = self._path(provider, ticker, resolution)
+        entry = self._read(path) or {}
+        frame = entry.get('frame')
+        covers = frame is not None and entry['start'] <= req_start
+
+        if covers:
+            age = now - entry['fetched_at']
+            # A closed range inside the cached bars has nothing newer to fetch (revisions of it are
+            # re-requested by the refresh overlap), and a revalidation window would start after it
+            fresh = age < TTL_OPEN[resolution] if is_open else \
+                (not frame.empty and req_end <= frame['timestamp'].iloc[-1]) or \
+                (age < TTL_CLOSED and req_end <= pd.Timestamp(entry['through'], unit='s'))
+            if fresh:
+                self._count('hit')
+                return self._slice(frame, req_start, req_end)
+        if entry.get('failed_at') and now - entry['failed_at'] < NEGATIVE_TTL:
+            if covers:
+                self._count('stale_served')
+                return self._slice(frame, req_start, req_end)
+            self._count('negative_hit')
+            if entry.get('error'):
+                raise ValueError(f"cached failure from {(now - entry['failed_at']) / 60:.0f} min ago: {entry['error']}")
+            return None
+
+        # Revalidate a covering entry from just before its last bar; otherwise fetch the whole range
+        fetch_start = req_start
+        if covers and not frame.empty:
+            fetch_start = max(req_start, frame['timestamp'].iloc[-1].normalize() - REVALIDATE_OVERLAP[resolution])
+        try:
+            df = fetch(ticker, fetch_start.strftime('%Y-%m-%d'), end)
+            error = None
+        except _NeedsRequest:
+            raise
+        except Exception as e:
+            df, error = None, f"{type(e).__name__}: {e}"
+
+        if df is None or df.empty:
+            if covers and error is None:
+                # Nothing in the revalidation window (a holiday, a quiet tail): not a failure
+                self._count('stale_served')
+                return self._slice(frame, req_start, req_end)
+            self._count('failed')
+            self._write(path, dict(entry, failed_at=now, error=error))
+            if covers:
+                return self._slice(frame, req_start, req_end)
+            if error:
+                raise ValueError(f"{provider} failed for {ticker}: {error}")
+            return None
+
+        df = df.sort_values('timestamp')
+        if covers:
+            kept = frame[frame['timestamp'] < df['timestamp'].iloc[0]]
+            merged = pd.concat([kept, df], ignore_index=True) if not kept.empty else df.reset_index(drop=True)
+            self._count('revalidated')
+        else:
+            merged = df.reset_index(drop=True)
+            self._count('miss')
+        through = now if is_open else min(req_end.timestamp(), now)
+        self._write(path, {'start': min(entry['start'], req_start) if covers else req_start, 'through': through,
+                           'fetched_at': now, 'frame': merged, 'failed_at': None, 'error': None})
+        return self._slice(merged, req_start, req_end)
+
+    def fetch_batch(self, provider: str, fetch_batch: Callable, tickers: List[str], start: Optional[str],
+                    end: Optional[str], resolution: str = 'day') -> Dict[str, pd.DataFrame]:
+        """
+        Cached multi-ticker request: tickers answerable from disk (fresh, or failed recently) skip
+        the provider; the rest go out as one batch. Each ticker's answer is cached on its own.
+        """
+        out, todo = {}, []
+        for ticker in tickers:
+            try:
+                df = self.fetch(provider, _no_request, ticker, start, end, resolution)
+            except _NeedsRequest:
+                todo.append(ticker)
+                continue
+            except ValueError:
+                continue  # remembered failure
+            if df is not None and not df.empty:
+                out[ticker] = df
+        if not todo:
+            return out
+        try:
+            batch, error = fetch_batch(todo, start, end), None
+        except Exception as e:
+            batch, error = {}, e
+        for ticker in todo:
+            answer = batch.get(ticker)
+
+            def replay(*_, answer=answer):
+                if error is not None:
+                    raise error
+                return answer
+            try:
+                df = self.fetch(provider, replay, ticker, start, end, resolution)
+            except ValueError:
+                continue
+            if df is not None and not df.empty:
+                out[ticker] = df
+        return out
+
+
+class _NeedsRequest(Exception):
+    pass
+
+
+def _no_request(*_):
+    raise _NeedsRequest()
+
+
+_default: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ResponseCache()
+        return _default
@@ -0,0 +1,147 @@
+# src/models/compiled.py (Array-backed forest scorer — numpy only, no sklearn at inference time)
+from typing import Dict, List
+
+import numpy as np
+
+LEAF = -2  # sklearn's TREE_UNDEFINED feature index marks leaves
+
+
+def leaf_proba(tree, n_classes: int) -> np.ndarray:
+    """
+    Per-node class probabilities, normalized as DecisionTreeClassifier.predict_proba does:
+    scikit-learn >= 1.4 stores fractions in tree.value, older versions weighted counts.
+    """
+    value = tree.value[:, 0, :n_classes].astype(np.float64)
+    normalizer = value.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    return value / normalizer
+
+
+def flatten_forest(model, scaler, feature_names: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Flatten a fitted RandomForestClassifier + StandardScaler into plain arrays.
+    All trees share one node table; `roots` holds each tree's first node. Leaves point to
+    themselves, so a path that ended early stays put.
+    """
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        idx = np.arange(n)
+        left = np.where(tree.children_left < 0, idx, tree.children_left) + offset
+        right = np.where(tree.children_right < 0, idx, tree.children_right) + offset
+        roots.append(offset)
+        features.append(tree.feature.astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        children.append(np.stack([left, right], axis=1).astype(np.int32))
+        values.append(leaf_proba(tree, model.n_classes_))
+        offset += n
+    return {
+        'roots': np.array(roots, dtype=np.int32),
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'value': np.concatenate(values),
+        'max_depth': np.array(max(est.tree_.max_depth for est in model.estimators_)),
+        'classes': np.asarray(model.classes_),
+        'importances': np.asarray(model.feature_importances_, dtype=np.float64),
+        'mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scale': np.asarray(scaler.scale_, dtype=np.float64),
+        'feature_names': np.array(feature_names),
+    }
+
+
+class CompiledForest:
+    """
+    Scores a flattened forest for a whole batch at once: every unfinished (row, tree) pair
+    advances one level per step, so the Python loop runs at most max_depth times regardless
+    of tree count or batch size.
+    Inputs are rounded to float32 before comparison and leaf values are summed in tree
+    order, exactly as sklearn does, so probabilities match predict_proba bit for bit.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children']
+        self.value = arrays['value']
+        self.max_depth = int(arrays['max_depth'])
+        self.classes_ = arrays['classes']
+        self.mean_ = arrays['mean']
+        self.scale_ = arrays['scale']
+        self.feature_names = [str(f) for f in arrays['feature_names']]
+        self.feature_importances_ = arrays['importances']
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        with np.load(path, allow_pickle=False) as npz:
+            return cls({k: npz[k] for k in npz.files})
+
+    @staticmethod
+    def save(arrays: Dict[str, np.ndarray], path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """StandardScaler.transform."""
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index for every (row, tree) pair."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        node = np.tile(self.roots, n_rows)                         # row-major: (row, tree)
+        offset = np.repeat(np.arange(n_rows) * n_features, len(self.roots))
+        active = np.arange(node.size)
+        for _ in range(self.max_depth):
+            current = node[active]
+            feature = self.feature[current]
+            internal = feature != LEAF
+            if not internal.all():                                 # finished paths drop out of the batch
+                active, current, feature = active[internal], current[internal], feature[internal]
+                if not active.size:
+                    break
+            go_right = flat_x[offset[active] + feature] > self.threshold[current]
+            node[active] = self.children[current, go_right.astype(np.intp)]
+        return node.reshape(n_rows, len(self.roots))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaf_values = self.value[self.apply(X)]  # rows x trees x classes
+        proba = np.zeros((leaf_values.shape[0], leaf_values.shape[2]))
+        for t in range(leaf_values.shape[1]):
+            proba += leaf_values[:, t]
+        return proba / leaf_values.shape[1]
+
+
+class SklearnForest:
+    """Same interface over a joblib-loaded estimator + scaler, for models without a compiled export."""
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.mean_ = scaler.mean_
+        self.scale_ = scaler.scale_
+        self.classes_ = model.classes_
+        # feature_importances_ walks every tree on each access; it only changes with the model
+        self.feature_importances_ = model.feature_importances_
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        RandomForestClassifier.predict_proba without the per-call validation and joblib
+        dispatch: the same float32 traversal and tree-order accumulation, bit-identical.
+        """
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        n_classes = len(self.classes_)
+        proba = np.zeros((len(X32), n_classes))
+        for est in self.model.estimators_:
+            proba += leaf_proba(est.tree_, n_classes)[est.tree_.apply(X32)]
+        return proba / len(self.model.estimators_)
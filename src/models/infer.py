@@ -1,12 +1,110 @@
 # src/models/infer.py (PRODUCTION-FIXED - Graceful fallback on insufficient data or training failure)
-import os
+import time
 import pandas as pd
-import joblib
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Tuple
 
-from features.engineer import engineer_features
-from models.train import train_model
+from features.engineer import FEATURE_VERSION, materialize_features
+from models.registry import get_prediction, has_artifacts, latest_records, load_artifacts, put_prediction
+from storage.db_manager import FEATURE_COLUMNS, load_latest_features, store_signals
+from utils.tracing import traced
+
+MIN_HISTORY = 50
+FEATURE_COLS = [c for c in FEATURE_COLUMNS if c != 'returns']
+
+FALLBACK_EXPL = {
+    "momentum_5d": 0.50,
+    "volatility": 0.30,
+    "corr_dxy": 0.15,
+    "macro_rate": 0.05,
+}
+
+
+def _fallback_signal(symbol: str, momentum: float) -> Tuple[float, Dict[str, float]]:
+    signal = float(np.clip(momentum * 10, -1.0, 1.0))          # amplify a bit, still bounded
+    print(f"[infer] Insufficient data for {symbol} → momentum fallback signal {signal:+.3f}")
+    return signal, dict(FALLBACK_EXPL)
+
+
+@traced('infer')
+def infer_signals(symbols: Iterable[str]) -> Tuple[Dict[str, Tuple[float, Dict[str, float]]], Dict[str, float]]:
+    """
+    infer_signal for a whole watchlist in one pass.
+    Features are brought up to date per symbol (a no-op when nothing changed), then every
+    latest row comes back from one query and every model record from another. Symbols whose
+    (last bar, model version) was already scored are answered from the memo; the rest are
+    scored on their cached scorers (compiled arrays; no sklearn import on this path).
+    Returns ({symbol: (signal, importances)}, timing breakdown in ms).
+    """
+    symbols = list(symbols)
+    timings = {}
+    t0 = time.perf_counter()
+
+    for symbol in symbols:
+        materialize_features(symbol)
+    latest = load_latest_features(symbols, FEATURE_VERSION)
+    t1 = time.perf_counter()
+    timings['features_ms'] = (t1 - t0) * 1e3
+
+    results: Dict[str, Tuple[float, Dict[str, float]]] = {}
+    ready = [s for s in symbols if s in latest.index and latest.at[s, 'n_rows'] >= MIN_HISTORY]
+    for symbol in symbols:
+        if symbol not in ready:
+            momentum = float(latest.at[symbol, 'momentum_5d']) if symbol in latest.index else 0.0
+            results[symbol] = _fallback_signal(symbol, momentum)
+
+    records = latest_records(ready)
+    trained = False
+    for symbol in ready:
+        record = records.get(symbol)
+        stale = record is not None and record.feature_version not in (None, FEATURE_VERSION)
+        if record is None or stale or not has_artifacts(record.paths):
+            print(f"[infer] Model {'stale' if stale else 'missing'} for {symbol} → training now...")
+            from models.train import train_model             # sklearn only loads when we actually train
+            train_model(symbol)                              # we already know len >= 50, so it will succeed
+            trained = True
+    if trained:
+        records = latest_records(ready)
+    t2 = time.perf_counter()
+    timings['records_ms'] = (t2 - t1) * 1e3
+
+    # Same bar + same model version → same answer; skip the scoring entirely
+    to_score = []
+    for symbol in ready:
+        cache_key = (symbol, latest.at[symbol, 'timestamp'], records[symbol].version)
+        cached = get_prediction(cache_key)
+        if cached is not None:
+            results[symbol] = cached
+        else:
+            to_score.append((symbol, cache_key))
+
+    loaded = {symbol: load_artifacts(records[symbol]) for symbol, _ in to_score}
+    t3 = time.perf_counter()
+    timings['load_ms'] = (t3 - t2) * 1e3
+
+    X_all = latest[FEATURE_COLS].to_numpy(dtype='float64')
+    row_of = {symbol: i for i, symbol in enumerate(latest.index)}
+    for symbol, cache_key in to_score:
+        scorer = loaded[symbol]
+        prob = scorer.predict_proba(scorer.transform(X_all[[row_of[symbol]]]))[0][1]
+        signal = float((prob - 0.5) * 2)
+
+        # feature_importances_ walks every tree on each access; it only changes with the version
+        expl_key = (symbol, 'importances', records[symbol].version)
+        expl = get_prediction(expl_key)
+        if expl is None:
+            expl = dict(zip(FEATURE_COLS, scorer.feature_importances_))
+            expl = dict(sorted(expl.items(), key=lambda x: x[1], reverse=True))
+            put_prediction(expl_key, expl)
+
+        print(f"[infer] {symbol} signal {signal:+.3f} (model-based, v{records[symbol].version})")
+        put_prediction(cache_key, (signal, expl))
+        results[symbol] = (signal, expl)
+    t4 = time.perf_counter()
+    timings['score_ms'] = (t4 - t3) * 1e3
+    timings['total_ms'] = (t4 - t0) * 1e3
+    timings['scored'] = len(to_score)
+    return results, timings
 
 
 def infer_signal(symbol: str) -> Tuple[float, Dict[str, float]]:
@@ -15,47 +113,29 @@ def infer_signal(symbol: str) -> Tuple[float, Dict[str, float]]:
     If not enough data or training fails → returns neutral / momentum-based fallback signal
     so the dashboard never shows an ugly red error.
     """
-    model_path = f"models/rf_{symbol}.joblib"
-    scaler_path = f"models/scaler_{symbol}.joblib"
-
-    full_feats = engineer_features(symbol)
-
-    # ------------------------------------------------------------------
-    # 1. Not enough history → fallback to simple momentum signal (or neutral)
-    # ------------------------------------------------------------------
-    if len(full_feats) < 50:
-        momentum = full_feats.iloc[-1]["momentum_5d"] if len(full_feats) > 0 and "momentum_5d" in full_feats.columns else 0.0
-        signal = float(np.clip(momentum * 10, -1.0, 1.0))          # amplify a bit, still bounded
-        expl = {
-            "momentum_5d": 0.50,
-            "volatility": 0.30,
-            "corr_dxy": 0.15,
-            "macro_rate": 0.05,
-        }
-        print(f"[infer] Insufficient data for {symbol} → momentum fallback signal {signal:+.3f}")
-        return signal, expl
-
-    # ------------------------------------------------------------------
-    # 2. Enough data → use trained model (auto-train if missing)
-    # ------------------------------------------------------------------
-    feats = full_feats.iloc[-1:].drop(columns=["returns"], errors="ignore")
-
-    feature_cols = [c for c in full_feats.columns if c not in {"returns", "target", "symbol", "timestamp"}]
-
-    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-        print(f"[infer] Model missing for {symbol} → training now...")
-        train_model(symbol)                              # we already know len >= 50, so it will succeed
-
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-
-    X_scaled = scaler.transform(feats[feature_cols])
-
-    prob = model.predict_proba(X_scaled)[0][1]
-    signal = (prob - 0.5) * 2
-
-    expl = dict(zip(feature_cols, model.feature_importances_))
-    expl = dict(sorted(expl.items(), key=lambda x: x[1], reverse=True))
-
-    print(f"[infer] {symbol} signal {signal:+.3f} (model-based)")
-    return signal, expl
+    results, _ = infer_signals([symbol])
+    return results[symbol]
+
+
+@traced('infer')
+def publish_signals(symbols: Iterable[str]) -> Dict[str, float]:
+    """
+    infer_signals for the watchlist, written to the `signals` table stamped with each symbol's
+    latest feature bar and the model version that scored it (None for the momentum fallback).
+    Run by ops/refresher.py so the dashboard only ever reads the table. Returns the timings.
+    """
+    symbols = list(symbols)
+    results, timings = infer_signals(symbols)
+    latest = load_latest_features(symbols, FEATURE_VERSION)
+    records = latest_records(symbols)
+    rows = []
+    for symbol, (signal, expl) in results.items():
+        if symbol not in latest.index:
+            continue  # no bars yet, nothing to stamp the signal with
+        model_based = latest.at[symbol, 'n_rows'] >= MIN_HISTORY and symbol in records
+        rows.append({'symbol': symbol, 'timestamp': latest.at[symbol, 'timestamp'], 'signal': signal,
+                     'explanation': {k: float(v) for k, v in expl.items()},
+                     'model_version': records[symbol].version if model_based else None,
+                     'feature_version': FEATURE_VERSION})
+    timings['published'] = store_signals(rows)
+    return timings
@@ -0,0 +1,107 @@
+# src/models/orchestrator.py (Train many symbols' CV folds + final fits concurrently under one CPU budget)
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models.train import TrainingSet, fit_forest, fold_score, prepare_training_set, save_model
+from utils.config import TRAIN_CPU_BUDGET
+from utils.tracing import traced
+
+FINAL = -1  # fold index used for the full-history fit
+
+
+def _run_task(X: np.ndarray, y: np.ndarray, train_idx: Optional[np.ndarray],
+              val_idx: Optional[np.ndarray]) -> Tuple[object, float]:
+    """Worker body: one CV fold (returns its accuracy) or the final fit (returns the model), plus fit ms."""
+    t0 = time.perf_counter()
+    if val_idx is None:
+        result = fit_forest(X, y)
+    else:
+        result = fold_score(X, y, train_idx, val_idx)
+    return result, (time.perf_counter() - t0) * 1e3
+
+
+def _tasks(ts: TrainingSet) -> List[tuple]:
+    """
+    (cost, symbol, fold, X, y, train_idx, val_idx) per fold plus the final fit. Folds only ship
+    the prefix of the shared scaled matrix they actually touch.
+    """
+    tasks = []
+    for fold, (train_idx, val_idx) in enumerate(ts.splits):
+        end = int(val_idx[-1]) + 1
+        tasks.append((len(train_idx), ts.symbol, fold, ts.X_scaled[:end], ts.y[:end], train_idx, val_idx))
+    tasks.append((len(ts.y), ts.symbol, FINAL, ts.X_scaled, ts.y, None, None))
+    return tasks
+
+
+@traced('train')
+def train_many(symbols: Iterable[str], cpu_budget: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    train_model for a watchlist. Every symbol's folds and final fit go into one process pool
+    of `cpu_budget` workers (default TRAIN_CPU_BUDGET), each forest single-threaded, so the
+    machine is never oversubscribed. Biggest fits are queued first so the pool drains evenly.
+    Artifacts and model_metadata rows (with per-stage timings) are written from this process
+    as each symbol completes. Returns {symbol: metrics}; failed symbols are omitted.
+    """
+    budget = max(1, cpu_budget or TRAIN_CPU_BUDGET)
+    t_start = time.perf_counter()
+    sets: Dict[str, TrainingSet] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    for symbol in symbols:
+        t0 = time.perf_counter()
+        try:
+            sets[symbol] = prepare_training_set(symbol)
+        except Exception as e:
+            print(f"[train] Skipping {symbol}: {e}")
+            continue
+        timings[symbol] = {'prepare_ms': (time.perf_counter() - t0) * 1e3, 'cv_ms': 0.0}
+
+    tasks = sorted((t for ts in sets.values() for t in _tasks(ts)), key=lambda t: t[0], reverse=True)
+    pending = {s: len(ts.splits) + 1 for s, ts in sets.items()}
+    scores: Dict[str, Dict[int, float]] = {s: {} for s in sets}
+    models, failed, results = {}, set(), {}
+
+    def collect(symbol: str, fold: int, outcome, fit_ms: float) -> None:
+        if fold == FINAL:
+            models[symbol] = outcome
+            timings[symbol]['final_fit_ms'] = fit_ms
+        else:
+            scores[symbol][fold] = outcome
+            timings[symbol]['cv_ms'] += fit_ms
+        pending[symbol] -= 1
+        if pending[symbol] == 0 and symbol not in failed:
+            timings[symbol]['wall_ms'] = (time.perf_counter() - t_start) * 1e3
+            fold_scores = [scores[symbol][i] for i in sorted(scores[symbol])]
+            try:
+                results[symbol] = save_model(sets[symbol], models.pop(symbol), fold_scores, timings[symbol])
+            except Exception as e:
+                print(f"[train] Saving {symbol} failed: {e}")
+
+    if budget == 1 or len(tasks) <= 1:
+        for _, symbol, fold, X, y, train_idx, val_idx in tasks:
+            if symbol in failed:
+                continue
+            try:
+                collect(symbol, fold, *_run_task(X, y, train_idx, val_idx))
+            except Exception as e:
+                failed.add(symbol)
+                print(f"[train] {symbol} fold {fold} failed: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=min(budget, len(tasks))) as pool:
+            futures = {pool.submit(_run_task, X, y, train_idx, val_idx): (symbol, fold)
+                       for _, symbol, fold, X, y, train_idx, val_idx in tasks}
+            for future in as_completed(futures):
+                symbol, fold = futures[future]
+                try:
+                    outcome, fit_ms = future.result()
+                except Exception as e:
+                    failed.add(symbol)
+                    print(f"[train] {symbol} fold {fold} failed: {e}")
+                    continue
+                collect(symbol, fold, outcome, fit_ms)
+
+    print(f"[train] {len(results)}/{len(sets)} models trained in {(time.perf_counter() - t_start):.1f}s "
+          f"on {budget} worker(s)")
+    return results
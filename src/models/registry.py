@@ -0,0 +1,172 @@
+# src/models/registry.py (Model versions in model_metadata + bounded in-memory LRU of loaded scorers)
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+from storage.db_manager import engine, read_engine
+
+MODEL_DIR = 'models'
+MODEL_CACHE_SIZE = 8          # loaded scorers kept in memory
+PREDICTION_CACHE_SIZE = 256   # memoized (symbol, last bar, version) -> prediction
+
+
+class ModelRecord(NamedTuple):
+    symbol: str
+    version: int
+    trained_at: Optional[str]
+    feature_version: Optional[str]
+    paths: Dict[str, str]
+    metrics: Dict[str, Any]
+
+
+def model_name(symbol: str) -> str:
+    return f'RF_{symbol}'
+
+
+def artifact_paths(symbol: str) -> Dict[str, str]:
+    return {
+        'model': os.path.join(MODEL_DIR, f'rf_{symbol}.joblib'),
+        'scaler': os.path.join(MODEL_DIR, f'scaler_{symbol}.joblib'),
+        'compiled': os.path.join(MODEL_DIR, f'rf_{symbol}.npz'),
+    }
+
+
+def has_artifacts(paths: Dict[str, str]) -> bool:
+    """A compiled export alone is enough to score; otherwise the pickled model + scaler are needed."""
+    if paths.get('compiled') and os.path.exists(paths['compiled']):
+        return True
+    return all(os.path.exists(paths[k]) for k in ('model', 'scaler') if k in paths)
+
+
+def _parse_json(raw: Optional[str]) -> Dict:
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {}  # Rows written before the registry stored str(dict)
+
+
+def _parse_version(raw) -> int:
+    try:
+        return int(float(raw))
+    except (TypeError, ValueError):
+        return 0
+
+
+def latest_records(symbols: Iterable[str]) -> Dict[str, ModelRecord]:
+    """
+    Newest registered version per symbol in one query. Symbols with artifacts that predate
+    the registry get a version-0 record; symbols with neither are omitted.
+    """
+    symbols = list(symbols)
+    names = {model_name(s): s for s in symbols}
+    query = text("SELECT m.model_name, m.version, m.timestamp, m.params, m.metrics FROM model_metadata m "
+                 "JOIN (SELECT model_name, MAX(id) AS id FROM model_metadata WHERE model_name IN :names "
+                 "GROUP BY model_name) latest ON m.id = latest.id").bindparams(bindparam('names', expanding=True))
+    rows = []
+    try:
+        with read_engine.connect() as conn:
+            rows = conn.execute(query, {'names': list(names)}).fetchall()
+    except Exception as e:
+        print(f"[registry] Metadata lookup failed for {symbols}: {e}")
+
+    records = {}
+    for name, version, trained_at, raw_params, raw_metrics in rows:
+        symbol = names[name]
+        params = _parse_json(raw_params)
+        records[symbol] = ModelRecord(symbol, _parse_version(version), trained_at, params.get('feature_version'),
+                                      params.get('paths', artifact_paths(symbol)), _parse_json(raw_metrics))
+    for symbol in symbols:
+        paths = artifact_paths(symbol)
+        if symbol not in records and has_artifacts(paths):
+            records[symbol] = ModelRecord(symbol, 0, None, None, paths, {})
+    return records
+
+
+def latest_record(symbol: str) -> Optional[ModelRecord]:
+    return latest_records([symbol]).get(symbol)
+
+
+def register(symbol: str, metrics: Dict[str, Any], feature_version: str,
+             params: Optional[Dict[str, Any]] = None) -> ModelRecord:
+    """Record the artifacts just written by train_model as the next version and evict stale copies."""
+    previous = latest_record(symbol)
+    version = (previous.version if previous else 0) + 1
+    paths = artifact_paths(symbol)
+    payload = dict(params or {}, feature_version=feature_version, paths=paths)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO model_metadata (model_name, version, params, metrics) "
+                          "VALUES (:name, :ver, :params, :metrics)"),
+                     {'name': model_name(symbol), 'ver': str(version),
+                      'params': json.dumps(payload), 'metrics': json.dumps(metrics, default=float)})
+    invalidate(symbol)
+    return latest_record(symbol)
+
+
+# ---------------------------------------------------------------------------
+# In-process caches
+# ---------------------------------------------------------------------------
+
+_models: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+_predictions: "OrderedDict[tuple, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_artifacts(record: ModelRecord) -> Any:
+    """
+    Scorer for a record, loaded at most once per version while it stays in the LRU.
+    Prefers the compiled array export (numpy only); versions trained before it existed fall
+    back to the pickled estimator + scaler behind the same interface.
+    """
+    from models.compiled import CompiledForest, SklearnForest
+
+    key = (record.symbol, record.version)
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+    compiled = record.paths.get('compiled')
+    if compiled and os.path.exists(compiled):
+        artifacts = CompiledForest.load(compiled)
+    else:
+        import joblib
+        model, scaler = joblib.load(record.paths['model']), joblib.load(record.paths['scaler'])
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1  # Scoring a handful of rows: thread-pool startup costs more than the trees
+        artifacts = SklearnForest(model, scaler)
+    with _lock:
+        _models[key] = artifacts
+        _models.move_to_end(key)
+        while len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    return artifacts
+
+
+def get_prediction(key: tuple) -> Optional[Any]:
+    with _lock:
+        if key in _predictions:
+            _predictions.move_to_end(key)
+            return _predictions[key]
+    return None
+
+
+def put_prediction(key: tuple, value: Any) -> None:
+    with _lock:
+        _predictions[key] = value
+        _predictions.move_to_end(key)
+        while len(_predictions) > PREDICTION_CACHE_SIZE:
+            _predictions.popitem(last=False)
+
+
+def invalidate(symbol: str) -> None:
+    """Drop every cached model and prediction for `symbol` (called when a new version lands)."""
+    with _lock:
+        for key in [k for k in _models if k[0] == symbol]:
+            del _models[key]
+        for key in [k for k in _predictions if k[0] == symbol]:
+            del _predictions[key]
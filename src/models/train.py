@@ -1,62 +1,215 @@
 # src/models/train.py (FULL FINAL - Lowered min data to 30, adaptive CV splits)
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import StandardScaler
-import joblib
-from typing import Dict
-from features.engineer import engineer_features
-from sqlalchemy import text
-from storage.db_manager import engine
+import copy
+import math
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+from features.engineer import FEATURE_VERSION, engineer_features
+from models.registry import MODEL_DIR, artifact_paths, invalidate, latest_record, register
+from utils.tracing import traced
 import os
 
-os.makedirs('models', exist_ok=True)
+# sklearn and joblib cost ~1s to import and only training needs them, so they load on first use
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
 
-def train_model(symbol: str, target_col: str = 'target') -> Dict:
-    try:
-        feats = engineer_features(symbol)
-        if feats.empty or len(feats) < 30:  # FIXED: Lowered threshold to 30 for more flexibility
-            raise ValueError("Insufficient data for training")
-        feats['target'] = (feats['returns'].shift(-1) > 0).astype(int)
-        feats = feats.dropna(subset=['target'])  # Only drop target NaNs
-        if len(feats) < 30:  # FIXED: Consistent check
-            raise ValueError("Insufficient data after target shift")
-        
-        X = feats.drop(['returns', 'target', 'symbol', 'timestamp'], axis=1, errors='ignore')  # FIXED: Drop non-features too
-        y = feats['target']
+RF_PARAMS = {'n_estimators': 100, 'random_state': 42}
+TRAIN_N_JOBS = 1  # Fixed threads per forest; parallelism comes from running folds/symbols side by side
+
+# Incremental retraining
+REPLACE_FRACTION = 0.2    # share of the ensemble swapped out per update (oldest trees first)
+RECENT_WINDOW = 500       # rows the replacement trees are fitted on
+DRIFT_Z = 1.0             # |mean| of a scaled feature on the newest fold that means the scaler is stale
+DRIFT_TOLERANCE = 0.05    # live accuracy drop vs the last full fit's CV accuracy that forces a refit
+DRIFT_MIN_ROWS = 20       # live predictions needed before accuracy drift is judged
+
+
+class TrainingSet(NamedTuple):
+    symbol: str
+    columns: List[str]
+    X_scaled: np.ndarray
+    y: np.ndarray
+    scaler: 'StandardScaler'
+    last_timestamp: Optional[str]
+    splits: List[Tuple[np.ndarray, np.ndarray]]
+    timestamps: Optional[pd.Series] = None
+
+
+def prepare_training_set(symbol: str, target_col: str = 'target',
+                         scaler: Optional['StandardScaler'] = None) -> TrainingSet:
+    """
+    Feature matrix, target and CV folds for one symbol; every fold is a slice of the same scaled matrix.
+    Pass an already-fitted `scaler` to reuse it (incremental updates must keep the trees' units).
+    """
+    feats = engineer_features(symbol)
+    if feats.empty or len(feats) < 30:  # FIXED: Lowered threshold to 30 for more flexibility
+        raise ValueError("Insufficient data for training")
+    next_return = feats['returns'].shift(-1)
+    feats['target'] = (next_return > 0).astype(int).where(next_return.notna())  # last bar's outcome isn't known yet
+    feats = feats.dropna(subset=['target'])  # Only drop target NaNs
+    if len(feats) < 30:  # FIXED: Consistent check
+        raise ValueError("Insufficient data after target shift")
+
+    X = feats.drop(['returns', 'target', 'symbol', 'timestamp'], axis=1, errors='ignore')  # FIXED: Drop non-features too
+    y = feats['target'].to_numpy(dtype=int)
+    if scaler is None:
+        from sklearn.preprocessing import StandardScaler
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(X)
-        
-        n_splits = max(2, min(5, len(X)//10))  # FIXED: At least 2 splits, adaptive
-        tscv = TimeSeriesSplit(n_splits=n_splits)
-        scores = []
-        for train_idx, val_idx in tscv.split(X_scaled):
-            X_train, X_val = X_scaled[train_idx], X_scaled[val_idx]
-            y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-            model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_val)
-            scores.append(accuracy_score(y_val, y_pred))
-        
-        model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-        model.fit(X_scaled, y)
-        joblib.dump(model, f'models/rf_{symbol}.joblib')
-        joblib.dump(scaler, f'models/scaler_{symbol}.joblib')
-        
-        metrics = {'cv_accuracy': np.mean(scores) if scores else 0.5, 'n_features': X.shape[1], 'n_samples': len(X)}
-        
-        try:
-            with engine.connect() as conn:
-                conn.execute(text("INSERT INTO model_metadata (model_name, version, metrics) VALUES (:name, :ver, :metrics)"),
-                             {'name': f'RF_{symbol}', 'ver': '1.0', 'metrics': str(metrics)})
-                conn.commit()
-        except:
-            pass
-        
-        print(f"Trained RF for {symbol}: CV Acc {metrics['cv_accuracy']:.2f} on {metrics['n_samples']} samples")
-        return metrics
+    else:
+        X_scaled = scaler.transform(X)
+
+    n_splits = max(2, min(5, len(X)//10))  # FIXED: At least 2 splits, adaptive
+    from sklearn.model_selection import TimeSeriesSplit
+    splits = list(TimeSeriesSplit(n_splits=n_splits).split(X_scaled))
+    timestamps = pd.to_datetime(feats['timestamp']).reset_index(drop=True) if 'timestamp' in feats.columns else None
+    last_timestamp = str(timestamps.iloc[-1]) if timestamps is not None else None
+    return TrainingSet(symbol, list(X.columns), X_scaled, y, scaler, last_timestamp, splits, timestamps)
+
+
+def fit_forest(X: np.ndarray, y: np.ndarray, n_jobs: int = TRAIN_N_JOBS) -> 'RandomForestClassifier':
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(**RF_PARAMS, n_jobs=n_jobs)
+    model.fit(X, y)
+    return model
+
+
+def fold_score(X: np.ndarray, y: np.ndarray, train_idx: np.ndarray, val_idx: np.ndarray,
+               n_jobs: int = TRAIN_N_JOBS) -> float:
+    from sklearn.metrics import accuracy_score
+    model = fit_forest(X[train_idx], y[train_idx], n_jobs)
+    return accuracy_score(y[val_idx], model.predict(X[val_idx]))
+
+
+def export_compiled(model: 'RandomForestClassifier', scaler: 'StandardScaler', path: str,
+                    feature_names: List[str]) -> None:
+    """Flatten forest + scaler into an .npz the inference path can score without sklearn."""
+    from models.compiled import CompiledForest, flatten_forest
+    CompiledForest.save(flatten_forest(model, scaler, feature_names), path)
+
+
+def save_model(ts: TrainingSet, model: 'RandomForestClassifier', scores: List[float],
+               timings: Dict[str, float], extra: Optional[Dict] = None) -> Dict:
+    """Write artifacts, register the version (with its stage timings) and return the metrics."""
+    import joblib
+    t0 = time.perf_counter()
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    paths = artifact_paths(ts.symbol)
+    joblib.dump(model, paths['model'])
+    joblib.dump(ts.scaler, paths['scaler'])
+    export_compiled(model, ts.scaler, paths['compiled'], ts.columns)
+    timings = dict(timings, save_ms=(time.perf_counter() - t0) * 1e3)
+
+    metrics = {'cv_accuracy': np.mean(scores) if scores else 0.5, 'n_features': len(ts.columns),
+               'n_samples': len(ts.y), 'last_timestamp': ts.last_timestamp,
+               'timings': {k: round(v, 1) for k, v in timings.items()}, 'mode': 'full'}
+    metrics.update(extra or {})
+
+    try:
+        record = register(ts.symbol, metrics, FEATURE_VERSION,
+                          params=dict(RF_PARAMS, n_jobs=model.n_jobs, features=ts.columns,
+                                      n_estimators=len(model.estimators_)))
+        metrics['version'] = record.version
+    except Exception as e:
+        invalidate(ts.symbol)  # Artifacts on disk changed even if the version row didn't land
+        print(f"Model registry write failed for {ts.symbol}: {e}")
+
+    print(f"Trained RF for {ts.symbol}: CV Acc {metrics['cv_accuracy']:.2f} on {metrics['n_samples']} samples")
+    return metrics
+
+
+@traced('train')
+def train_model(symbol: str, target_col: str = 'target', n_jobs: int = TRAIN_N_JOBS) -> Dict:
+    """Single symbol, in-process. Use models.orchestrator.train_many to train a watchlist in parallel."""
+    try:
+        t0 = time.perf_counter()
+        ts = prepare_training_set(symbol, target_col)
+        t1 = time.perf_counter()
+        scores = [fold_score(ts.X_scaled, ts.y, train_idx, val_idx, n_jobs) for train_idx, val_idx in ts.splits]
+        t2 = time.perf_counter()
+        model = fit_forest(ts.X_scaled, ts.y, n_jobs)
+        t3 = time.perf_counter()
+        return save_model(ts, model, scores, {'prepare_ms': (t1 - t0) * 1e3, 'cv_ms': (t2 - t1) * 1e3,
+                                              'final_fit_ms': (t3 - t2) * 1e3})
     except Exception as e:
         print(f"Training failed for {symbol}: {e}")
         raise
+
+
+def _drift(ts: TrainingSet, val_idx: np.ndarray) -> Optional[str]:
+    """Reason string when the newest fold no longer looks like what the scaler was fitted on."""
+    shift = np.abs(ts.X_scaled[val_idx].mean(axis=0))
+    if shift.max() > DRIFT_Z:
+        worst = int(shift.argmax())
+        return f"feature drift: {ts.columns[worst]} mean {shift[worst]:.2f} sd from fit"
+    return None
+
+
+def _replace_oldest(model: 'RandomForestClassifier', X: np.ndarray, y: np.ndarray, n_replace: int,
+                    seed: int, n_jobs: int = TRAIN_N_JOBS) -> 'RandomForestClassifier':
+    """Copy of `model` minus its first n_replace trees plus n_replace new ones grown on (X, y)."""
+    updated = copy.copy(model)  # trees are shared, never mutated
+    updated.estimators_ = list(model.estimators_[n_replace:])  # trees are appended in fit order → oldest first
+    updated.set_params(warm_start=True, n_estimators=len(model.estimators_), random_state=seed, n_jobs=n_jobs)
+    updated.fit(X, y)
+    return updated
+
+
+@traced('train')
+def retrain_model(symbol: str, full: bool = False, n_jobs: int = TRAIN_N_JOBS) -> Dict:
+    """
+    Bring a symbol's model up to date as cheaply as possible.
+    With only new bars since the registered version, the oldest REPLACE_FRACTION of trees are
+    evicted and as many new ones are grown (warm_start) on the last RECENT_WINDOW rows, keeping
+    the registered scaler. Validation is only on the new bars, scored by the model that was live
+    for them, and accumulated across updates since the last full fit. A full train_model runs
+    instead when asked to, when there's no usable previous version, when the feature set or
+    already-trained history changed, or on feature or accuracy drift.
+    """
+    t0 = time.perf_counter()
+    record = None if full else latest_record(symbol)
+    reason = ('requested' if full else 'no previous version' if record is None
+              else 'feature set changed' if record.feature_version != FEATURE_VERSION
+              else 'no training watermark' if not record.metrics.get('last_timestamp')
+              else 'artifacts missing' if not all(os.path.exists(record.paths.get(k, '')) for k in ('model', 'scaler'))
+              else None)
+    if reason:
+        print(f"Full retrain for {symbol}: {reason}")
+        return train_model(symbol, n_jobs=n_jobs)
+
+    import joblib
+    model, scaler = joblib.load(record.paths['model']), joblib.load(record.paths['scaler'])
+    ts = prepare_training_set(symbol, scaler=scaler)
+    new_idx = np.flatnonzero(ts.timestamps > pd.Timestamp(record.metrics['last_timestamp']))
+    if not len(new_idx):
+        print(f"{symbol} model v{record.version} already covers the latest bar")
+        return dict(record.metrics, version=record.version)
+    if len(ts.y) - len(new_idx) != int(record.metrics.get('n_samples', -1)):
+        print(f"Full retrain for {symbol}: history before v{record.version}'s last bar changed")
+        return train_model(symbol, n_jobs=n_jobs)
+    t1 = time.perf_counter()
+
+    # Newest fold = labelled bars the live model never trained on
+    hits = int(record.metrics.get('live_hits', 0)) + int((model.predict(ts.X_scaled[new_idx]) == ts.y[new_idx]).sum())
+    rows = int(record.metrics.get('live_rows', 0)) + len(new_idx)
+    baseline = float(record.metrics.get('cv_accuracy', 0.5))
+    reason = _drift(ts, ts.splits[-1][1])
+    margin = DRIFT_TOLERANCE + 2 * math.sqrt(0.25 / rows)  # plus ~2 binomial standard errors
+    if reason is None and rows >= DRIFT_MIN_ROWS and hits / rows < baseline - margin:
+        reason = f"accuracy drift: live {hits / rows:.2f} over {rows} bars vs CV {baseline:.2f}"
+    t2 = time.perf_counter()
+    if reason:
+        print(f"Full retrain for {symbol}: {reason}")
+        return train_model(symbol, n_jobs=n_jobs)
+
+    n_replace = max(1, math.ceil(len(model.estimators_) * REPLACE_FRACTION))
+    seed = RF_PARAMS['random_state'] + record.version  # fresh bootstrap draws for every update
+    model = _replace_oldest(model, ts.X_scaled[-RECENT_WINDOW:], ts.y[-RECENT_WINDOW:], n_replace, seed, n_jobs)
+    t3 = time.perf_counter()
+    return save_model(ts, model, [baseline],
+                      {'prepare_ms': (t1 - t0) * 1e3, 'validate_ms': (t2 - t1) * 1e3, 'final_fit_ms': (t3 - t2) * 1e3},
+                      extra={'mode': 'incremental', 'new_rows': len(new_idx), 'trees_replaced': n_replace,
+                             'base_version': record.version, 'live_hits': hits, 'live_rows': rows,
+                             'live_accuracy': hits / rows})
@@ -0,0 +1,370 @@
+# src/storage/columnar.py (Per-symbol column files, memory-mapped for zero-copy range loads)
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.config import COLUMNAR_DIR
+
+try:
+    import fcntl  # cross-process writer lock; Windows falls back to the in-process lock only
+except ImportError:
+    fcntl = None
+
+OHLC_SCHEMA = {'timestamp': 'int64', 'open': 'float64', 'high': 'float64', 'low': 'float64',
+               'close': 'float64', 'volume': 'float64', 'source': 'category'}
+CATEGORY_DTYPE = 'int16'   # codes into the store's label list; -1 = missing
+_VERSION_FILE = 'VERSION'
+
+
+class ColumnStore:
+    """
+    One directory of raw little-endian column files sharing a sorted int64 `timestamp` column.
+    `meta.json` holds the committed row count, so readers never see a half-finished append.
+    New bars are appended in place (existing memory maps stay valid as a file grows); a
+    revision of already-stored bars, or a replace of the whole contents, rewrites the columns into
+    a new generation of files and unlinks the old ones, which open maps keep alive until they are
+    dropped.
+    """
+
+    def __init__(self, path: str, schema: Dict[str, str], keep_if_missing: Sequence[str] = ()):
+        self.path = path
+        self.schema = schema
+        self.keep_if_missing = set(keep_if_missing)  # incoming NaN/None keeps the stored value
+        self._lock = threading.Lock()
+
+    # -- layout -----------------------------------------------------------
+
+    def _dtype(self, column: str) -> np.dtype:
+        return np.dtype(CATEGORY_DTYPE if self.schema[column] == 'category' else self.schema[column])
+
+    def _file(self, column: str, gen: int) -> str:
+        return os.path.join(self.path, f"{column}.{gen}.bin")
+
+    def meta(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'gen': 0, 'rows': 0, 'labels': {}}
+
+    def _commit(self, meta: Dict) -> None:
+        tmp = os.path.join(self.path, f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    # -- reads ------------------------------------------------------------
+
+    def arrays(self, meta: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column, `rows` long (empty arrays for an empty store)."""
+        for _ in range(3):
+            meta = meta or self.meta()
+            if meta['rows'] == 0:
+                return {c: np.empty(0, dtype=self._dtype(c)) for c in self.schema}
+            try:
+                return {c: np.memmap(self._file(c, meta['gen']), dtype=self._dtype(c), mode='r',
+                                     shape=(meta['rows'],)) for c in self.schema}
+            except FileNotFoundError:
+                meta = None  # a revision swapped generations under us; re-read meta
+        raise RuntimeError(f"Column store {self.path} keeps changing generation")
+
+    def labels(self, column: str, meta: Optional[Dict] = None) -> List[str]:
+        return (meta or self.meta())['labels'].get(column, [])
+
+    def slice_from(self, start_ns: int, meta: Optional[Dict] = None,
+                   end_ns: Optional[int] = None) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Zero-copy views of rows with start_ns <= timestamp (<= end_ns when given)."""
+        meta = meta or self.meta()
+        arrays = self.arrays(meta)
+        first = int(np.searchsorted(arrays['timestamp'], start_ns, side='left'))
+        last = len(arrays['timestamp']) if end_ns is None else int(np.searchsorted(arrays['timestamp'], end_ns, side='right'))
+        return {c: a[first:last] for c, a in arrays.items()}, meta
+
+    # -- writes -----------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _writer(self):
+        """One writer per store across threads and (where fcntl exists) processes."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, '.lock'), 'w') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def _encode(self, column: str, values, meta: Dict) -> np.ndarray:
+        labels = meta['labels'].setdefault(column, [])
+        lookup = {label: i for i, label in enumerate(labels)}
+        # Factorize first so the Python-level lookup runs once per distinct value, not per row
+        uniq_codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        mapping = np.empty(len(uniques), dtype=CATEGORY_DTYPE)
+        for i, value in enumerate(uniques):
+            if value not in lookup:
+                lookup[value] = len(labels)
+                labels.append(value)
+            mapping[i] = lookup[value]
+        if not len(mapping):
+            return np.full(len(values), -1, dtype=CATEGORY_DTYPE)
+        return np.where(uniq_codes >= 0, mapping[uniq_codes], -1).astype(CATEGORY_DTYPE)
+
+    def write(self, data: Dict[str, np.ndarray], replace: bool = False) -> Tuple[Dict[str, int], Optional[int]]:
+        """
+        Upsert rows (any order; last duplicate wins). Rows identical to what's stored are
+        skipped. Returns ({'inserted', 'updated', 'unchanged'}, first changed timestamp in ns or None).
+        `replace` swaps the whole contents for `data` in one commit: readers see either the old
+        rows or the new ones, never an empty store in between.
+        """
+        with self._writer():
+            meta = self.meta()
+            if replace:
+                meta = {'gen': meta['gen'], 'rows': meta['rows'], 'labels': {}}  # labels re-encoded from scratch
+            ts = np.asarray(data['timestamp'], dtype='int64')
+            # Sort, keeping the last occurrence of each timestamp
+            order = np.lexsort((np.arange(len(ts)), ts))
+            ts = ts[order]
+            keep = np.append(ts[1:] != ts[:-1], True) if len(ts) else np.zeros(0, bool)
+            incoming = {'timestamp': ts[keep]}
+            for c in self.schema:
+                if c == 'timestamp':
+                    continue
+                values = np.asarray(data[c], dtype=object if self.schema[c] == 'category' else None)[order][keep]
+                incoming[c] = self._encode(c, values, meta) if self.schema[c] == 'category' \
+                    else values.astype(self._dtype(c))
+            n_in = len(incoming['timestamp'])
+            stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+            if replace:
+                self._replace(incoming, meta)
+                stats['inserted'] = n_in
+                return stats, int(incoming['timestamp'][0]) if n_in else None
+            if n_in == 0:
+                return stats, None
+
+            stored = self.arrays(meta)
+            pos = np.searchsorted(stored['timestamp'], incoming['timestamp'])
+            matched = (pos < meta['rows'])
+            matched[matched] = stored['timestamp'][pos[matched]] == incoming['timestamp'][matched]
+            same = matched.copy()
+            for c in self.schema:
+                if c == 'timestamp' or not matched.any():
+                    continue
+                old = stored[c][pos[matched]]
+                new = incoming[c][matched]
+                missing = (new == -1) if self.schema[c] == 'category' else np.isnan(new)
+                if c in self.keep_if_missing:
+                    new = np.where(missing, old, new)
+                    incoming[c][matched] = new
+                eq = (old == new) if self.schema[c] == 'category' else ((old == new) | (np.isnan(old) & np.isnan(new)))
+                same[matched] &= eq
+            stats['inserted'] = int((~matched).sum())
+            stats['updated'] = int((matched & ~same).sum())
+            stats['unchanged'] = int(same.sum())
+            write = ~same
+            if not write.any():
+                return stats, None
+            changes = {c: v[write] for c, v in incoming.items()}
+            changed_from = int(changes['timestamp'][0])
+
+            if meta['rows'] == 0 or changed_from > int(stored['timestamp'][-1]):
+                self._append(changes, meta)
+            else:
+                self._rewrite(stored, changes, changed_from, meta)
+            return stats, changed_from
+
+    def _append(self, changes: Dict[str, np.ndarray], meta: Dict) -> None:
+        rows = meta['rows']
+        for c in self.schema:
+            with open(self._file(c, meta['gen']), 'ab') as f:
+                f.truncate(rows * self._dtype(c).itemsize)  # drop bytes of an append that never committed
+                f.write(np.ascontiguousarray(changes[c], dtype=self._dtype(c)).tobytes())
+        meta['rows'] = rows + len(changes['timestamp'])
+        self._commit(meta)
+
+    def _rewrite(self, stored: Dict[str, np.ndarray], changes: Dict[str, np.ndarray],
+                 changed_from: int, meta: Dict) -> None:
+        cut = int(np.searchsorted(stored['timestamp'], changed_from))
+        tail_ts = stored['timestamp'][cut:]
+        replaced = np.isin(tail_ts, changes['timestamp'])
+        merged_ts = np.concatenate([tail_ts[~replaced], changes['timestamp']])
+        order = np.argsort(merged_ts, kind='stable')
+        old_gen, new_gen = meta['gen'], meta['gen'] + 1
+        for c in self.schema:
+            tail = np.concatenate([stored[c][cut:][~replaced], changes[c]])[order]
+            with open(self._file(c, new_gen), 'wb') as f:
+                f.write(np.ascontiguousarray(stored[c][:cut]).tobytes())
+                f.write(np.ascontiguousarray(tail, dtype=self._dtype(c)).tobytes())
+        meta['gen'] = new_gen
+        meta['rows'] = cut + len(merged_ts)
+        self._commit(meta)
+        self._drop_generation(old_gen)
+
+    def _replace(self, incoming: Dict[str, np.ndarray], meta: Dict) -> None:
+        old_gen, new_gen = meta['gen'], meta['gen'] + 1
+        for c in self.schema:
+            with open(self._file(c, new_gen), 'wb') as f:
+                f.write(np.ascontiguousarray(incoming[c], dtype=self._dtype(c)).tobytes())
+        meta['gen'] = new_gen
+        meta['rows'] = len(incoming['timestamp'])
+        self._commit(meta)
+        self._drop_generation(old_gen)
+
+    def _drop_generation(self, gen: int) -> None:
+        for c in self.schema:
+            try:
+                os.remove(self._file(c, gen))  # open maps keep the old inode alive
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# OHLC + features on top of ColumnStore
+# ---------------------------------------------------------------------------
+
+def _ohlc_store(symbol: str) -> ColumnStore:
+    return ColumnStore(os.path.join(COLUMNAR_DIR, 'ohlc', symbol), OHLC_SCHEMA, keep_if_missing=('source',))
+
+
+def _feature_store(symbol: str, version: str, columns: Sequence[str]) -> ColumnStore:
+    schema = dict({'timestamp': 'int64'}, **{c: 'float64' for c in columns})
+    return ColumnStore(os.path.join(COLUMNAR_DIR, 'features', version, symbol), schema)
+
+
+def data_version() -> Optional[str]:
+    """Token rewritten on every OHLC change from any process (None before the first write)."""
+    try:
+        with open(os.path.join(COLUMNAR_DIR, _VERSION_FILE)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _touch_version() -> None:
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    tmp = os.path.join(COLUMNAR_DIR, f"{_VERSION_FILE}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(f"{time.time_ns()}-{os.getpid()}")
+    os.replace(tmp, os.path.join(COLUMNAR_DIR, _VERSION_FILE))
+
+
+def to_ns(timestamps) -> np.ndarray:
+    """Timestamps (strings, datetimes, tz-aware) -> naive-UTC int64 nanoseconds."""
+    ts = pd.to_datetime(pd.Series(timestamps))
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+    return ts.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _start_ns(start) -> int:
+    return int(pd.Timestamp(start).as_unit('ns').value) if start else np.iinfo('int64').min
+
+
+def upsert_ohlc(df: pd.DataFrame) -> Tuple[Dict[str, int], Dict[str, pd.Timestamp]]:
+    """Write an OHLC frame (any symbols). Returns (row stats, {symbol: first changed bar})."""
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    changed = {}
+    ts_all = to_ns(df['timestamp'])
+    for symbol, idx in df.groupby(df['symbol'].astype(str), sort=False).indices.items():
+        part = df.iloc[idx]
+        data = {'timestamp': ts_all[idx]}
+        for c in OHLC_SCHEMA:
+            if c == 'timestamp':
+                continue
+            if c == 'source':
+                data[c] = part[c].astype(object).where(part[c].notna(), None).to_numpy() if c in part.columns \
+                    else np.full(len(part), None, dtype=object)
+            else:
+                data[c] = part[c].to_numpy(dtype='float64', na_value=np.nan) if c in part.columns \
+                    else np.full(len(part), np.nan)
+        sym_stats, changed_from = _ohlc_store(symbol).write(data)
+        for k in stats:
+            stats[k] += sym_stats[k]
+        if changed_from is not None:
+            changed[symbol] = pd.Timestamp(changed_from)
+    if changed:
+        _touch_version()
+    return stats, changed
+
+
+def load_ohlc(symbol: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+    """Same columns as the SQLite path (minus `id`); numeric columns are views of the memory maps."""
+    store = _ohlc_store(symbol)
+    end_ns = int(pd.Timestamp(end_date).as_unit('ns').value) if end_date else None
+    arrays, meta = store.slice_from(_start_ns(start_date), end_ns=end_ns)
+    n = len(arrays['timestamp'])
+    if n == 0:
+        return pd.DataFrame()
+    frame = {'symbol': pd.Categorical.from_codes(np.zeros(n, dtype='int8'), [symbol]),
+             'timestamp': arrays['timestamp'].view('datetime64[ns]')}
+    frame.update({c: arrays[c] for c in ('open', 'high', 'low', 'close', 'volume')})
+    frame['source'] = pd.Categorical.from_codes(arrays['source'], store.labels('source', meta))
+    return pd.DataFrame(frame, copy=False)
+
+
+def latest_timestamps(symbols: Iterable[str]) -> Dict[str, pd.Timestamp]:
+    latest = {}
+    for symbol in symbols:
+        ts = _ohlc_store(symbol).arrays()['timestamp']
+        if len(ts):
+            latest[symbol] = pd.Timestamp(int(ts[-1]))
+    return latest
+
+
+def panel_columns(symbols: Sequence[str], start, fields: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    (sorted union of timestamps in ns, {field: time x symbol float64 array}) built straight
+    from the memory maps: one searchsorted per symbol places its rows in the union index.
+    """
+    start_ns = _start_ns(start)
+    slices = [_ohlc_store(s).slice_from(start_ns)[0] for s in symbols]
+    index = np.unique(np.concatenate([sl['timestamp'] for sl in slices])) if slices else np.empty(0, 'int64')
+    out = {f: np.full((len(index), len(symbols)), np.nan) for f in fields}
+    for j, sl in enumerate(slices):
+        rows = np.searchsorted(index, sl['timestamp'])
+        for f in fields:
+            out[f][rows, j] = sl[f]
+    return index, out
+
+
+def store_features(symbol: str, version: str, feats: pd.DataFrame, columns: Sequence[str],
+                   replace: bool = False) -> int:
+    data = {'timestamp': to_ns(feats['timestamp'])}
+    data.update({c: feats[c].to_numpy(dtype='float64') for c in columns})
+    _feature_store(symbol, version, columns).write(data, replace=replace)
+    return len(feats)
+
+
+def drop_features(symbol: str, keep_version: str) -> None:
+    """Remove a symbol's features stored under any other feature-set version."""
+    root = os.path.join(COLUMNAR_DIR, 'features')
+    for version in os.listdir(root) if os.path.isdir(root) else []:
+        if version != keep_version:
+            shutil.rmtree(os.path.join(root, version, symbol), ignore_errors=True)
+
+
+def load_features(symbol: str, version: str, columns: Sequence[str], start_date: Optional[str] = None) -> pd.DataFrame:
+    arrays, _ = _feature_store(symbol, version, columns).slice_from(_start_ns(start_date))
+    if not len(arrays['timestamp']):
+        return pd.DataFrame()
+    frame = {'symbol': pd.Categorical.from_codes(np.zeros(len(arrays['timestamp']), dtype='int8'), [symbol]),
+             'timestamp': arrays['timestamp'].view('datetime64[ns]')}
+    frame.update({c: arrays[c] for c in columns})
+    return pd.DataFrame(frame, copy=False)
+
+
+def load_latest_features(symbols: Iterable[str], version: str, columns: Sequence[str]) -> pd.DataFrame:
+    rows = []
+    for symbol in symbols:
+        arrays = _feature_store(symbol, version, columns).arrays()
+        n = len(arrays['timestamp'])
+        if n:
+            rows.append(dict({'symbol': symbol, 'timestamp': pd.Timestamp(int(arrays['timestamp'][-1]))},
+                             **{c: float(arrays[c][-1]) for c in columns}, n_rows=n))
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index('symbol')
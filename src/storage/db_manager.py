@@ -1,12 +1,54 @@
 # src/storage/db_manager.py (FULL FINAL - Removed to_numeric)
 import os
+import threading
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text, inspect
-from utils.config import DB_PATH
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from sqlalchemy import bindparam, create_engine, event, text, inspect
+from utils.config import DB_PATH, STORAGE_BACKEND
+from utils.tracing import traced
 
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+# One storage layer for the whole process; nothing else should call create_engine on the DB.
+# `engine` is the single serialized writer (one pooled connection, so writers queue here rather
+# than on SQLite's file lock); `read_engine` is a pool of query-only connections that, in WAL
+# mode, keep reading the last committed snapshot while a write is in flight.
+READ_POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 10000  # other processes (refresher, migrate.py) can hold the write lock
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',     # persistent in the file; readers never block on the writer
+    'synchronous': 'NORMAL',   # fsync at checkpoints only; still crash-consistent under WAL
+    'cache_size': -65536,      # 64 MB page cache per connection
+    'mmap_size': 268435456,    # 256 MB read through the OS page cache instead of read() calls
+    'temp_store': 'MEMORY',
+    'busy_timeout': BUSY_TIMEOUT_MS,
+}
+# cached_statements: sqlite3's per-connection prepared-statement cache, keyed on the SQL text,
+# so the fixed text() queries below are parsed once per pooled connection
+_CONNECT_ARGS = {"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000, "cached_statements": 256}
 
-engine = create_engine(f'sqlite:///{DB_PATH}', connect_args={"check_same_thread": False})
+
+def _tune_connection(dbapi_conn, read_only: bool) -> None:
+    cursor = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+engine = create_engine(f'sqlite:///{DB_PATH}', connect_args=_CONNECT_ARGS,
+                       pool_size=1, max_overflow=0, pool_timeout=BUSY_TIMEOUT_MS / 1000)
+read_engine = create_engine(f'sqlite:///{DB_PATH}', connect_args=_CONNECT_ARGS,
+                            pool_size=READ_POOL_SIZE, max_overflow=READ_POOL_SIZE)
+event.listen(engine, 'connect', lambda conn, _: _tune_connection(conn, read_only=False))
+event.listen(read_engine, 'connect', lambda conn, _: _tune_connection(conn, read_only=True))
+
+# Where bars and features live; read at call time so tools can switch between backends
+BACKEND = STORAGE_BACKEND
+
+
+def _columnar() -> bool:
+    return BACKEND == 'columnar'
 
 def init_schema_if_needed():
     inspector = inspect(engine)
@@ -30,7 +72,9 @@ def init_schema_if_needed():
             date DATE NOT NULL,
             metric VARCHAR(50) NOT NULL,
             value REAL,
-            UNIQUE(metric, date)
+            release_date DATE NOT NULL,
+            source VARCHAR(20),
+            UNIQUE(metric, date, release_date)
         );
 
         CREATE TABLE IF NOT EXISTS features (
@@ -42,6 +86,7 @@ def init_schema_if_needed():
             momentum_5d REAL,
             corr_dxy REAL,
             macro_rate REAL,
+            version VARCHAR(16),
             UNIQUE(symbol, date)
         );
 
@@ -55,41 +100,646 @@ def init_schema_if_needed():
         );
         """
         with engine.connect() as conn:
-            conn.execute(text(schema_sql))
+            # sqlite3 only runs one statement per execute()
+            for statement in schema_sql.split(';'):
+                if statement.strip():
+                    conn.execute(text(statement))
             conn.commit()
         print("Schema created.")
+    migrate_schema()
+
+
+def migrate_schema():
+    # Additive changes for databases created before the feature store existed
+    with engine.connect() as conn:
+        # Inspect through this connection: the writer pool holds one, a second checkout would wait
+        if 'version' not in {c['name'] for c in inspect(conn).get_columns('features')}:
+            conn.execute(text("ALTER TABLE features ADD COLUMN version VARCHAR(16)"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS feature_state (
+                symbol VARCHAR(10) PRIMARY KEY,
+                version VARCHAR(16) NOT NULL,
+                reference VARCHAR(10),
+                stale_from DATETIME,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        # Written by ops/refresher.py, read by the dashboard: one signal per symbol and bar
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS signals (
+                symbol VARCHAR(10) NOT NULL,
+                timestamp DATETIME NOT NULL,
+                signal REAL NOT NULL,
+                explanation TEXT,
+                model_version INTEGER,
+                feature_version VARCHAR(16),
+                computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, timestamp)
+            )
+        """))
+        # Macro observations carry the date each value was published, one row per vintage;
+        # databases from before point-in-time ingestion had one undated value per period
+        if 'release_date' not in {c['name'] for c in inspect(conn).get_columns('fundamentals')}:
+            conn.execute(text("ALTER TABLE fundamentals RENAME TO fundamentals_old"))
+            conn.execute(text("""
+                CREATE TABLE fundamentals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date DATE NOT NULL,
+                    metric VARCHAR(50) NOT NULL,
+                    value REAL,
+                    release_date DATE NOT NULL,
+                    source VARCHAR(20),
+                    UNIQUE(metric, date, release_date)
+                )
+            """))
+            conn.execute(text("INSERT INTO fundamentals (date, metric, value, release_date) "
+                              "SELECT date, metric, value, date FROM fundamentals_old"))
+            conn.execute(text("DROP TABLE fundamentals_old"))
+        # Bumped in the same transaction as every raw_ohlc change, so readers in other processes
+        # (the dashboard, while ops/refresher.py writes) see revisions that keep MAX(id)
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS ohlc_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text("INSERT OR IGNORE INTO ohlc_state (id, version) VALUES (1, 0)"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS macro_state (
+                metric VARCHAR(50) PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                fetched_at DATETIME,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.commit()
+
+_storage_ready = False
+_init_lock = threading.Lock()
+
+
+def init_storage() -> None:
+    """
+    Startup hook: create the DB directory and schema, once per process. Entry points (the app,
+    migrate.py, ops scripts) call this before touching storage; importing the module only builds
+    the engines, which don't connect until first use.
+    """
+    global _storage_ready
+    with _init_lock:
+        if _storage_ready:
+            return
+        os.makedirs(os.path.dirname(DB_PATH) or '.', exist_ok=True)
+        try:
+            init_schema_if_needed()
+        except Exception as e:
+            print(f"Schema error: {e}")
+            return
+        _storage_ready = True
+
+OHLC_COLUMNS = ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'source']
+OHLC_VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'source']
+
+_STAGE_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_ohlc (
+        symbol VARCHAR(10) NOT NULL,
+        timestamp DATETIME NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume INTEGER,
+        source VARCHAR(20)
+    )
+"""
+
+# A NULL incoming source keeps the stored one (several fetchers don't tag their rows)
+_SAME_SQL = ' AND '.join([f"r.{c} IS s.{c}" for c in OHLC_VALUE_COLUMNS if c != 'source'] +
+                         ["(s.source IS NULL OR r.source IS s.source)"])
+_CHANGED_SQL = ' OR '.join([f"raw_ohlc.{c} IS NOT excluded.{c}" for c in OHLC_VALUE_COLUMNS if c != 'source'] +
+                           ["(excluded.source IS NOT NULL AND raw_ohlc.source IS NOT excluded.source)"])
+
+_STAGE_DIFF_SQL = f"""
+    SELECT COUNT(*), COALESCE(SUM(CASE WHEN {_SAME_SQL} THEN 1 ELSE 0 END), 0)
+    FROM _stage_ohlc s JOIN raw_ohlc r ON r.symbol = s.symbol AND r.timestamp = s.timestamp
+"""
+
+# First inserted/changed bar per symbol, used to invalidate materialized features
+_STAGE_CHANGED_FROM_SQL = f"""
+    SELECT s.symbol, MIN(s.timestamp)
+    FROM _stage_ohlc s LEFT JOIN raw_ohlc r ON r.symbol = s.symbol AND r.timestamp = s.timestamp
+    WHERE r.symbol IS NULL OR NOT ({_SAME_SQL})
+    GROUP BY s.symbol
+"""
+
+_INVALIDATE_FEATURES_SQL = """
+    UPDATE feature_state
+    SET stale_from = CASE WHEN stale_from IS NULL OR stale_from > ? THEN ? ELSE stale_from END
+    WHERE symbol = ? OR reference = ?
+"""
+
+_BUMP_OHLC_VERSION_SQL = "UPDATE ohlc_state SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+
+_STAGE_MERGE_SQL = f"""
+    INSERT INTO raw_ohlc (symbol, timestamp, open, high, low, close, volume, source)
+    SELECT symbol, timestamp, open, high, low, close, volume, source FROM _stage_ohlc WHERE true
+    ON CONFLICT(symbol, timestamp) DO UPDATE SET
+        open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close,
+        volume = excluded.volume, source = COALESCE(excluded.source, raw_ohlc.source)
+    WHERE {_CHANGED_SQL}
+"""
+
+
+def _nullable(values: np.ndarray) -> list:
+    """Float column -> list with NaN mapped to None (SQL NULL)."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def _ohlc_records(df: pd.DataFrame) -> List[tuple]:
+    """Column-wise conversion of an OHLC frame into executemany parameter tuples."""
+    ts = pd.to_datetime(df['timestamp'])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+    n = len(df)
+    columns = [
+        df['symbol'].astype(str).tolist(),
+        ts.dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+    ]
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        values = df[col].to_numpy(dtype='float64', na_value=np.nan) if col in df.columns else np.full(n, np.nan)
+        columns.append(_nullable(values))
+    if 'source' in df.columns:
+        columns.append(df['source'].astype(object).where(df['source'].notna(), None).tolist())
+    else:
+        columns.append([None] * n)
+    return list(zip(*columns))
+
+
+@traced('store', measure_arg='frames')
+def bulk_upsert_ohlc(frames: Union[pd.DataFrame, Dict[str, pd.DataFrame], Iterable[pd.DataFrame]]) -> Dict[str, int]:
+    """
+    Upsert one or many OHLC frames into raw_ohlc in a single transaction.
+    Rows are bulk-loaded into a temp staging table with executemany, diffed against
+    raw_ohlc and merged with one INSERT ... ON CONFLICT statement.
+    Returns {'inserted', 'updated', 'unchanged'} row counts.
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    elif isinstance(frames, dict):
+        frames = list(frames.values())
+    frames = [f for f in frames if f is not None and not f.empty]
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if not frames:
+        return stats
 
-try:
-    init_schema_if_needed()
-except Exception as e:
-    print(f"Schema error: {e}")
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df = df.dropna(subset=['symbol', 'timestamp'])
+    if _columnar():
+        return _columnar_upsert_ohlc(df)
+    records = _ohlc_records(df)
+    # Last write wins for duplicate (symbol, timestamp) pairs inside the batch
+    records = list({(r[0], r[1]): r for r in records}.values())
 
-def store_ohlc(df: pd.DataFrame) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(_STAGE_DDL)
+        conn.exec_driver_sql("DELETE FROM _stage_ohlc")
+        conn.exec_driver_sql(
+            "INSERT INTO _stage_ohlc (symbol, timestamp, open, high, low, close, volume, source) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+        matched, unchanged = conn.exec_driver_sql(_STAGE_DIFF_SQL).one()
+        changed_from = conn.exec_driver_sql(_STAGE_CHANGED_FROM_SQL).fetchall()
+        conn.exec_driver_sql(_STAGE_MERGE_SQL)
+        if changed_from:
+            conn.exec_driver_sql(_INVALIDATE_FEATURES_SQL, [(ts, ts, sym, sym) for sym, ts in changed_from])
+            conn.exec_driver_sql(_BUMP_OHLC_VERSION_SQL)
+        conn.exec_driver_sql("DROP TABLE _stage_ohlc")
+
+    stats['inserted'] = len(records) - matched
+    stats['updated'] = matched - unchanged
+    stats['unchanged'] = unchanged
+    return stats
+
+
+def _columnar_upsert_ohlc(df: pd.DataFrame) -> Dict[str, int]:
+    from storage import columnar
+
+    stats, changed = columnar.upsert_ohlc(df)
+    if changed:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(_INVALIDATE_FEATURES_SQL,
+                                 [(_sql_ts(ts), _sql_ts(ts), sym, sym) for sym, ts in changed.items()])
+    return stats
+
+
+def store_ohlc(df: pd.DataFrame) -> Dict[str, int]:
     if df.empty:
-        return
-    df = df.copy()
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
     try:
-        with engine.connect() as conn:
-            upsert_sql = text("""
-                INSERT OR REPLACE INTO raw_ohlc (symbol, timestamp, open, high, low, close, volume, source)
-                VALUES (:symbol, :timestamp, :open, :high, :low, :close, :volume, :source)
-            """)
-            for _, row in df.iterrows():
-                conn.execute(upsert_sql, row.to_dict())
-            conn.commit()
-        print(f"Stored {len(df)} rows.")
+        stats = bulk_upsert_ohlc(df)
+        print(f"Stored {len(df)} rows ({stats['inserted']} new, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged).")
+        return stats
     except Exception as e:
         print(f"Store error: {e}")
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
 
-def load_ohlc(symbol: str, start_date: str) -> pd.DataFrame:
+@traced('load')
+def load_ohlc(symbol: str, start_date: str, end_date: Optional[str] = None, compact: bool = False) -> pd.DataFrame:
+    """
+    Bars with start_date <= timestamp, and <= end_date when given (both inclusive).
+    compact=True streams them into compact arrays instead (storage/stream.py): same columns, but
+    float32 values where that loses nothing, categorical symbol/source and no `id`.
+    """
     try:
-        query = text("SELECT * FROM raw_ohlc WHERE symbol = :symbol AND timestamp >= :start_date ORDER BY timestamp")
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn, params={'symbol': symbol, 'start_date': start_date})
+        if compact:
+            from storage.stream import load_ohlc_compact
+            bars = load_ohlc_compact(symbol, start_date, end_date)
+            return bars.to_frame() if len(bars) else pd.DataFrame()
+        if _columnar():
+            from storage import columnar
+            return columnar.load_ohlc(symbol, start_date, end_date)
+        params = {'symbol': symbol, 'start_date': start_date}
+        sql = "SELECT * FROM raw_ohlc WHERE symbol = :symbol AND timestamp >= :start_date"
+        if end_date is not None:
+            sql += " AND timestamp <= :end_date"
+            params['end_date'] = _sql_ts(end_date)
+        with read_engine.connect() as conn:
+            df = pd.read_sql(text(sql + " ORDER BY timestamp"), conn, params=params)
         if not df.empty:
             df['timestamp'] = pd.to_datetime(df['timestamp'])
         return df
     except Exception as e:
         print(f"Load error: {e}")
         return pd.DataFrame()
+
+
+# ---------------------------------------------------------------------------
+# Cross-asset panels, cached per data version
+# ---------------------------------------------------------------------------
+
+PANEL_CACHE_SIZE = 16
+_panel_cache: Dict[tuple, Dict[str, pd.DataFrame]] = {}
+_panel_lock = threading.Lock()
+
+
+def data_version() -> Tuple:
+    """
+    (last row id, its timestamp, ohlc_state version) — O(1) on the rowid index and the one-row
+    table. The version is committed with each change by any process, so it also moves on
+    revisions that keep MAX(id); the id still catches rows written outside bulk_upsert_ohlc.
+    """
+    if _columnar():
+        from storage import columnar
+        return ('columnar', columnar.data_version())
+    with read_engine.connect() as conn:
+        row = conn.execute(text("SELECT id, timestamp FROM raw_ohlc ORDER BY id DESC LIMIT 1")).fetchone()
+        version = conn.execute(text("SELECT version FROM ohlc_state WHERE id = 1")).scalar()
+    return (tuple(row) if row else (None, None)) + (version,)
+
+
+@traced('load')
+def load_panel(symbols: Sequence[str], start: str = '2020-01-01',
+               fields: Sequence[str] = ('close',)) -> Dict[str, pd.DataFrame]:
+    """
+    One query for several symbols, returned as {field: timestamp x symbol frame}.
+    Each frame wraps a single C-contiguous float64 array (NaN where a symbol has no bar),
+    so frame.to_numpy() is zero-copy. Results are cached per data version and shared
+    between callers: treat them as read-only.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    fields = list(fields)
+    key = (tuple(symbols), start, tuple(fields), data_version())
+    with _panel_lock:
+        if key in _panel_cache:
+            return _panel_cache[key]
+
+    if _columnar():
+        from storage import columnar
+        ts_ns, arrays = columnar.panel_columns(symbols, start, fields)
+        index = pd.DatetimeIndex(ts_ns.view('datetime64[ns]'), name='timestamp')
+    else:
+        query = text(f"SELECT symbol, timestamp, {', '.join(fields)} FROM raw_ohlc "
+                     "WHERE symbol IN :symbols AND timestamp >= :start ORDER BY timestamp")
+        query = query.bindparams(bindparam('symbols', expanding=True))
+        with read_engine.connect() as conn:
+            rows = pd.read_sql(query, conn, params={'symbols': symbols, 'start': start})
+
+        ts_codes, timestamps = pd.factorize(rows['timestamp'], sort=True)
+        sym_codes = pd.Categorical(rows['symbol'], categories=symbols).codes
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps), name='timestamp')
+        arrays = {}
+        for field in fields:
+            arrays[field] = np.full((len(index), len(symbols)), np.nan)
+            arrays[field][ts_codes, sym_codes] = rows[field].to_numpy(dtype='float64', na_value=np.nan)
+    panel = {}
+    for field in fields:
+        values = arrays[field]
+        values.flags.writeable = False
+        panel[field] = pd.DataFrame(values, index=index, columns=symbols, copy=False)
+
+    with _panel_lock:
+        if len(_panel_cache) >= PANEL_CACHE_SIZE:
+            _panel_cache.pop(next(iter(_panel_cache)))
+        _panel_cache[key] = panel
+    return panel
+
+
+def latest_timestamps(symbols: Iterable[str]) -> Dict[str, pd.Timestamp]:
+    """Watermark per symbol: the newest stored bar timestamp (symbols with no bars are omitted)."""
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    if _columnar():
+        from storage import columnar
+        return columnar.latest_timestamps(symbols)
+    # One index seek per symbol (MAX on the (symbol, timestamp) index) instead of a GROUP BY
+    # scanning every bar; the fixed SQL text is prepared once per pooled connection
+    try:
+        with read_engine.connect() as conn:
+            rows = [(sym, conn.exec_driver_sql("SELECT MAX(timestamp) FROM raw_ohlc WHERE symbol = ?", (sym,)).scalar())
+                    for sym in symbols]
+        return {sym: pd.Timestamp(latest) for sym, latest in rows if latest is not None}
+    except Exception as e:
+        print(f"Watermark error: {e}")
+        return {}
+
+
+def latest_timestamp(symbol: str) -> Optional[pd.Timestamp]:
+    return latest_timestamps([symbol]).get(symbol)
+
+
+def _sql_ts(ts) -> str:
+    return pd.Timestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# ---------------------------------------------------------------------------
+# Materialized features: rows in `features` plus one `feature_state` row per symbol
+# recording the feature-set version and the first bar whose features are stale.
+# ---------------------------------------------------------------------------
+
+FEATURE_COLUMNS = ['returns', 'volatility', 'momentum_5d', 'corr_dxy', 'macro_rate']
+
+
+def get_feature_state(symbol: str) -> Optional[Dict]:
+    query = text("SELECT version, reference, stale_from FROM feature_state WHERE symbol = :symbol")
+    with read_engine.connect() as conn:
+        row = conn.execute(query, {'symbol': symbol}).fetchone()
+    if row is None:
+        return None
+    return {'version': row[0], 'reference': row[1],
+            'stale_from': pd.Timestamp(row[2]) if row[2] is not None else None}
+
+
+@traced('store', measure_arg='feats')
+def store_features(feats: pd.DataFrame, version: str, reference: Optional[str] = None,
+                   replace: bool = False, stale_from: Optional[pd.Timestamp] = None) -> int:
+    """
+    Upsert computed feature rows for one symbol and mark its state clean.
+    replace=True drops the symbol's existing rows first (new feature-set version).
+    When `stale_from` is given, the state is only cleared if nobody invalidated it further
+    while the features were being computed.
+    """
+    if feats.empty:
+        return 0
+    symbol = feats['symbol'].iloc[0]
+    if _columnar():
+        from storage import columnar
+        if replace:
+            columnar.drop_features(symbol, keep_version=version)
+        written = columnar.store_features(symbol, version, feats, FEATURE_COLUMNS, replace=replace)
+        _set_feature_state(symbol, version, reference, replace, stale_from)
+        return written
+    dates = pd.to_datetime(feats['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    columns = [_nullable(feats[c].to_numpy(dtype='float64')) for c in FEATURE_COLUMNS]
+    records = [(symbol, d, *vals, version) for d, *vals in zip(dates, *columns)]
+    upsert = (f"INSERT INTO features (symbol, date, {', '.join(FEATURE_COLUMNS)}, version) "
+              f"VALUES (?, ?, {', '.join('?' for _ in FEATURE_COLUMNS)}, ?) "
+              f"ON CONFLICT(symbol, date) DO UPDATE SET "
+              + ', '.join(f"{c} = excluded.{c}" for c in FEATURE_COLUMNS + ['version']))
+    with engine.begin() as conn:
+        if replace:
+            conn.exec_driver_sql("DELETE FROM features WHERE symbol = ?", (symbol,))
+        conn.exec_driver_sql(upsert, records)
+        _set_feature_state(symbol, version, reference, replace, stale_from, conn)
+    return len(records)
+
+
+def _set_feature_state(symbol: str, version: str, reference: Optional[str], replace: bool,
+                       stale_from: Optional[pd.Timestamp], conn=None) -> None:
+    if conn is None:
+        with engine.begin() as conn:
+            return _set_feature_state(symbol, version, reference, replace, stale_from, conn)
+    if replace or stale_from is None:
+        conn.exec_driver_sql(
+            "INSERT OR REPLACE INTO feature_state (symbol, version, reference, stale_from, updated_at) "
+            "VALUES (?, ?, ?, NULL, CURRENT_TIMESTAMP)", (symbol, version, reference))
+    else:
+        conn.exec_driver_sql(
+            "UPDATE feature_state SET stale_from = NULL, updated_at = CURRENT_TIMESTAMP "
+            "WHERE symbol = ? AND stale_from = ?", (symbol, _sql_ts(stale_from)))
+
+
+def mark_features_clean(symbol: str, version: str, reference: Optional[str] = None) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT OR REPLACE INTO feature_state (symbol, version, reference, stale_from, updated_at) "
+            "VALUES (?, ?, ?, NULL, CURRENT_TIMESTAMP)", (symbol, version, reference))
+
+
+@traced('load')
+def load_features(symbol: str, version: str, start_date: Optional[str] = None) -> pd.DataFrame:
+    if _columnar():
+        from storage import columnar
+        return columnar.load_features(symbol, version, FEATURE_COLUMNS, start_date)
+    query = text(f"SELECT symbol, date AS timestamp, {', '.join(FEATURE_COLUMNS)} FROM features "
+                 "WHERE symbol = :symbol AND version = :version AND date >= :start_date ORDER BY date")
+    try:
+        with read_engine.connect() as conn:
+            df = pd.read_sql(query, conn, params={'symbol': symbol, 'version': version,
+                                                  'start_date': start_date or ''})
+        if not df.empty:
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+    except Exception as e:
+        print(f"Feature load error: {e}")
+        return pd.DataFrame()
+
+
+@traced('load')
+def load_latest_features(symbols: Iterable[str], version: str) -> pd.DataFrame:
+    """Newest feature row per symbol plus each symbol's row count (`n_rows`), in one query."""
+    symbols = list(symbols)
+    if not symbols:
+        return pd.DataFrame()
+    if _columnar():
+        from storage import columnar
+        return columnar.load_latest_features(symbols, version, FEATURE_COLUMNS)
+    query = text(f"""
+        SELECT f.symbol, f.date AS timestamp, {', '.join('f.' + c for c in FEATURE_COLUMNS)}, c.n_rows
+        FROM features f
+        JOIN (SELECT symbol, MAX(date) AS latest, COUNT(*) AS n_rows FROM features
+              WHERE symbol IN :symbols AND version = :version GROUP BY symbol) c
+          ON f.symbol = c.symbol AND f.date = c.latest
+        WHERE f.version = :version
+    """).bindparams(bindparam('symbols', expanding=True))
+    try:
+        with read_engine.connect() as conn:
+            df = pd.read_sql(query, conn, params={'symbols': symbols, 'version': version})
+        if not df.empty:
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df.set_index('symbol')
+    except Exception as e:
+        print(f"Feature load error: {e}")
+        return pd.DataFrame()
+
+
+# ---------------------------------------------------------------------------
+# Precomputed signals (published by ops/refresher.py, read by the dashboard)
+# ---------------------------------------------------------------------------
+
+@traced('store')
+def store_signals(rows: Iterable[Dict]) -> int:
+    """
+    Upsert signals, one per (symbol, bar). Each row: symbol, timestamp (the feature bar it was
+    scored on), signal, explanation ({feature: importance}), model_version (None for the
+    momentum fallback) and feature_version.
+    """
+    import json
+
+    records = [(r['symbol'], _sql_ts(r['timestamp']), float(r['signal']), json.dumps(r.get('explanation') or {}),
+                r.get('model_version'), r.get('feature_version')) for r in rows]
+    if not records:
+        return 0
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO signals (symbol, timestamp, signal, explanation, model_version, feature_version, computed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(symbol, timestamp) DO UPDATE SET signal = excluded.signal, explanation = excluded.explanation, "
+            "model_version = excluded.model_version, feature_version = excluded.feature_version, "
+            "computed_at = excluded.computed_at", records)
+    return len(records)
+
+
+@traced('load')
+def load_signals(symbols: Iterable[str]) -> Dict[str, Dict]:
+    """Latest published signal per symbol (symbols without one are omitted); one index seek each."""
+    import json
+
+    out = {}
+    try:
+        with read_engine.connect() as conn:
+            for symbol in symbols:
+                row = conn.exec_driver_sql(
+                    "SELECT timestamp, signal, explanation, model_version, feature_version, computed_at FROM signals "
+                    "WHERE symbol = ? ORDER BY timestamp DESC LIMIT 1", (symbol,)).fetchone()
+                if row is not None:
+                    out[symbol] = {'timestamp': pd.Timestamp(row[0]), 'signal': row[1],
+                                   'explanation': json.loads(row[2]) if row[2] else {},
+                                   'model_version': row[3], 'feature_version': row[4],
+                                   'computed_at': pd.Timestamp(row[5])}
+    except Exception as e:
+        print(f"Signal load error: {e}")
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Point-in-time macro series: `fundamentals` holds every published vintage of an observation
+# (metric, period date, release date, value); `macro_state` keeps a per-metric version that is
+# bumped whenever a store changes anything, and when the metric was last fetched.
+# ---------------------------------------------------------------------------
+
+MACRO_COLUMNS = ['metric', 'date', 'release_date', 'value']
+
+
+@traced('store', measure_arg='df')
+def store_macro(df: pd.DataFrame, source: Optional[str] = None) -> Dict[str, pd.Timestamp]:
+    """
+    Insert new or revised vintages (columns metric, date, release_date, value) and record the
+    fetch. Returns {metric: earliest release_date among the rows that changed}; metrics whose
+    stored vintages already matched are omitted and keep their version.
+    """
+    if df.empty:
+        return {}
+    df = df[MACRO_COLUMNS].copy()
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    df['release_date'] = pd.to_datetime(df['release_date']).dt.strftime('%Y-%m-%d')
+    metrics = df['metric'].unique().tolist()
+    query = text("SELECT metric, date, release_date, value FROM fundamentals WHERE metric IN :metrics"
+                 ).bindparams(bindparam('metrics', expanding=True))
+    with read_engine.connect() as conn:
+        stored = pd.read_sql(query, conn, params={'metrics': metrics})
+    stored['date'] = stored['date'].astype(str).str[:10]
+    stored['release_date'] = stored['release_date'].astype(str).str[:10]
+
+    merged = df.merge(stored, on=['metric', 'date', 'release_date'], how='left', suffixes=('', '_stored'),
+                      indicator=True)
+    same = (merged['_merge'] == 'both') & (
+        (merged['value'] == merged['value_stored']) | (merged['value'].isna() & merged['value_stored'].isna()))
+    changed = merged[~same]
+    records = [(m, d, v, r, source) for m, d, r, v in zip(changed['metric'], changed['date'], changed['release_date'],
+                                                          _nullable(changed['value'].to_numpy(dtype='float64')))]
+    with engine.begin() as conn:
+        if records:
+            conn.exec_driver_sql(
+                "INSERT INTO fundamentals (metric, date, value, release_date, source) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(metric, date, release_date) DO UPDATE SET value = excluded.value, "
+                "source = COALESCE(excluded.source, fundamentals.source)", records)
+        first = changed.groupby('metric')['release_date'].min()
+        conn.exec_driver_sql(
+            "INSERT INTO macro_state (metric, version, fetched_at, updated_at) "
+            "VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(metric) DO UPDATE SET version = macro_state.version + excluded.version, "
+            "fetched_at = excluded.fetched_at, "
+            "updated_at = CASE WHEN excluded.version > 0 THEN excluded.updated_at ELSE macro_state.updated_at END",
+            [(m, int(m in first.index)) for m in metrics])
+    return {m: pd.Timestamp(d) for m, d in first.items()}
+
+
+def record_macro_fetch(metrics: Iterable[str]) -> None:
+    """Note a fetch of `metrics` that brought nothing to store, so they aren't due again until the interval passes."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO macro_state (metric, version, fetched_at) VALUES (?, 0, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(metric) DO UPDATE SET fetched_at = excluded.fetched_at", [(m,) for m in metrics])
+
+
+def macro_state(metrics: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """{metric: {'version', 'fetched_at'}} for metrics ingested so far (all of them by default)."""
+    sql = "SELECT metric, version, fetched_at FROM macro_state"
+    params: tuple = ()
+    if metrics is not None:
+        metrics = list(metrics)
+        if not metrics:
+            return {}
+        sql += f" WHERE metric IN ({', '.join('?' for _ in metrics)})"
+        params = tuple(metrics)
+    with read_engine.connect() as conn:
+        rows = conn.exec_driver_sql(sql, params).fetchall()
+    return {m: {'version': v, 'fetched_at': pd.Timestamp(f) if f is not None else None} for m, v, f in rows}
+
+
+@traced('load')
+def load_macro(metrics: Iterable[str]) -> pd.DataFrame:
+    """Every stored vintage of `metrics`, ordered by metric, release date and period date."""
+    metrics = list(metrics)
+    if not metrics:
+        return pd.DataFrame(columns=MACRO_COLUMNS)
+    query = text("SELECT metric, date, release_date, value FROM fundamentals WHERE metric IN :metrics "
+                 "ORDER BY metric, release_date, date").bindparams(bindparam('metrics', expanding=True))
+    with read_engine.connect() as conn:
+        df = pd.read_sql(query, conn, params={'metrics': metrics})
+    df['date'] = pd.to_datetime(df['date'])
+    df['release_date'] = pd.to_datetime(df['release_date'])
+    return df
+
+
+def invalidate_features(stale_from: pd.Timestamp) -> int:
+    """Mark every symbol's materialized features stale from `stale_from` (inputs shared by all symbols)."""
+    ts = _sql_ts(stale_from)
+    with engine.begin() as conn:
+        result = conn.exec_driver_sql(
+            "UPDATE feature_state SET stale_from = CASE WHEN stale_from IS NULL OR stale_from > ? THEN ? "
+            "ELSE stale_from END", (ts, ts))
+    return result.rowcount
@@ -0,0 +1,235 @@
+# src/storage/intraday.py (1-minute bars partitioned by symbol/month + cached resampling to coarser bars)
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from storage.columnar import OHLC_SCHEMA, ColumnStore, _start_ns, to_ns
+from utils.config import INTRADAY_DIR
+from utils.tracing import traced
+
+BASE_BAR = '1min'
+# Bar sizes the resampler builds from the base resolution, in seconds. All of them divide a
+# UTC day, so no bar straddles a month partition and each month resamples on its own.
+BAR_SECONDS = {'1min': 60, '5min': 300, '15min': 900, '1h': 3600, '1D': 86400}
+RESAMPLE_CACHE_SIZE = 512   # resampled (symbol, month, bar size) partitions kept in memory
+_VERSION_FILE = 'VERSION'
+_NS = 1_000_000_000
+
+
+def _partition(symbol: str, month: str) -> ColumnStore:
+    return ColumnStore(os.path.join(INTRADAY_DIR, symbol, month), OHLC_SCHEMA, keep_if_missing=('source',))
+
+
+def months(symbol: str) -> List[str]:
+    """Stored month partitions ('YYYY-MM'), oldest first."""
+    root = os.path.join(INTRADAY_DIR, symbol)
+    if not os.path.isdir(root):
+        return []
+    return sorted(m for m in os.listdir(root) if os.path.exists(os.path.join(root, m, 'meta.json')))
+
+
+def _month(ts) -> str:
+    return pd.Timestamp(ts).strftime('%Y-%m')
+
+
+def _months_between(symbol: str, start, end) -> List[str]:
+    """Partition pruning: only months that can hold bars in [start, end]."""
+    lo = _month(start) if start is not None else ''
+    hi = _month(end) if end is not None else '9999-99'
+    return [m for m in months(symbol) if lo <= m <= hi]
+
+
+def data_version(symbol: str) -> Optional[str]:
+    """Token rewritten on every change to the symbol's bars (None before the first write)."""
+    try:
+        with open(os.path.join(INTRADAY_DIR, symbol, _VERSION_FILE)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _touch_version(symbol: str) -> None:
+    root = os.path.join(INTRADAY_DIR, symbol)
+    tmp = os.path.join(root, f"{_VERSION_FILE}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(f"{time.time_ns()}-{os.getpid()}")
+    os.replace(tmp, os.path.join(root, _VERSION_FILE))
+
+
+# ---------------------------------------------------------------------------
+# Ingest + range queries
+# ---------------------------------------------------------------------------
+
+@traced('store', measure_arg='df')
+def upsert_bars(df: pd.DataFrame) -> Tuple[Dict[str, int], Dict[str, pd.Timestamp]]:
+    """
+    Write 1-minute bars (any symbols, any order) into their month partitions. Rows already stored
+    unchanged are skipped and a late revision only rewrites the month it falls in.
+    Returns (row stats, {symbol: first changed bar}).
+    """
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    changed = {}
+    if df.empty:
+        return stats, changed
+    ts_all = to_ns(df['timestamp'])
+    month_all = ts_all.view('datetime64[ns]').astype('datetime64[M]')
+    for symbol, idx in df.groupby(df['symbol'].astype(str), sort=False).indices.items():
+        part_months = month_all[idx]
+        order = np.argsort(part_months, kind='stable')
+        idx, part_months = idx[order], part_months[order]
+        cuts = np.flatnonzero(part_months[1:] != part_months[:-1]) + 1
+        for rows in np.split(idx, cuts):
+            part = df.iloc[rows]
+            data = {'timestamp': ts_all[rows]}
+            for c in OHLC_SCHEMA:
+                if c == 'timestamp':
+                    continue
+                if c == 'source':
+                    data[c] = part[c].astype(object).where(part[c].notna(), None).to_numpy() if c in part.columns \
+                        else np.full(len(part), None, dtype=object)
+                else:
+                    data[c] = part[c].to_numpy(dtype='float64', na_value=np.nan) if c in part.columns \
+                        else np.full(len(part), np.nan)
+            month = str(month_all[rows[0]])
+            part_stats, changed_from = _partition(symbol, month).write(data)
+            for k in stats:
+                stats[k] += part_stats[k]
+            if changed_from is not None:
+                first = pd.Timestamp(changed_from)
+                changed[symbol] = min(changed.get(symbol, first), first)
+        if symbol in changed:
+            _touch_version(symbol)
+    return stats, changed
+
+
+def _frame(symbol: str, arrays: Dict[str, np.ndarray], labels: Optional[List[str]] = None) -> pd.DataFrame:
+    n = len(arrays['timestamp'])
+    frame = {'symbol': pd.Categorical.from_codes(np.zeros(n, dtype='int8'), [symbol]),
+             'timestamp': arrays['timestamp'].view('datetime64[ns]')}
+    frame.update({c: arrays[c] for c in ('open', 'high', 'low', 'close', 'volume')})
+    if labels is not None:
+        frame['source'] = pd.Categorical.from_codes(arrays['source'], labels)
+    return pd.DataFrame(frame, copy=False)
+
+
+@traced('load')
+def load_bars(symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """1-minute bars in [start, end] (inclusive), load_ohlc column layout; empty frame if none."""
+    end_ns = int(pd.Timestamp(end).as_unit('ns').value) if end else None
+    parts, labels = [], []
+    for month in _months_between(symbol, start, end):
+        arrays, meta = _partition(symbol, month).slice_from(_start_ns(start), end_ns=end_ns)
+        if len(arrays['timestamp']):
+            # Category codes are per partition; remap onto one label list for the whole range
+            remap = []
+            for label in meta['labels'].get('source', []):
+                if label not in labels:
+                    labels.append(label)
+                remap.append(labels.index(label))
+            remap = np.array(remap + [-1], dtype='int16')  # code -1 (missing) maps to the trailing -1
+            if parts:  # the first partition's labels seed the list, so its codes already match
+                arrays = dict(arrays, source=remap[arrays['source']])
+            parts.append(arrays)
+    if not parts:
+        return pd.DataFrame()
+    if len(parts) == 1:
+        return _frame(symbol, parts[0], labels)  # single month: zero-copy views of the maps
+    return _frame(symbol, {c: np.concatenate([p[c] for p in parts]) for c in OHLC_SCHEMA}, labels)
+
+
+def latest_timestamp(symbol: str) -> Optional[pd.Timestamp]:
+    for month in reversed(months(symbol)):
+        ts = _partition(symbol, month).arrays()['timestamp']
+        if len(ts):
+            return pd.Timestamp(int(ts[-1]))
+    return None
+
+
+def extent(symbol: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """(first, last) stored bar, from the edge partitions only."""
+    stored = months(symbol)
+    if not stored:
+        return None
+    first = _partition(symbol, stored[0]).arrays()['timestamp']
+    last = latest_timestamp(symbol)
+    return (pd.Timestamp(int(first[0])), last) if len(first) and last is not None else None
+
+
+# ---------------------------------------------------------------------------
+# Resampling
+# ---------------------------------------------------------------------------
+
+def aggregate(arrays: Dict[str, np.ndarray], seconds: int) -> Dict[str, np.ndarray]:
+    """
+    Sorted base bars -> bars of `seconds` (labelled by bucket start, UTC-aligned): first open,
+    max high, min low, last close, summed volume. One pass of reduceat per column.
+    """
+    ts = np.asarray(arrays['timestamp'])
+    if not len(ts):
+        return {c: np.empty(0, dtype='int64' if c == 'timestamp' else 'float64')
+                for c in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
+    step = seconds * _NS
+    bucket = ts - ts % step
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    ends = np.append(starts[1:], len(ts))
+    return {
+        'timestamp': bucket[starts],
+        'open': np.asarray(arrays['open'])[starts],
+        'high': np.fmax.reduceat(arrays['high'], starts),  # fmax/fmin skip NaN fields
+        'low': np.fmin.reduceat(arrays['low'], starts),
+        'close': np.asarray(arrays['close'])[ends - 1],
+        'volume': np.add.reduceat(np.nan_to_num(arrays['volume']), starts),
+    }
+
+
+_resample_cache: 'OrderedDict[tuple, Dict[str, np.ndarray]]' = OrderedDict()
+_resample_lock = threading.Lock()
+
+
+def _resampled_month(symbol: str, month: str, bar_size: str) -> Dict[str, np.ndarray]:
+    """One month at `bar_size`, cached until that partition changes (gen/rows in the key)."""
+    store = _partition(symbol, month)
+    meta = store.meta()
+    key = (symbol, month, bar_size, meta['gen'], meta['rows'])
+    with _resample_lock:
+        if key in _resample_cache:
+            _resample_cache.move_to_end(key)
+            return _resample_cache[key]
+    bars = aggregate(store.arrays(meta), BAR_SECONDS[bar_size])
+    with _resample_lock:
+        _resample_cache[key] = bars
+        while len(_resample_cache) > RESAMPLE_CACHE_SIZE:
+            _resample_cache.popitem(last=False)
+    return bars
+
+
+@traced('load')
+def resample(symbol: str, bar_size: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """
+    Bars of `bar_size` ('5min', '1h', '1D', ...) built from the stored 1-minute bars, for buckets
+    starting in [start, end]. Each month partition is aggregated once and cached, so after an
+    ingest only the months that changed are recomputed.
+    """
+    if bar_size not in BAR_SECONDS:
+        raise ValueError(f"Unknown bar size {bar_size}; expected one of {list(BAR_SECONDS)}")
+    if bar_size == BASE_BAR:
+        return load_bars(symbol, start, end).drop(columns='source', errors='ignore')
+    step = BAR_SECONDS[bar_size] * _NS
+    lo = _start_ns(start)
+    lo = lo - lo % step if start else lo  # a bucket that starts before `start` but contains it
+    hi = int(pd.Timestamp(end).as_unit('ns').value) if end else None
+    parts = []
+    for month in _months_between(symbol, pd.Timestamp(lo) if start else None, end):
+        bars = _resampled_month(symbol, month, bar_size)
+        first = int(np.searchsorted(bars['timestamp'], lo, side='left'))
+        last = len(bars['timestamp']) if hi is None else int(np.searchsorted(bars['timestamp'], hi, side='right'))
+        if last > first:
+            parts.append({c: v[first:last] for c, v in bars.items()})
+    if not parts:
+        return pd.DataFrame()
+    return _frame(symbol, {c: np.concatenate([p[c] for p in parts]) for c in parts[0]})
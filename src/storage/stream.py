@@ -0,0 +1,251 @@
+# src/storage/stream.py (Chunked OHLC reads into compact arrays, and window-by-window iteration)
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from storage.db_manager import _columnar, _sql_ts, read_engine
+from utils.tracing import traced
+
+STREAM_CHUNK_ROWS = 50_000
+VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MAX_QUOTED_DECIMALS = 8
+CODE_DTYPE = 'int16'  # symbol/source codes into the label lists; -1 = NULL
+
+
+def fits_float32(values: np.ndarray) -> bool:
+    """
+    True when float32 keeps every value at the precision it is quoted to: either exactly (bars that
+    came from a float32 feed) or after rounding back to the values' decimals (4500.25, 1.08423).
+    """
+    v = values[~np.isnan(values)]
+    if not len(v):
+        return True
+    back = v.astype('float32').astype('float64')
+    if np.array_equal(back, v):
+        return True
+    if np.abs(v).max() > np.finfo('float32').max:
+        return False
+    for decimals in range(MAX_QUOTED_DECIMALS + 1):
+        quoted = np.round(v, decimals)
+        if np.allclose(quoted, v, rtol=1e-12, atol=0):
+            return bool(np.array_equal(np.round(back, decimals), quoted))
+    return False
+
+
+class CompactBars:
+    """
+    OHLC rows as flat arrays: int64 epoch-ns timestamps, float32 values where fits_float32 holds
+    (float64 otherwise, decided per column), and int16 codes into `symbols` / `sources`.
+    About 26 bytes a row against ~150 for the read_sql frame with its repeated strings.
+    """
+
+    __slots__ = ('timestamp', 'values', 'symbol', 'source', 'symbols', 'sources')
+
+    def __init__(self, timestamp: np.ndarray, values: Dict[str, np.ndarray], symbol: np.ndarray,
+                 source: np.ndarray, symbols: List[str], sources: List[str]):
+        self.timestamp = timestamp
+        self.values = values
+        self.symbol = symbol
+        self.source = source
+        self.symbols = symbols
+        self.sources = sources
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamp.nbytes + self.symbol.nbytes + self.source.nbytes + \
+            sum(a.nbytes for a in self.values.values())
+
+    def slice(self, start: int, stop: int) -> 'CompactBars':
+        """Rows [start, stop) as views."""
+        return CompactBars(self.timestamp[start:stop], {c: a[start:stop] for c, a in self.values.items()},
+                           self.symbol[start:stop], self.source[start:stop], self.symbols, self.sources)
+
+    def to_frame(self) -> pd.DataFrame:
+        """load_ohlc column layout without copying the arrays: categorical symbol/source, datetime64 timestamps."""
+        frame = {'symbol': pd.Categorical.from_codes(self.symbol, self.symbols),
+                 'timestamp': self.timestamp.view('datetime64[ns]')}
+        frame.update(self.values)
+        frame['source'] = pd.Categorical.from_codes(self.source, self.sources)
+        return pd.DataFrame(frame, copy=False)
+
+
+class _Encoder:
+    """Per-chunk dictionary encoding against one label list that grows across chunks."""
+
+    def __init__(self, labels: Optional[List[str]] = None):
+        self.labels = list(labels or [])
+        self._codes = {label: i for i, label in enumerate(self.labels)}
+
+    def encode(self, values: Sequence) -> np.ndarray:
+        chunk_codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        lookup = np.empty(len(uniques) + 1, dtype=CODE_DTYPE)
+        lookup[-1] = -1  # factorize's -1 (NULL) indexes the last slot
+        for i, label in enumerate(uniques):
+            if label not in self._codes:
+                self._codes[label] = len(self.labels)
+                self.labels.append(label)
+            lookup[i] = self._codes[label]
+        return lookup[chunk_codes]
+
+
+def _symbols(symbols: Union[str, Sequence[str]]) -> List[str]:
+    return [symbols] if isinstance(symbols, str) else list(dict.fromkeys(symbols))
+
+
+def _where(symbols: List[str], start: Optional[str], end: Optional[str]):
+    sql = f"WHERE symbol IN ({', '.join('?' for _ in symbols)})"
+    params = list(symbols)
+    if start:
+        sql += " AND timestamp >= ?"
+        params.append(_sql_ts(start))
+    if end:
+        sql += " AND timestamp <= ?"
+        params.append(_sql_ts(end))
+    return sql, params
+
+
+def _sqlite_chunks(symbols: List[str], start: Optional[str], end: Optional[str],
+                   chunk_rows: int) -> Iterator[CompactBars]:
+    # SQLite parses the timestamps (epoch seconds) and the rows come off one cursor in fetchmany
+    # batches, so no chunk ever exists as a frame of Python strings and datetimes
+    where, params = _where(symbols, start, end)
+    sql = (f"SELECT symbol, CAST(strftime('%s', timestamp) AS INTEGER), {', '.join(VALUE_COLUMNS)}, source "
+           f"FROM raw_ohlc {where} ORDER BY symbol, timestamp")
+    symbol_enc, source_enc = _Encoder(symbols), _Encoder()
+    with read_engine.connect() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                del rows
+                values = {c: np.array(columns[2 + i], dtype='float64') for i, c in enumerate(VALUE_COLUMNS)}
+                yield CompactBars(np.array(columns[1], dtype='int64') * 1_000_000_000, values,
+                                  symbol_enc.encode(columns[0]), source_enc.encode(columns[-1]),
+                                  symbol_enc.labels, source_enc.labels)
+        finally:
+            cursor.close()
+
+
+def _columnar_chunks(symbols: List[str], start: Optional[str], end: Optional[str],
+                     chunk_rows: int) -> Iterator[CompactBars]:
+    # Memory-mapped columns: chunks are slices of the maps, only touched pages are read
+    from storage.columnar import _ohlc_store, _start_ns
+
+    source_enc = _Encoder()
+    end_ns = int(pd.Timestamp(end).as_unit('ns').value) if end else None
+    for code, symbol in enumerate(symbols):
+        store = _ohlc_store(symbol)
+        arrays, meta = store.slice_from(_start_ns(start), end_ns=end_ns)
+        labels = np.array(store.labels('source', meta) + [None], dtype=object)
+        for i in range(0, len(arrays['timestamp']), chunk_rows):
+            part = slice(i, i + chunk_rows)
+            source = labels[arrays['source'][part]]  # -1 picks the trailing None
+            yield CompactBars(np.asarray(arrays['timestamp'][part]),
+                              {c: np.asarray(arrays[c][part], dtype='float64') for c in VALUE_COLUMNS},
+                              np.full(len(source), code, dtype=CODE_DTYPE), source_enc.encode(source),
+                              symbols, source_enc.labels)
+
+
+def iter_ohlc_chunks(symbols: Union[str, Sequence[str]], start: Optional[str] = None, end: Optional[str] = None,
+                     chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[CompactBars]:
+    """
+    Bars of `symbols` (ordered by symbol, then timestamp; start/end inclusive) in chunks of at most
+    `chunk_rows`. Values stay float64 here, the caller decides what to narrow. Label lists are
+    shared and only grow, so codes stay valid across chunks.
+    """
+    symbols = _symbols(symbols)
+    chunks = _columnar_chunks if _columnar() else _sqlite_chunks
+    return chunks(symbols, start, end, chunk_rows)
+
+
+def count_ohlc(symbols: Union[str, Sequence[str]], start: Optional[str] = None, end: Optional[str] = None) -> int:
+    symbols = _symbols(symbols)
+    if _columnar():
+        from storage.columnar import _ohlc_store, _start_ns
+        end_ns = int(pd.Timestamp(end).as_unit('ns').value) if end else None
+        return sum(len(_ohlc_store(s).slice_from(_start_ns(start), end_ns=end_ns)[0]['timestamp']) for s in symbols)
+    where, params = _where(symbols, start, end)
+    with read_engine.connect() as conn:
+        return conn.exec_driver_sql(f"SELECT COUNT(*) FROM raw_ohlc {where}", tuple(params)).scalar()
+
+
+@traced('load')
+def load_ohlc_compact(symbols: Union[str, Sequence[str]], start: Optional[str] = None, end: Optional[str] = None,
+                      chunk_rows: int = STREAM_CHUNK_ROWS) -> CompactBars:
+    """
+    All matching bars in preallocated compact arrays, filled chunk by chunk: peak memory is the
+    result plus one chunk. Value columns start as float32 and are widened (once) to float64 by
+    the first chunk that doesn't fit.
+    """
+    n = count_ohlc(symbols, start, end)
+    timestamp = np.empty(n, dtype='int64')
+    values = {c: np.empty(n, dtype='float32') for c in VALUE_COLUMNS}
+    symbol = np.empty(n, dtype=CODE_DTYPE)
+    source = np.empty(n, dtype=CODE_DTYPE)
+    symbols_out, sources_out, pos = _symbols(symbols), [], 0
+    for chunk in iter_ohlc_chunks(symbols, start, end, chunk_rows):
+        stop = min(pos + len(chunk), n)  # rows written since the count are left for the next read
+        k = stop - pos
+        timestamp[pos:stop] = chunk.timestamp[:k]
+        for c, column in chunk.values.items():
+            if values[c].dtype == np.float32 and not fits_float32(column[:k]):
+                wide = np.empty(n, dtype='float64')
+                wide[:pos] = values[c][:pos]
+                values[c] = wide
+            values[c][pos:stop] = column[:k]
+        symbol[pos:stop] = chunk.symbol[:k]
+        source[pos:stop] = chunk.source[:k]
+        symbols_out, sources_out, pos = chunk.symbols, chunk.sources, stop
+        if pos == n:
+            break
+    return CompactBars(timestamp[:pos], {c: a[:pos] for c, a in values.items()}, symbol[:pos], source[:pos],
+                       symbols_out, sources_out)
+
+
+def iter_ohlc_windows(symbol: str, window: int, step: Optional[int] = None, start: Optional[str] = None,
+                      end: Optional[str] = None, chunk_rows: int = STREAM_CHUNK_ROWS,
+                      narrow: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    One symbol's history as frames of `window` consecutive bars, advancing `step` bars at a time
+    (default `window`, i.e. non-overlapping; a shorter final window covers the tail). Only the
+    current window and one chunk are held, so histories larger than memory can be walked.
+    Frames use the compact layout (see load_ohlc_compact) with a fresh RangeIndex each;
+    `narrow=False` keeps the values float64 for consumers that compute on them.
+    """
+    step = step or window
+    if step > window:
+        raise ValueError("step must not exceed window")
+    buffer: Optional[CompactBars] = None
+    emitted_to = 0  # rows of the whole history already covered by a yielded window's end
+    offset = 0      # history row of buffer[0]
+    for chunk in iter_ohlc_chunks(symbol, start, end, chunk_rows):
+        buffer = chunk if buffer is None else _concat(buffer, chunk)
+        while len(buffer) >= window:
+            yield _narrow(buffer.slice(0, window), narrow).to_frame()
+            emitted_to = offset + window
+            buffer = buffer.slice(step, len(buffer))
+            offset += step
+    if buffer is not None and len(buffer) and offset + len(buffer) > emitted_to:
+        yield _narrow(buffer, narrow).to_frame()
+
+
+def _concat(a: CompactBars, b: CompactBars) -> CompactBars:
+    return CompactBars(np.concatenate([a.timestamp, b.timestamp]),
+                       {c: np.concatenate([a.values[c], b.values[c]]) for c in a.values},
+                       np.concatenate([a.symbol, b.symbol]), np.concatenate([a.source, b.source]),
+                       b.symbols, b.sources)
+
+
+def _narrow(bars: CompactBars, narrow: bool = True) -> CompactBars:
+    values = {c: a.astype('float32') if narrow and a.dtype == np.float64 and fits_float32(a) else a.copy()
+              for c, a in bars.values.items()}
+    return CompactBars(bars.timestamp.copy(), values, bars.symbol.copy(), bars.source.copy(),
+                       list(bars.symbols), list(bars.sources))
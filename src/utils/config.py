@@ -7,6 +7,17 @@ load_dotenv()
 
 DB_PATH = os.getenv('DB_PATH', 'data/quant_terminal.db')
 
+# 'sqlite' keeps bars/features as rows in DB_PATH; 'columnar' keeps them as memory-mapped
+# column files under COLUMNAR_DIR (metadata stays in SQLite). Migrate with `python migrate.py columnar`.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+COLUMNAR_DIR = os.getenv('COLUMNAR_DIR', os.path.join(os.path.dirname(DB_PATH) or '.', 'columnar'))
+# 1-minute bars, one column-file partition per symbol and month (src/storage/intraday.py)
+INTRADAY_DIR = os.getenv('INTRADAY_DIR', os.path.join(os.path.dirname(DB_PATH) or '.', 'intraday'))
+# Provider responses (src/ingest/response_cache.py); PROVIDER_CACHE=0 turns the cache off
+PROVIDER_CACHE = os.getenv('PROVIDER_CACHE', '1') != '0'
+PROVIDER_CACHE_DIR = os.getenv('PROVIDER_CACHE_DIR', os.path.join(os.path.dirname(DB_PATH) or '.', 'provider_cache'))
+PROVIDER_CACHE_MAX_MB = int(os.getenv('PROVIDER_CACHE_MAX_MB', 256))
+
 ALPHA_VANTAGE_KEY = os.getenv('ALPHA_VANTAGE_KEY', '')
 POLYGON_KEY = os.getenv('POLYGON_KEY', '')
 FRED_API_KEY = os.getenv('FRED_API_KEY', '')
@@ -23,10 +34,38 @@ SYMBOL_MAP = {
 }
 
 config_path = 'config/config.yaml'
+cfg = {}
 if os.path.exists(config_path):
     with open(config_path, 'r') as f:
-        cfg = yaml.safe_load(f)
+        cfg = yaml.safe_load(f) or {}
         ASSETS = cfg.get('assets', ASSETS)
 
+# Symbols with 1-minute history (futures and FX); the rest stay daily-only
+INTRADAY_ASSETS = [a for a in ['ES', 'NQ', 'EURUSD', 'GBPUSD'] if a in ASSETS]
+
 WINDOW_DAYS = 1000
 ML_N_ESTIMATORS = 100
+
+# Processes the training orchestrator may keep busy at once (each forest runs single-threaded)
+TRAIN_CPU_BUDGET = int(os.getenv('TRAIN_CPU_BUDGET', os.cpu_count() or 1))
+
+# Background refresher (ops/refresher.py): seconds between ingest → features → models → signals cycles
+REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', 900))
+
+# Point-in-time macro series from FRED (src/ingest/macro_fetcher.py), every vintage kept in `fundamentals`.
+# MACRO_RATE_SERIES feeds the materialized `macro_rate` feature; the rest can be attached to any
+# feature panel (features/asof.py). Series are re-fetched at most every MACRO_REFRESH_INTERVAL seconds.
+MACRO_SERIES = cfg.get('macro_series', ['FEDFUNDS', 'DGS10', 'T10Y2Y', 'CPIAUCSL', 'UNRATE'])
+MACRO_RATE_SERIES = cfg.get('macro_rate_series', 'FEDFUNDS')
+MACRO_REFRESH_INTERVAL = int(os.getenv('MACRO_REFRESH_INTERVAL', 6 * 3600))
+
+# Pipeline tracing (src/utils/tracing.py). Stages listed in PROFILE_STAGES (comma-separated, or
+# `profiling: {stages: [...], mode: ..., dir: ...}` in config.yaml) run under a profiler:
+# 'cprofile' writes a .prof per span, 'sample' writes folded stacks (flamegraph.pl / speedscope).
+_profiling = cfg.get('profiling') or {}
+PROFILE_STAGES = {s.strip() for s in os.getenv('PROFILE_STAGES', ','.join(_profiling.get('stages', []))).split(',')
+                  if s.strip()}
+PROFILE_MODE = os.getenv('PROFILE_MODE', _profiling.get('mode', 'cprofile'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', _profiling.get('dir', os.path.join(os.path.dirname(DB_PATH) or '.', 'profiles')))
+# Prometheus text-format metrics file the refresher rewrites after every cycle (node_exporter textfile collector)
+METRICS_PATH = os.getenv('METRICS_PATH', '')
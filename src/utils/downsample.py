@@ -0,0 +1,136 @@
+# src/utils/downsample.py (Shape-preserving chart downsampling: LTTB for lines, bucketed OHLC for candles)
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from utils.tracing import traced
+
+CHART_WIDTH_PX = 1200   # plot width the payload is sized to; a line can't show more than ~1 point per pixel
+CANDLE_PX = 4           # a readable candle needs a few pixels (body + gap)
+CHART_CACHE_SIZE = 64   # downsampled frames kept per process
+
+
+def _buckets(start: int, stop: int, n_buckets: int):
+    """
+    Split [start, stop) into n_buckets near-equal runs. Returns (first index, end index,
+    padded index matrix): each row lists a bucket's indices, short rows repeat their first
+    index, which never changes an argmin/argmax (ties resolve to the first occurrence).
+    """
+    edges = np.linspace(start, stop, n_buckets + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    cols = starts[:, None] + np.arange((ends - starts).max())
+    cols = np.where(cols < ends[:, None], cols, starts[:, None])
+    return starts, ends, cols
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: row indices of the n_out points that keep the line's shape.
+    First and last points are always kept. The walk from bucket to bucket is inherently sequential
+    (each pick depends on the previous one), so the per-bucket work is vectorized instead: bucket
+    averages come from cumulative sums and each step is one argmax over a padded row.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64') - float(x[0])
+    y = np.asarray(y, dtype='float64')
+    starts, ends, cols = _buckets(1, n - 1, n_out - 2)
+
+    csx, csy = np.concatenate([[0.0], np.cumsum(x)]), np.concatenate([[0.0], np.cumsum(y)])
+    counts = ends - starts
+    # Third triangle vertex for bucket i is the mean of bucket i+1 (the last point for the final bucket)
+    next_x = np.append(((csx[ends] - csx[starts]) / counts)[1:], x[-1])
+    next_y = np.append(((csy[ends] - csy[starts]) / counts)[1:], y[-1])
+    bx, by = x[cols], y[cols]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(len(starts)):
+        ax, ay = x[a], y[a]
+        # Twice the triangle area (constant factor dropped)
+        area = np.abs((ax - next_x[i]) * (by[i] - ay) - (ax - bx[i]) * (next_y[i] - ay))
+        a = cols[i, area.argmax()]
+        out[i + 1] = a
+    return out
+
+
+def lttb(df: pd.DataFrame, n_out: int, x: str = 'timestamp', y: str = 'close') -> pd.DataFrame:
+    """Rows of df picked by LTTB on (x, y); the frame is returned as-is when it already fits."""
+    if len(df) <= n_out:
+        return df
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('datetime64[ns]').view('int64')
+    return df.iloc[lttb_indices(xs, df[y].to_numpy(dtype='float64'), n_out)].reset_index(drop=True)
+
+
+def ohlc_buckets(df: pd.DataFrame, n_buckets: int) -> pd.DataFrame:
+    """
+    Aggregate consecutive bars into n_buckets candles (first open, max high, min low, last close,
+    summed volume, stamped with the first bar's timestamp). Extremes are exact, so no wick is lost.
+    """
+    if len(df) <= n_buckets:
+        return df
+    starts = np.linspace(0, len(df), n_buckets + 1).astype(np.int64)[:-1]
+    ends = np.append(starts[1:], len(df))
+    col = {c: df[c].to_numpy(dtype='float64') for c in ('open', 'high', 'low', 'close')}
+    out = {
+        'timestamp': df['timestamp'].to_numpy()[starts],
+        'open': col['open'][starts],
+        'high': np.fmax.reduceat(col['high'], starts),  # fmax/fmin skip NaN gaps
+        'low': np.fmin.reduceat(col['low'], starts),
+        'close': col['close'][ends - 1],
+    }
+    if 'volume' in df.columns:
+        out['volume'] = np.add.reduceat(np.nan_to_num(df['volume'].to_numpy(dtype='float64')), starts)
+    return pd.DataFrame(out)
+
+
+_chart_cache: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+_chart_lock = threading.Lock()
+
+
+@traced('load')
+def chart_frame(symbol: str, start: Optional[str] = None, end: Optional[str] = None,
+                width_px: int = CHART_WIDTH_PX, kind: str = 'line', bar_size: str = '1D') -> pd.DataFrame:
+    """
+    Bars of `symbol` in [start, end], re-queried from storage and reduced to what a chart
+    `width_px` wide can show: LTTB points for kind='line', aggregated candles for 'candles'.
+    A zoomed range that holds fewer bars than that comes back at full fidelity. Daily bars come
+    from the OHLC store, smaller bar sizes are resampled from the 1-minute store. Cached per
+    (symbol, range, resolution, kind, bar size) and data version, so new bars invalidate it.
+    """
+    if bar_size == '1D':
+        from storage.db_manager import data_version, load_ohlc
+        version = data_version()
+    else:
+        from storage import intraday
+        version = intraday.data_version(symbol)
+
+    key = (symbol, str(start), str(end), width_px, kind, bar_size, version)
+    with _chart_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+
+    if bar_size == '1D':
+        df = load_ohlc(symbol, start or '1900-01-01', end)
+    else:
+        df = intraday.resample(symbol, bar_size, start, end)
+    if not df.empty:
+        df = df.dropna(subset=['close']).sort_values('timestamp').reset_index(drop=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if kind == 'candles':
+            df = ohlc_buckets(df, max(width_px // CANDLE_PX, 1))
+        else:
+            df = lttb(df[['timestamp', 'close']], width_px)
+
+    with _chart_lock:
+        _chart_cache[key] = df
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return df
@@ -0,0 +1,318 @@
+# src/utils/tracing.py (Pipeline spans: timings, rows, bytes and tags per stage; Prometheus/JSON export; opt-in profiling)
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.config import PROFILE_DIR, PROFILE_MODE, PROFILE_STAGES
+
+TRACE_BUFFER_SIZE = 5000   # finished spans kept for the JSON trace and the diagnostics panel
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)  # seconds
+SAMPLE_INTERVAL = 0.005    # sampling profiler period (seconds)
+TAG_KEYS = ('symbol', 'provider')  # tags that become metric labels and are inherited by child spans
+
+
+class Span:
+    """One timed stage. `rows` / `bytes` are what the stage moved; add() accumulates them."""
+
+    __slots__ = ('id', 'parent_id', 'trace_id', 'stage', 'name', 'tags', 'start', 'duration',
+                 'rows', 'bytes', 'thread', 'error', '_t0', '_token', '_profiler')
+
+    def __init__(self, stage: str, name: str, tags: Dict[str, Any], parent: Optional['Span']):
+        self.id = next(_ids)
+        self.parent_id = parent.id if parent else None
+        self.trace_id = parent.trace_id if parent else self.id
+        self.stage, self.name = stage, name
+        inherited = {k: parent.tags[k] for k in TAG_KEYS if parent and k in parent.tags}
+        self.tags = {**inherited, **{k: v for k, v in tags.items() if v is not None}}
+        self.start = time.time()
+        self.duration = None
+        self.rows = self.bytes = 0
+        self.thread = threading.get_ident()
+        self.error = None
+        self._t0 = self._token = self._profiler = None
+
+    def add(self, rows: int = 0, nbytes: int = 0) -> None:
+        self.rows += int(rows)
+        self.bytes += int(nbytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'parent_id': self.parent_id, 'trace_id': self.trace_id, 'stage': self.stage,
+                'name': self.name, 'tags': dict(self.tags), 'start': self.start,
+                'duration_ms': None if self.duration is None else self.duration * 1e3,
+                'rows': self.rows, 'bytes': self.bytes, 'error': self.error}
+
+
+_ids = itertools.count(1)
+_current: contextvars.ContextVar = contextvars.ContextVar('tracing_span', default=None)
+_finished: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+# (stage, name, symbol, provider) -> [count, seconds, rows, bytes, errors, *bucket counts]
+_metrics: Dict[Tuple[str, str, str, str], List[float]] = {}
+_lock = threading.Lock()
+_profiling = threading.Lock()  # one profiler at a time per process
+
+
+def measure(obj: Any) -> Tuple[int, int]:
+    """(rows, bytes) of a stage's input or output: frames, arrays, dicts of frames, row counts."""
+    if obj is None:
+        return 0, 0
+    if isinstance(obj, bool):
+        return 0, 0
+    if isinstance(obj, int):
+        return obj, 0
+    if hasattr(obj, 'memory_usage') and hasattr(obj, '__len__'):  # DataFrame / Series
+        usage = obj.memory_usage(index=False, deep=False)
+        return len(obj), int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(obj, 'nbytes') and hasattr(obj, '__len__'):  # ndarray
+        return len(obj), int(obj.nbytes)
+    if isinstance(obj, dict):
+        rows = nbytes = 0
+        for value in obj.values():
+            if hasattr(value, 'memory_usage'):
+                r, b = measure(value)
+                rows, nbytes = rows + r, nbytes + b
+        return rows, nbytes
+    return 0, 0
+
+
+def begin(stage: str, name: Optional[str] = None, root: bool = False, **tags) -> Span:
+    """
+    Open a span as the current one (children nest under it) and return it; close with end().
+    `root=True` starts a new trace regardless of what is current. Prefer span() / traced().
+    """
+    s = Span(stage, name or stage, tags, None if root else _current.get())
+    s._token = _current.set(s)
+    s._profiler = _start_profiler(s) if stage in PROFILE_STAGES else None
+    s._t0 = time.perf_counter()
+    return s
+
+
+def end(s: Span, error: Optional[BaseException] = None) -> Span:
+    s.duration = time.perf_counter() - s._t0
+    if error is not None:
+        s.error = type(error).__name__
+    try:
+        _current.reset(s._token)
+    except ValueError:
+        _current.set(None)  # ended from another context (e.g. a stopped Streamlit rerun)
+    if s._profiler is not None:
+        _stop_profiler(s._profiler, s)
+    s._token = s._profiler = None
+    _record(s)
+    return s
+
+
+class span:
+    """`with span('load', 'load_ohlc', symbol='ES') as s: ...; s.add(rows, nbytes)`"""
+
+    def __init__(self, stage: str, name: Optional[str] = None, **tags):
+        self._args = (stage, name, tags)
+
+    def __enter__(self) -> Span:
+        stage, name, tags = self._args
+        self._span = begin(stage, name, **tags)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end(self._span, exc)
+        return False
+
+
+def traced(stage: str, name: Optional[str] = None, measure_arg: Optional[str] = None, **static_tags):
+    """
+    Decorator: run the function in a span. `symbol` / `provider` string arguments become tags;
+    rows/bytes come from the argument named `measure_arg` (writers) or from the return value.
+    """
+    def wrap(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+        tag_params = [p for p in TAG_KEYS if p in sig.parameters]
+        need_args = bool(tag_params) or measure_arg is not None
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            tags = dict(static_tags)
+            bound = sig.bind_partial(*args, **kwargs).arguments if need_args else {}
+            for p in tag_params:
+                if isinstance(bound.get(p), str):
+                    tags[p] = bound[p]
+            with span(stage, name or fn.__name__, **tags) as s:
+                result = fn(*args, **kwargs)
+                if not s.rows and not s.bytes:
+                    s.add(*measure(bound.get(measure_arg) if measure_arg else result))
+                return result
+        return inner
+    return wrap
+
+
+def bind(fn: Callable) -> Callable:
+    """fn wrapped to run in a copy of the current context, so spans opened on a pool thread nest correctly."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def _record(s: Span) -> None:
+    key = (s.stage, s.name, str(s.tags.get('symbol', '')), str(s.tags.get('provider', '')))
+    with _lock:
+        _finished.append(s)
+        m = _metrics.get(key)
+        if m is None:
+            m = _metrics[key] = [0, 0.0, 0, 0, 0] + [0] * len(DURATION_BUCKETS)
+        m[0] += 1
+        m[1] += s.duration
+        m[2] += s.rows
+        m[3] += s.bytes
+        m[4] += s.error is not None
+        for i, le in enumerate(DURATION_BUCKETS):
+            if s.duration <= le:
+                m[5 + i] += 1
+
+
+def spans(trace_id: Optional[int] = None) -> List[Span]:
+    """Finished spans, oldest first; only those of one trace when trace_id is given."""
+    with _lock:
+        out = list(_finished)
+    return out if trace_id is None else [s for s in out if s.trace_id == trace_id]
+
+
+def summary(items: Iterable[Span]) -> List[Dict[str, Any]]:
+    """Per (stage, name): calls, total/max ms, rows and bytes, slowest first."""
+    out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for s in items:
+        row = out.setdefault((s.stage, s.name), {'stage': s.stage, 'name': s.name, 'calls': 0, 'total_ms': 0.0,
+                                                 'max_ms': 0.0, 'rows': 0, 'bytes': 0, 'errors': 0})
+        row['calls'] += 1
+        row['total_ms'] += s.duration * 1e3
+        row['max_ms'] = max(row['max_ms'], s.duration * 1e3)
+        row['rows'] += s.rows
+        row['bytes'] += s.bytes
+        row['errors'] += s.error is not None
+    return sorted(out.values(), key=lambda r: r['total_ms'], reverse=True)
+
+
+def reset() -> None:
+    with _lock:
+        _finished.clear()
+        _metrics.clear()
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _labels(key: Tuple[str, str, str, str], le: Optional[str] = None) -> str:
+    pairs = [f'{k}="{v}"' for k, v in zip(('stage', 'name', 'symbol', 'provider'), key) if v]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def prometheus_text(prefix: str = 'quant') -> str:
+    """All spans since start (or reset) in the Prometheus text exposition format."""
+    with _lock:
+        items = sorted((k, list(v)) for k, v in _metrics.items())
+    lines = [f'# HELP {prefix}_stage_duration_seconds Wall time per pipeline stage',
+             f'# TYPE {prefix}_stage_duration_seconds histogram']
+    for key, m in items:
+        for le, n in zip(DURATION_BUCKETS + ('+Inf',), m[5:] + [m[0]]):
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{_labels(key, str(le))} {n}')
+        lines.append(f'{prefix}_stage_duration_seconds_sum{_labels(key)} {m[1]:.6f}')
+        lines.append(f'{prefix}_stage_duration_seconds_count{_labels(key)} {m[0]}')
+    for i, (metric, help_) in enumerate([('rows', 'Rows moved per stage'), ('bytes', 'Bytes moved per stage'),
+                                         ('errors', 'Spans that raised')], start=2):
+        lines += [f'# HELP {prefix}_stage_{metric}_total {help_}', f'# TYPE {prefix}_stage_{metric}_total counter']
+        lines += [f'{prefix}_stage_{metric}_total{_labels(key)} {m[i]}' for key, m in items]
+    return '\n'.join(lines) + '\n'
+
+
+def json_trace(trace_id: Optional[int] = None) -> Dict[str, Any]:
+    """Chrome trace-event JSON (open in chrome://tracing or ui.perfetto.dev)."""
+    pid = os.getpid()
+    return {'traceEvents': [{
+        'name': s.name, 'cat': s.stage, 'ph': 'X', 'pid': pid, 'tid': s.thread,
+        'ts': s.start * 1e6, 'dur': s.duration * 1e6,
+        'args': {**s.tags, 'rows': s.rows, 'bytes': s.bytes, 'span_id': s.id, 'parent_id': s.parent_id,
+                 **({'error': s.error} if s.error else {})},
+    } for s in spans(trace_id)], 'displayTimeUnit': 'ms'}
+
+
+def write_metrics(path: str) -> None:
+    """Atomically rewrite `path` with prometheus_text() (for node_exporter's textfile collector)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Opt-in profiling (PROFILE_STAGES / PROFILE_MODE in utils.config)
+# ---------------------------------------------------------------------------
+
+class _Sampler(threading.Thread):
+    """Samples one thread's stack every SAMPLE_INTERVAL; counts are folded stacks (root;...;leaf)."""
+
+    def __init__(self, target: int):
+        super().__init__(daemon=True)
+        self.target, self.counts, self._stop_event = target, {}, threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop_event.set()
+        self.join()
+        return self.counts
+
+
+def _start_profiler(s: Span):
+    # Nested or concurrent spans of profiled stages run unprofiled rather than fight over the hook
+    if not _profiling.acquire(blocking=False):
+        return None
+    try:
+        if PROFILE_MODE == 'sample':
+            profiler = _Sampler(threading.get_ident())
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception:
+        _profiling.release()
+        raise
+
+
+def _stop_profiler(profiler, s: Span) -> None:
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, '-'.join(str(p) for p in (s.stage, s.name, s.tags.get('symbol'), s.id)
+                                                  if p is not None))
+        if isinstance(profiler, _Sampler):
+            with open(base + '.folded', 'w') as f:
+                f.writelines(f"{stack} {n}\n" for stack, n in profiler.stop().items())
+            s.tags['profile'] = base + '.folded'
+        else:
+            profiler.disable()
+            profiler.dump_stats(base + '.prof')
+            s.tags['profile'] = base + '.prof'
+    except Exception as e:
+        print(f"Profile write error: {e}")
+    finally:
+        _profiling.release()
@@ -0,0 +1,17 @@
+# tests/conftest.py (Offline test setup: throwaway DB, no provider cache, src on the path)
+import os
+import sys
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix='quant_terminal_tests_')
+os.environ['DB_PATH'] = os.path.join(_tmp, 'test.db')
+os.environ['PROVIDER_CACHE'] = '0'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def storage():
+    from storage.db_manager import init_storage
+    init_storage()
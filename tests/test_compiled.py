@@ -0,0 +1,36 @@
+# tests/test_compiled.py (Compiled and direct forest scorers against RandomForestClassifier.predict_proba)
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from models.compiled import CompiledForest, SklearnForest, flatten_forest
+
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.5, 400) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, min_samples_leaf=3, random_state=0)
+    model.fit(scaler.transform(X), y)
+    return model, scaler, scaler.transform(rng.normal(size=(200, 5)))
+
+
+def _as_counts(model):
+    # scikit-learn < 1.4 kept weighted class counts in tree.value (and normalized them per tree)
+    for est in model.estimators_:
+        est.tree_.value[:] *= est.tree_.weighted_n_node_samples[:, None, None]
+
+
+@pytest.mark.parametrize('counts', [False, True], ids=['fractions', 'counts'])
+def test_scorers_match_predict_proba(fitted, counts):
+    model, scaler, X = fitted
+    expected = model.predict_proba(X)
+    if counts:
+        _as_counts(model)
+        assert model.estimators_[0].tree_.value.max() > 1
+    compiled = CompiledForest(flatten_forest(model, scaler, [f'f{i}' for i in range(5)]))
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=0)
+    np.testing.assert_allclose(SklearnForest(model, scaler).predict_proba(X), expected, rtol=0, atol=0)
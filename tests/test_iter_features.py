@@ -0,0 +1,26 @@
+# tests/test_iter_features.py (Streamed feature frames against one whole-history computation)
+import numpy as np
+import pandas as pd
+
+from features.engineer import FEATURE_COLUMNS, REFERENCE_SYMBOL, compute_features, iter_features
+from storage.db_manager import bulk_upsert_ohlc, load_ohlc
+from utils.synthetic import synthetic_ohlc
+
+
+def test_chunks_match_the_whole_history():
+    bars = synthetic_ohlc('ITER', 400, start='2021-01-04', freq='B', seed=7)
+    # Prices quoted to 5 decimals (float32 can't hold them exactly) and a gap inside a warm-up overlap
+    bars[['open', 'high', 'low', 'close']] = bars[['open', 'high', 'low', 'close']].round(5)
+    bars.loc[[55, 56, 57], 'close'] = np.nan
+    ref = synthetic_ohlc(REFERENCE_SYMBOL, 420, start='2020-12-21', freq='B', seed=8).iloc[::2]
+    ref['close'] = ref['close'].round(5)
+    bulk_upsert_ohlc([bars, ref])
+
+    streamed = pd.concat(list(iter_features('ITER', chunk_bars=50, start='2021-01-01')), ignore_index=True)
+    full = load_ohlc('ITER', '2021-01-01').dropna(subset=['close'])
+    whole = compute_features(full[['symbol', 'timestamp', 'close']].reset_index(drop=True),
+                             load_ohlc(REFERENCE_SYMBOL, str(full['timestamp'].iloc[0])))
+    assert streamed['timestamp'].is_unique
+    assert (streamed['timestamp'].to_numpy() == whole['timestamp'].to_numpy()).all()
+    np.testing.assert_allclose(streamed[FEATURE_COLUMNS].to_numpy(), whole[FEATURE_COLUMNS].to_numpy(),
+                               rtol=1e-10, atol=1e-12)
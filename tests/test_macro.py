@@ -0,0 +1,54 @@
+# tests/test_macro.py (Macro refresh cadence and the point-in-time macro_rate in both feature engines)
+import numpy as np
+import pandas as pd
+
+from features import asof
+from ingest import macro_fetcher
+from storage.db_manager import macro_state, store_macro
+from utils.synthetic import synthetic_macro
+
+
+def test_no_key_means_no_request(monkeypatch):
+    monkeypatch.setattr(macro_fetcher, 'API_KEY_FRED', '')
+
+    def fetch_fred(*_):
+        raise AssertionError("requested without a key")
+
+    monkeypatch.setattr(macro_fetcher, 'fetch_fred', fetch_fred)
+    assert macro_fetcher.refresh_macro(['NOKEY']) == {}
+
+
+def test_empty_answer_waits_for_the_interval():
+    calls = []
+
+    def empty(series_id):
+        calls.append(series_id)
+        return None
+
+    macro_fetcher.refresh_macro(['EMPTY1'], fetch=empty)
+    macro_fetcher.refresh_macro(['EMPTY1'], fetch=empty)
+    assert calls == ['EMPTY1']
+    assert macro_state(['EMPTY1'])['EMPTY1']['version'] == 0
+
+
+def test_batch_engine_matches_per_symbol_macro_rate(monkeypatch):
+    from features import batch, engineer
+
+    monkeypatch.setattr(engineer, 'MACRO_RATE_SERIES', 'PITRATE')
+    store_macro(synthetic_macro('PITRATE', '2019-01-01', '2024-12-31', seed=3))
+    asof.clear_cache()
+    index = pd.bdate_range('2020-01-01', periods=600, name='timestamp')
+    rng = np.random.default_rng(0)
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (600, 2)), axis=0)), index=index,
+                          columns=['DXY', 'ES'])
+    closes.iloc[::17, 1] = np.nan
+
+    batched = batch.to_long(batch.compute_features_batch(closes), 'ES')
+    es = closes['ES'].dropna()
+    ref = closes['DXY']
+    single = engineer.compute_features(pd.DataFrame({'symbol': 'ES', 'timestamp': es.index, 'close': es.to_numpy()}),
+                                       pd.DataFrame({'timestamp': ref.index, 'close': ref.to_numpy()}))
+    assert batched['macro_rate'].nunique() > 10
+    np.testing.assert_allclose(batched['macro_rate'], single['macro_rate'])
+    np.testing.assert_allclose(batched[engineer.FEATURE_COLUMNS].to_numpy(),
+                               single[engineer.FEATURE_COLUMNS].to_numpy(), atol=1e-9)
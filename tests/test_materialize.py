@@ -0,0 +1,36 @@
+# tests/test_materialize.py (Full rebuilds through the batch engine match the per-symbol path)
+import numpy as np
+import pandas as pd
+
+from features import batch, engineer
+from storage.db_manager import bulk_upsert_ohlc, load_features, load_panel
+from utils.config import ASSETS
+from utils.synthetic import synthetic_ohlc
+
+
+def test_full_rebuild_matches_compute_features(monkeypatch):
+    bars = [synthetic_ohlc(s, 400, start='2021-01-04', freq='B', seed=i) for i, s in enumerate(ASSETS)]
+    bars[2] = bars[2].iloc[::3]  # a sparser calendar than the reference's
+    bulk_upsert_ohlc(bars)
+
+    calls = []
+    compute = batch.compute_features_batch
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return compute(*args, **kwargs)
+
+    monkeypatch.setattr(batch, 'compute_features_batch', counted)
+    assert engineer.materialize_features('ES') > 0
+    assert engineer.materialize_features('NQ') > 0
+    assert len(calls) == 1  # one vectorized pass for both rebuilds
+
+    closes = load_panel(list(ASSETS), engineer.HISTORY_START, ('close',))['close']
+    for symbol in ('ES', 'NQ'):
+        stored = load_features(symbol, engineer.FEATURE_VERSION).reset_index(drop=True)
+        single = engineer.compute_features(engineer._panel_frame(closes, symbol),
+                                           engineer._panel_frame(closes, engineer.REFERENCE_SYMBOL))
+        assert len(stored) == len(single)
+        assert (pd.to_datetime(stored['timestamp']).to_numpy() == single['timestamp'].to_numpy()).all()
+        np.testing.assert_allclose(stored[engineer.FEATURE_COLUMNS].to_numpy(dtype='float64'),
+                                   single[engineer.FEATURE_COLUMNS].to_numpy(dtype='float64'), atol=1e-9)
@@ -0,0 +1,46 @@
+# tests/test_rate_limit.py (Provider token buckets are only spent on requests that go out)
+import pytest
+
+from ingest import ohlc_fetcher, rate_limit
+from ingest.fake_clients import FakeMarket, fake_clients
+
+SYMBOLS = ['DXY', 'XAUUSD', 'ES', 'NQ', 'EURUSD', 'GBPUSD']
+# One token an hour: a second request would block the test for that long
+STRICT = {'AV': (1 / 3600, 1), 'Polygon': (1 / 3600, 1), 'Yahoo': (100.0, 100)}
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    def no_wait(seconds):
+        raise AssertionError(f"throttled for {seconds:.0f}s")
+    monkeypatch.setattr(rate_limit.time, 'sleep', no_wait)
+    rate_limit._buckets.clear()
+    yield rate_limit._buckets
+    rate_limit._buckets.clear()
+
+
+def test_keyless_providers_are_never_throttled(buckets):
+    with fake_clients(FakeMarket(start='2024-01-01', serving=('Yahoo',)), rate_limits=True):
+        ohlc_fetcher.RATE_LIMITS = STRICT
+        ohlc_fetcher.API_KEY_AV, ohlc_fetcher.API_KEY_POLYGON = '', ''
+        for _ in range(2):
+            frames = ohlc_fetcher.fetch_many(SYMBOLS)
+            assert sorted(frames) == sorted(SYMBOLS)
+    assert 'AV' not in buckets and 'Polygon' not in buckets
+    assert 'Yahoo' in buckets
+
+
+def test_keyed_provider_spends_a_token_per_request(buckets):
+    with fake_clients(FakeMarket(start='2024-01-01', serving=('AV',)), rate_limits=True):
+        ohlc_fetcher.RATE_LIMITS = {'AV': (1000.0, 10)}
+        ohlc_fetcher.API_KEY_POLYGON = ''
+        ohlc_fetcher.fetch_ohlc('DXY', start='2024-01-01')
+    assert buckets['AV']._tokens == pytest.approx(9, abs=0.5)
+
+
+def test_empty_batch_download_is_not_retried(buckets):
+    market = FakeMarket(start='2024-01-01', serving=())
+    with fake_clients(market):
+        # A retry would back off through the patched sleep and fail the test
+        assert ohlc_fetcher.fetch_yahoo_many(SYMBOLS) == {}
+    assert market.requests['Yahoo'] == len(SYMBOLS)  # one coalesced download, one fake bar lookup per ticker
@@ -0,0 +1,66 @@
+# tests/test_refresh.py (Incremental OHLC refresh against the stored watermark, offline through FakeProvider)
+import pandas as pd
+
+from ingest.fake_provider import FakeProvider
+from ingest.ohlc_fetcher import OVERLAP_DAYS, refresh_many, refresh_ohlc
+from storage.db_manager import latest_timestamp
+
+
+class RecordingProvider(FakeProvider):
+    """FakeProvider that remembers each request's start and can revise one stored bar."""
+
+    def __init__(self, *args, revise=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.starts = []
+        self.revise = revise  # (symbol, timestamp) whose close is served 1% higher
+
+    def history(self, symbol):
+        df = super().history(symbol)
+        if self.revise and self.revise[0] == symbol:
+            df = df.copy()
+            df.loc[df['timestamp'] == self.revise[1], 'close'] *= 1.01
+        return df
+
+    def fetch(self, symbol, start=None, end=None):
+        self.starts.append(start)
+        return super().fetch(symbol, start, end)
+
+
+def test_cold_backfill():
+    provider = RecordingProvider(start='2024-01-01', end='2024-06-28')
+    stats = refresh_ohlc('COLD', days=100, providers=[provider])
+    assert provider.starts == [None]
+    assert stats == {'inserted': 100, 'updated': 0, 'unchanged': 0, 'fetched': 100}
+    assert latest_timestamp('COLD') == pd.Timestamp('2024-06-28')
+
+
+def test_warm_refresh_requests_from_the_overlap_only():
+    refresh_ohlc('WARM', providers=[RecordingProvider(start='2024-01-01', end='2024-06-28')])
+    watermark = latest_timestamp('WARM')
+
+    provider = RecordingProvider(start='2024-01-01', end='2024-07-12')
+    stats = refresh_ohlc('WARM', providers=[provider])
+    start = watermark - pd.Timedelta(days=OVERLAP_DAYS)
+    assert provider.starts == [start.strftime('%Y-%m-%d')]
+    overlap = len(pd.bdate_range(start, watermark))
+    new = len(pd.bdate_range(watermark, '2024-07-12')) - 1
+    assert stats == {'inserted': new, 'updated': 0, 'unchanged': overlap, 'fetched': overlap + new}
+    assert provider.rows_served == overlap + new
+
+
+def test_revised_bar_comes_back_as_updated():
+    refresh_ohlc('REVISED', providers=[RecordingProvider(start='2024-01-01', end='2024-06-28')])
+    revised = latest_timestamp('REVISED') - pd.Timedelta(days=1)
+    provider = RecordingProvider(start='2024-01-01', end='2024-06-28', revise=('REVISED', revised))
+    stats = refresh_ohlc('REVISED', providers=[provider])
+    assert stats['updated'] == 1 and stats['inserted'] == 0
+
+
+def test_refresh_many_mixes_cold_and_warm_symbols():
+    refresh_ohlc('MANY1', providers=[RecordingProvider(start='2024-01-01', end='2024-06-28')])
+    start = (latest_timestamp('MANY1') - pd.Timedelta(days=OVERLAP_DAYS)).strftime('%Y-%m-%d')
+    provider = RecordingProvider(start='2024-01-01', end='2024-07-12')
+    stats = refresh_many(['MANY1', 'MANY2'], days=50, providers=[provider])
+    assert stats['MANY2']['inserted'] == 50
+    assert stats['MANY1']['updated'] == 0 and stats['MANY1']['unchanged'] > 0
+    assert sorted(provider.starts, key=str) == sorted([None, start], key=str)
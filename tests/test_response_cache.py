@@ -0,0 +1,84 @@
+# tests/test_response_cache.py (Cached answers and remembered failures cost no rate-limit tokens)
+import pandas as pd
+import pytest
+
+from ingest import ohlc_fetcher, rate_limit, response_cache
+from ingest.fake_clients import FakeMarket, fake_clients
+
+SYMBOLS = ['DXY', 'XAUUSD', 'ES', 'NQ', 'EURUSD', 'GBPUSD']
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    def no_wait(seconds):
+        raise AssertionError(f"throttled for {seconds:.0f}s")
+    monkeypatch.setattr(rate_limit.time, 'sleep', no_wait)
+    monkeypatch.setattr('utils.config.PROVIDER_CACHE', True)
+    monkeypatch.setattr(response_cache, '_default', response_cache.ResponseCache(str(tmp_path)))
+    rate_limit._buckets.clear()
+    yield response_cache._default
+    rate_limit._buckets.clear()
+
+
+def test_hits_and_negative_hits_skip_the_bucket(cache):
+    # AV answers nothing (its failures get cached), Polygon serves everything; one token per symbol each
+    market = FakeMarket(start='2024-01-01', serving=('Polygon',))
+    with fake_clients(market, rate_limits=True):
+        ohlc_fetcher.RATE_LIMITS = {'AV': (1 / 3600, len(SYMBOLS)), 'Polygon': (1 / 3600, len(SYMBOLS))}
+        assert sorted(ohlc_fetcher.fetch_many(SYMBOLS)) == sorted(SYMBOLS)
+        spent = dict(market.requests)
+        # The buckets are empty now: any request on the rerun would raise from the patched sleep
+        assert sorted(ohlc_fetcher.fetch_many(SYMBOLS)) == sorted(SYMBOLS)
+    assert market.requests == spent
+    assert cache.counts['hit'] == len(SYMBOLS) and cache.counts['negative_hit'] == len(SYMBOLS)
+
+
+def test_revalidation_spends_a_token(cache):
+    market = FakeMarket(start='2024-01-01', serving=('Polygon',))
+    with fake_clients(market, rate_limits=True):
+        ohlc_fetcher.RATE_LIMITS = {'Polygon': (1 / 3600, 2)}
+        ohlc_fetcher.API_KEY_AV = ''
+        ohlc_fetcher.fetch_ohlc('ES', start='2024-01-01')
+        cache.fetch('Polygon', lambda *_: pytest.fail("fresh entry went to the provider"),
+                    'ES', '2024-01-01', None)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setitem(response_cache.TTL_OPEN, 'day', 0)
+            ohlc_fetcher.fetch_ohlc('ES', start='2024-01-01')
+    assert market.requests['Polygon'] == 2
+    assert rate_limit._buckets['Polygon']._tokens == pytest.approx(0, abs=0.01)
+
+
+def test_old_closed_range_is_served_without_poisoning_open_requests(tmp_path):
+    cache = response_cache.ResponseCache(str(tmp_path))
+    market = FakeMarket(start='2020-01-01')
+    calls = []
+
+    def fetch(ticker, start, end):
+        calls.append((start, end))
+        return market.bars('Polygon', ticker, start=start, end=end)
+
+    cache.fetch('Polygon', fetch, 'X', '2020-01-01', None)
+    path = cache._path('Polygon', 'X', 'day')
+    entry = cache._read(path)
+    entry['fetched_at'] -= 8 * 86400
+    cache._write(path, entry)
+
+    closed = cache.fetch('Polygon', fetch, 'X', '2020-01-01', '2021-01-01')
+    assert len(calls) == 1 and closed['timestamp'].iloc[-1] <= pd.Timestamp('2021-01-01')
+    assert cache.counts['failed'] == 0
+    cache.fetch('Polygon', fetch, 'X', '2020-01-01', None)
+    assert len(calls) == 2 and cache.counts['revalidated'] == 1 and cache.counts['stale_served'] == 0
+
+
+def test_empty_revalidation_window_is_not_a_failure(tmp_path):
+    cache = response_cache.ResponseCache(str(tmp_path))
+    frame = FakeMarket(start='2024-01-01').bars('Polygon', 'X')
+    cache.fetch('Polygon', lambda *_: frame, 'X', '2024-01-01', None)
+    path = cache._path('Polygon', 'X', 'day')
+    entry = cache._read(path)
+    entry['fetched_at'] -= 3600
+    cache._write(path, entry)
+
+    served = cache.fetch('Polygon', lambda *_: frame.iloc[:0], 'X', '2024-01-01', None)
+    assert len(served) == len(frame) and cache.counts['failed'] == 0
+    assert not cache._read(path).get('failed_at')
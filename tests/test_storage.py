@@ -0,0 +1,60 @@
+# tests/test_storage.py (Cross-process data versions, and columnar replaces that readers never see half-done)
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from storage.db_manager import bulk_upsert_ohlc, data_version, load_panel
+from utils.synthetic import synthetic_ohlc
+
+SRC = os.path.join(os.path.dirname(__file__), os.pardir, 'src')
+
+_REVISE = """
+import sys
+sys.path.insert(0, {src!r})
+from storage.db_manager import bulk_upsert_ohlc, init_storage
+from utils.synthetic import synthetic_ohlc
+init_storage()
+bars = synthetic_ohlc('REV', 30, start='2022-01-03', freq='B').iloc[-5:]
+bars['close'] = bars['close'] * 1.01
+print(bulk_upsert_ohlc(bars)['updated'])
+"""
+
+
+def test_revision_from_another_process_moves_the_data_version():
+    bulk_upsert_ohlc(synthetic_ohlc('REV', 30, start='2022-01-03', freq='B'))
+    before = data_version()
+    old = load_panel(['REV'], '2022-01-01')['close']['REV'].iloc[-1]
+
+    out = subprocess.run([sys.executable, '-c', _REVISE.format(src=os.path.abspath(SRC))],
+                         capture_output=True, text=True, env=os.environ, check=True).stdout
+    assert out.split()[-1] == '5'  # revisions only: MAX(id) is unchanged
+
+    assert data_version() != before
+    assert load_panel(['REV'], '2022-01-01')['close']['REV'].iloc[-1] == old * 1.01
+
+
+def test_feature_replace_swaps_generations_without_an_empty_gap(tmp_path, monkeypatch):
+    from storage import columnar
+
+    monkeypatch.setattr(columnar, 'COLUMNAR_DIR', str(tmp_path))
+    old = pd.DataFrame({'timestamp': pd.bdate_range('2022-01-03', periods=10), 'x': np.arange(10.0)})
+    new = pd.DataFrame({'timestamp': pd.bdate_range('2023-01-02', periods=4), 'x': -np.arange(4.0)})
+    columnar.store_features('ES', 'v1', old, ['x'])
+    store = columnar._feature_store('ES', 'v1', ['x'])
+
+    seen = []
+    commit = columnar.ColumnStore._commit
+
+    def observed(self, meta):
+        seen.append(columnar.load_features('ES', 'v1', ['x'])['x'].tolist())  # a reader mid-replace
+        commit(self, meta)
+
+    monkeypatch.setattr(columnar.ColumnStore, '_commit', observed)
+    columnar.store_features('ES', 'v1', new, ['x'], replace=True)
+
+    assert seen == [old['x'].tolist()]
+    assert columnar.load_features('ES', 'v1', ['x'])['x'].tolist() == new['x'].tolist()
+    assert sorted(os.listdir(store.path)) == ['.lock', 'meta.json', 'timestamp.1.bin', 'x.1.bin']